@@ -1,32 +1,88 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import datetime
+import functools
+import queue
+import threading
+import time
 from datetime import date
 
 import config
 import database
-import payroll
 import employee
-import leave_management
-import loan_management
+import punch_queue
+import timesheet
 from time_utils import TimeHelper
-import attendance
+
+# payroll, leave_management, loan_management, attendance, schedule and punch_import are
+# imported where they are first used, so the login and Time Clock screens do not load them.
 
 
 class EmployeeApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, started_at=None):
+        # started_at is the perf_counter() value the startup timing report counts from
+        self._started_at = started_at if started_at is not None else time.perf_counter()
+        self.startup_timings = {}
         super().__init__()
         self.title("Employee Management System (Payroll & Attendance)")
         self.geometry("1000x700")
         self.db = database.AppDB(config.DB_NAME)
-        self.payroll_system = payroll.PayrollSystem(self.db.conn)
-        self.employee_manager = employee.EmployeeManager(self.db.conn)
-        self.leave_manager = leave_management.LeaveManager(self.db.conn)
-        self.loan_manager = loan_management.LoanManager(self.db.conn)
+        self.punch_queue = punch_queue.PunchQueue(config.DB_NAME)
+        self.employee_manager = employee.EmployeeManager(self.db.connections, self.punch_queue)
+        self.employee_manager.position_listeners.append(self._payroll_listener('invalidate_employee'))
+        # Keep the cached month snapshots behind the attendance, schedule and payroll views current
+        for source in (self.employee_manager, self.punch_queue):
+            source.change_listeners.append(self._payroll_listener('invalidate_month_snapshots'))
+        self.employee_manager.directory.subscribe(self._on_employees_changed)
+        self.after(1000, self._report_failed_punches)
         self._setup_styles()
         self.user_id = None
+        self._background_jobs = {}
+        self._background_threads = set()
+        self._paged_trees = {}
+        self._debounced = {}
+        self._tab_builders = {}
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         self.show_login_page()
 
+    @functools.cached_property
+    def payroll_system(self):
+        import payroll
+        return payroll.PayrollSystem(self.db.connections)
+
+    @functools.cached_property
+    def leave_manager(self):
+        import leave_management
+        manager = leave_management.LeaveManager(self.db.connections)
+        manager.change_listeners.append(self._payroll_listener('invalidate_month_snapshots'))
+        return manager
+
+    @functools.cached_property
+    def loan_manager(self):
+        import loan_management
+        manager = loan_management.LoanManager(self.db.connections)
+        manager.change_listeners.append(self._payroll_listener('invalidate_month_snapshots'))
+        return manager
+
+    def _payroll_listener(self, method):
+        """Return a listener calling PayrollSystem.`method`; a no-op until payroll is loaded."""
+        def listener(*args):
+            payroll_system = self.__dict__.get('payroll_system')
+            if payroll_system is not None:
+                getattr(payroll_system, method)(*args)
+        return listener
+
+    def _time_first_paint(self, screen, started):
+        """Record how long `screen` took to first paint, counting from `started`."""
+        def painted():
+            self.startup_timings[screen] = time.perf_counter() - started
+            if config.REPORT_STARTUP_TIMING:
+                print(f"[startup] {screen}: first paint after {self.startup_timings[screen] * 1000:.1f} ms")
+
+        # Tk draws in idle callbacks, so this runs once the screen has been painted
+        self.update_idletasks()
+        self.after_idle(painted)
+
     def _setup_styles(self):
         style = ttk.Style(self)
         style.theme_use('clam')
@@ -93,12 +149,34 @@ class EmployeeApp(tk.Tk):
         """Clear all items from treeview."""
         for item in tree.get_children(): tree.delete(item)
     
-    def _load_tree_data(self, tree, data, tag_index=None):
-        """Generic tree loader with optional tagging."""
+    def _load_tree_data(self, tree, fetch_page, tag_index=None, format_row=None):
+        """Generic paged tree loader with optional tagging.
+
+        fetch_page(after) returns (rows, next_cursor) as the managers' *_page methods do.
+        The first page is loaded now and further pages as the view is scrolled near the
+        bottom (or while the loaded rows do not yet fill it).
+        """
         self._clear_tree(tree)
-        for row in data:
-            tag = row[tag_index].lower() if tag_index else None
-            tree.insert('', tk.END, values=row, tags=(tag,) if tag else ())
+        state = {'cursor': None, 'done': False, 'pending': False}
+        # A reload replaces the state, so page loads queued for the previous listing are dropped
+        self._paged_trees[str(tree)] = state
+
+        def load_next():
+            state['pending'] = False
+            if state['done'] or self._paged_trees.get(str(tree)) is not state or not tree.winfo_exists(): return
+            rows, state['cursor'] = fetch_page(state['cursor'])
+            state['done'] = state['cursor'] is None
+            for row in rows:
+                tag = row[tag_index].lower() if tag_index else None
+                tree.insert('', tk.END, values=format_row(row) if format_row else row, tags=(tag,) if tag else ())
+
+        def on_scroll(first, last):
+            if float(last) >= 0.9 and not state['done'] and not state['pending']:
+                state['pending'] = True
+                self.after_idle(load_next)
+
+        tree.configure(yscrollcommand=on_scroll)
+        load_next()
     
     def _validate_salary(self, salary_str):
         """Validate and return salary or None if invalid."""
@@ -113,12 +191,16 @@ class EmployeeApp(tk.Tk):
             return amt
         except ValueError: messagebox.showerror("Input Error", "Please enter a valid loan amount."); return None
     
-    def _setup_request_tab(self, tab, title, manager, cols, col_widths, actions, tag_index):
+    def _setup_request_tab(self, tab, title, manager, cols, col_widths, actions, tag_index, status_var=None, on_filter=None):
         """Generic tab setup for Leave/Loan requests."""
         self._label(tab, title, style='Header.TLabel', fill='x', pady=10)
         tree = self._treeview(tab, cols, col_widths, expand=True, fill='both', pady=5)
         frame = ttk.Frame(tab)
         frame.pack(pady=10)
+        if status_var is not None:
+            self._label(frame, "Status:", side='left', padx=5)
+            combo = self._combo(frame, status_var, ["All", "Pending", "Approved", "Rejected"], width=10, side='left', padx=5)
+            combo.bind('<<ComboboxSelected>>', lambda e: on_filter())
         for btn_text, cmd in actions: self._button(frame, btn_text, cmd, side='left', padx=10)
         for status in ['pending', 'approved', 'rejected']:
             colors = {'pending': '#ffeb99', 'approved': '#ccffcc', 'rejected': '#ffcccc'}
@@ -126,11 +208,82 @@ class EmployeeApp(tk.Tk):
             tree.tag_configure(status, background=colors[status], foreground=fg)
         return tree
 
+    def _run_in_background(self, name, work, on_done, on_progress=None, on_error=None):
+        """Run work(db, report, cancelled) on a worker thread.
+
+        `db` is the app's ConnectionManager: PayrollSystem and the managers accept it
+        directly, and `db.reader()` is a read-only connection local to the worker thread.
+
+        `report(item)` hands progress items to `on_progress`, the return value goes to
+        `on_done` and an exception to `on_error` (an error dialog by default); all of them
+        run on the Tk thread via after(). Starting a job under a name that is still
+        running cancels the older one, and results of cancelled jobs are dropped.
+        Closing the window waits for running jobs before the database is closed.
+        """
+        self._cancel_background(name)
+        cancelled = threading.Event()
+        events = queue.Queue()
+        self._background_jobs[name] = cancelled
+
+        def runner():
+            try:
+                # The job's thread ends with it, so its reader connection is closed too
+                with self.db.connections.closing_reader():
+                    events.put(('done', work(self.db.connections, lambda item: events.put(('progress', item)), cancelled)))
+            except Exception as e:
+                events.put(('error', e))
+            finally:
+                self._background_threads.discard(threading.current_thread())
+
+        def poll():
+            while True:
+                try:
+                    kind, payload = events.get_nowait()
+                except queue.Empty:
+                    break
+                if cancelled.is_set():
+                    return
+                if kind == 'progress':
+                    if on_progress: on_progress(payload)
+                    continue
+                self._background_jobs.pop(name, None)
+                if kind == 'error':
+                    if on_error: on_error(payload)
+                    else: messagebox.showerror("Error", f"{name.title()} failed: {payload}")
+                else:
+                    on_done(payload)
+                return
+            self.after(50, poll)
+
+        thread = threading.Thread(target=runner, daemon=True)
+        self._background_threads.add(thread)
+        thread.start()
+        self.after(50, poll)
+
+    def _cancel_background(self, name=None):
+        """Cancel one background job, or all of them when `name` is None."""
+        names = list(self._background_jobs) if name is None else [name]
+        for job in names:
+            cancelled = self._background_jobs.pop(job, None)
+            if cancelled: cancelled.set()
+
     def _logout(self):
+        self._cancel_background()
         self.user_id = None
         self.show_login_page()
 
+    def _on_close(self):
+        self._cancel_background()
+        # Cancelled jobs stop at their next check, and a finalize still writing must finish
+        for thread in list(self._background_threads):
+            thread.join()
+        self.punch_queue.close()
+        self.db.close()
+        self.destroy()
+
     def show_login_page(self):
+        # The first login screen is timed from process start, later ones from logout
+        started = self._started_at if 'login' not in self.startup_timings else time.perf_counter()
         for widget in self.winfo_children():
             widget.destroy()
         login_frame = ttk.Frame(self, padding="20 20 20 20")
@@ -143,6 +296,7 @@ class EmployeeApp(tk.Tk):
         self._label(login_frame, "Employee ID: (e.g., EMP001)", pady=5)
         self.employee_id_entry = self._entry(login_frame, width=30, pady=5)
         self._button(login_frame, "Employee Time Clock", self.employee_login, pady=10)
+        self._time_first_paint('login', started)
 
     def admin_login(self):
         code = self.admin_code_entry.get()
@@ -161,6 +315,7 @@ class EmployeeApp(tk.Tk):
             messagebox.showerror("Login Failed", "Invalid Employee ID.")
 
     def show_admin_interface(self):
+        started = time.perf_counter()
         for widget in self.winfo_children():
             widget.destroy()
 
@@ -171,33 +326,59 @@ class EmployeeApp(tk.Tk):
         top_bar.pack(fill='x')
         ttk.Label(top_bar, text="Admin Dashboard", style='Title.TLabel').pack(side='left', pady=10, padx=10)
         ttk.Button(top_bar, text="Logout", command=self._logout).pack(side='right', pady=10, padx=10)
+        if self.db.query_stats is not None:
+            ttk.Button(top_bar, text="Query Stats", command=self._show_query_stats).pack(side='right', pady=10)
 
         notebook = ttk.Notebook(admin_frame)
         notebook.pack(expand=True, fill='both', pady=10)
 
-        self.payroll_tab = ttk.Frame(notebook, padding="10")
-        notebook.add(self.payroll_tab, text='Payroll & Deductions')
-        self._setup_payroll_tab()
-
-        self.attendance_tab = ttk.Frame(notebook, padding="10")
-        notebook.add(self.attendance_tab, text='Attendance & Absences')
-        self._setup_attendance_tab()
-
-        self.schedule_tab = ttk.Frame(notebook, padding="10")
-        notebook.add(self.schedule_tab, text='Schedules & Shifts')
-        self._setup_schedule_tab()
-
-        self.employee_tab = ttk.Frame(notebook, padding="10")
-        notebook.add(self.employee_tab, text='Employee Data')
-        self._setup_employee_tab()
-
-        self.leave_management_tab = ttk.Frame(notebook, padding="10")
-        notebook.add(self.leave_management_tab, text='Leave Management')
-        self._setup_leave_tab()
-
-        self.loan_management_tab = ttk.Frame(notebook, padding="10")
-        notebook.add(self.loan_management_tab, text='Loan Management')
-        self._setup_loan_tab()
+        # Tabs are empty frames until first selected; see _build_selected_tab
+        self._tab_builders = {}
+        for attr, text, builder in (
+            ('payroll_tab', 'Payroll & Deductions', self._setup_payroll_tab),
+            ('attendance_tab', 'Attendance & Absences', self._setup_attendance_tab),
+            ('schedule_tab', 'Schedules & Shifts', self._setup_schedule_tab),
+            ('employee_tab', 'Employee Data', self._setup_employee_tab),
+            ('leave_management_tab', 'Leave Management', self._setup_leave_tab),
+            ('loan_management_tab', 'Loan Management', self._setup_loan_tab),
+        ):
+            tab = ttk.Frame(notebook, padding="10")
+            setattr(self, attr, tab)
+            notebook.add(tab, text=text)
+            self._tab_builders[str(tab)] = builder
+        notebook.bind('<<NotebookTabChanged>>', self._build_selected_tab)
+        self._build_selected_tab(notebook=notebook)
+        self._time_first_paint('admin', started)
+
+    def _show_query_stats(self):
+        """Show the per-method query counts and timings collected since startup or the last reset."""
+        stats = self.db.query_stats
+        win = tk.Toplevel(self)
+        win.title("Query Stats")
+        win.geometry("900x600")
+        text = tk.Text(win, wrap='none', font=('Consolas', 10))
+
+        def refresh():
+            text.delete('1.0', tk.END)
+            text.insert(tk.END, stats.format_summary())
+
+        def reset():
+            stats.reset()
+            refresh()
+
+        buttons = ttk.Frame(win)
+        buttons.pack(fill='x', padx=10, pady=5)
+        ttk.Button(buttons, text="Refresh", command=refresh).pack(side='left')
+        ttk.Button(buttons, text="Reset", command=reset).pack(side='left', padx=5)
+        text.pack(expand=True, fill='both', padx=10, pady=(0, 10))
+        refresh()
+
+    def _build_selected_tab(self, event=None, notebook=None):
+        """Build the selected notebook tab the first time it is shown."""
+        notebook = notebook or event.widget
+        builder = self._tab_builders.pop(notebook.select(), None)
+        if builder:
+            builder()
 
     def _setup_payroll_tab(self):
         select_frame = ttk.Frame(self.payroll_tab, padding="10", style='Header.TLabel')
@@ -205,11 +386,9 @@ class EmployeeApp(tk.Tk):
         self._label(select_frame, "Search Name:", side='left', padx=5)
         self.payroll_search_entry = self._entry(select_frame, width=20, side='left', padx=5)
         self.payroll_search_entry.bind('<KeyRelease>', self._filter_payroll_employees)
-        employees = self.employee_manager.get_all_employees()
-        self.payroll_employees = [f"{eid} - {name}" for eid, name, _, _, _ in employees]
         self.payroll_employee_var = tk.StringVar(self.payroll_tab)
-        self.payroll_employee_combo = self._combo(select_frame, self.payroll_employee_var, self.payroll_employees, side='left', padx=10)
-        if self.payroll_employees: self.payroll_employee_var.set(self.payroll_employees[0])
+        self.payroll_employee_combo = self._combo(select_frame, self.payroll_employee_var, [], side='left', padx=10)
+        self._refresh_payroll_employees()
         self._button(select_frame, "Refresh Employees", self._refresh_payroll_employees, side='left', padx=10)
         cur_m, cur_y = datetime.date.today().month, datetime.date.today().year
         self.payroll_month_var = tk.StringVar(self.payroll_tab, value=str(cur_m))
@@ -223,26 +402,64 @@ class EmployeeApp(tk.Tk):
         self._combo(select_frame, self.payroll_period_var, ["1", "2"], width=5, side='left', padx=5)
         self._button(select_frame, "Generate Payroll", self._generate_payroll, side='left', padx=15)
         self._button(select_frame, "Generate All Payroll", self._generate_all_payroll, side='left', padx=5)
+        action_frame = ttk.Frame(self.payroll_tab)
+        action_frame.pack(fill='x')
+        self.payroll_finalize_button = self._button(action_frame, "Finalize Period", self._finalize_payroll_period, side='left', padx=5)
+        self.payroll_regenerate_button = self._button(action_frame, "Regenerate Changed", self._regenerate_payroll_period, side='left', padx=5)
+        self._button(action_frame, "Lock Period", lambda: self._set_payroll_period_lock(True), side='left', padx=5)
+        self._button(action_frame, "Unlock Period", lambda: self._set_payroll_period_lock(False), side='left', padx=5)
+        self.payroll_cancel_button = self._button(action_frame, "Cancel", self._cancel_payroll_job, side='right', padx=5)
+        self.payroll_cancel_button.config(state='disabled')
+        self.payroll_progress = ttk.Progressbar(action_frame, mode='determinate', length=200)
+        self.payroll_progress.pack(side='right', padx=5)
+        self.payroll_status_label = self._label(action_frame, "", side='right', padx=5)
         self.payroll_text = tk.Text(self.payroll_tab, wrap='word', font=('Consolas', 10), height=25)
         self.payroll_text.pack(expand=True, fill='both', pady=10)
 
-    def _filter_payroll_employees(self, event=None):
-        search_term = self.payroll_search_entry.get().lower()
-        filtered = [e for e in self.payroll_employees if search_term in e.lower()]
-        self.payroll_employee_combo['values'] = filtered
-        if filtered:
-            self.payroll_employee_var.set(filtered[0])
+    def _on_employees_changed(self, event, emp_id, row):
+        """Keep the employee combos and the employee list in step with the directory."""
+        for combo, refresh in (
+            (getattr(self, 'payroll_employee_combo', None), self._refresh_payroll_employees),
+            (getattr(self, 'att_employee_combo', None), self._refresh_attendance_employees),
+            (getattr(self, 'sched_employee_combo', None), self._refresh_schedule_employees),
+        ):
+            if combo is not None and combo.winfo_exists():
+                refresh(keep_selection=True)
+        tree = getattr(self, 'employee_tree', None)
+        if tree is not None and tree.winfo_exists():
+            self._load_all_employees()
+
+    def _debounce(self, widget, callback):
+        """Run callback once `widget` has seen no new call for config.SEARCH_DEBOUNCE_MS."""
+        key = str(widget)
+        if key in self._debounced:
+            self.after_cancel(self._debounced[key])
+
+        def run():
+            del self._debounced[key]
+            if widget.winfo_exists():
+                callback()
+
+        self._debounced[key] = self.after(config.SEARCH_DEBOUNCE_MS, run)
+
+    def _refresh_employee_combo(self, search_entry, combo, var, keep_selection=False):
+        """Fill an employee combo with the matches for its search entry (everyone when empty)."""
+        query = search_entry.get().strip()
+        if query:
+            choices = self.employee_manager.search_index.labels(query, config.SEARCH_RESULT_LIMIT)
         else:
-            self.payroll_employee_var.set("")
-
-    def _refresh_payroll_employees(self):
-        employees = self.employee_manager.get_all_employees()
-        self.payroll_employees = [f"{eid} - {name}" for eid, name, _, _, _ in employees]
-        self.payroll_employee_combo['values'] = self.payroll_employees
-        if self.payroll_employees:
-            self.payroll_employee_var.set(self.payroll_employees[0])
-        else:
-            self.payroll_employee_var.set("")
+            choices = self.employee_manager.directory.labels()
+        combo['values'] = choices
+        if keep_selection and var.get() in choices:
+            return
+        var.set(choices[0] if choices else "")
+
+    def _filter_payroll_employees(self, event=None):
+        self._debounce(self.payroll_search_entry, self._refresh_payroll_employees)
+
+    def _refresh_payroll_employees(self, keep_selection=False):
+        self._refresh_employee_combo(self.payroll_search_entry, self.payroll_employee_combo,
+                                     self.payroll_employee_var, keep_selection)
 
     def _generate_payroll(self):
         self.payroll_text.delete('1.0', tk.END)
@@ -256,7 +473,35 @@ class EmployeeApp(tk.Tk):
         year = int(self.payroll_year_var.get())
         period = int(self.payroll_period_var.get())
 
-        report, error = self.payroll_system.calculate_pay(emp_id, month, year, period)
+        payroll_system = self.payroll_system
+
+        def work(db, report_progress, cancelled):
+            return payroll_system.preview_pay(emp_id, month, year, period)
+
+        self._start_payroll_job("Computing payslip...")
+        self._run_in_background('payroll', work, lambda result: self._show_payslip(emp_id, *result), on_error=self._payroll_job_failed)
+
+    def _start_payroll_job(self, status):
+        self.payroll_status_label.config(text=status)
+        self.payroll_progress.config(value=0, maximum=1)
+        self.payroll_cancel_button.config(state='normal')
+
+    def _finish_payroll_job(self, status=""):
+        self.payroll_status_label.config(text=status)
+        self.payroll_cancel_button.config(state='disabled')
+
+    def _payroll_job_failed(self, error):
+        self._finish_payroll_job()
+        self.payroll_text.delete('1.0', tk.END)
+        self.payroll_text.insert(tk.END, f"Error: {error}\n")
+
+    def _cancel_payroll_job(self):
+        self._cancel_background('payroll')
+        self._finish_payroll_job("Cancelled.")
+
+    def _show_payslip(self, emp_id, report, error):
+        self._finish_payroll_job()
+        self.payroll_text.delete('1.0', tk.END)
         if error:
             self.payroll_text.insert(tk.END, f"Error: {error}\n")
             return
@@ -309,11 +554,11 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         select_frame = ttk.Frame(self.attendance_tab, padding="10", style='Header.TLabel')
         select_frame.pack(fill='x', pady=5)
         self._label(select_frame, "View Attendance for:", side='left', padx=5)
-        employees = self.employee_manager.get_all_employees()
-        self.att_employees = [f"{eid} - {name}" for eid, name, _, _, _ in employees]
+        self.att_search_entry = self._entry(select_frame, width=15, side='left', padx=5)
+        self.att_search_entry.bind('<KeyRelease>', lambda e: self._debounce(self.att_search_entry, self._refresh_attendance_employees))
         self.att_employee_var = tk.StringVar(self.attendance_tab)
-        self.att_employee_combo = self._combo(select_frame, self.att_employee_var, self.att_employees, side='left', padx=10)
-        if self.att_employees: self.att_employee_var.set(self.att_employees[0])
+        self.att_employee_combo = self._combo(select_frame, self.att_employee_var, [], side='left', padx=10)
+        self._refresh_attendance_employees()
         self._button(select_frame, "Refresh Employees", self._refresh_attendance_employees, side='left', padx=10)
         cur_m, cur_y = datetime.date.today().month, datetime.date.today().year
         self.att_month_var = tk.StringVar(self.attendance_tab, value=str(cur_m))
@@ -336,6 +581,7 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         self.att_time_out_entry = ttk.Entry(admin_frame, width=10)
         self.att_time_out_entry.grid(row=2, column=1, sticky='w', padx=2, pady=2)
         ttk.Button(admin_frame, text="Set Time", command=self._set_attendance_time).grid(row=3, column=0, columnspan=2, pady=(6,2))
+        ttk.Button(admin_frame, text="Import Punches...", command=self._import_punches).grid(row=4, column=0, columnspan=2, pady=(2,2))
         cols = ('date', 'time_in', 'time_out', 'overtime', 'status')
         self.att_tree = self._treeview(self.attendance_tab, cols, {'date': 100, 'time_in': 100, 'time_out': 100, 'overtime': 100, 'status': 150}, expand=True, fill='both', pady=10)
         self.att_tree.tag_configure('present', background='#ccffcc')
@@ -343,14 +589,9 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         self.att_tree.tag_configure('leave', background='#ffffcc')
         self.att_summary_label = self._label(self.attendance_tab, "", style='Header.TLabel', fill='x', pady=5)
 
-    def _refresh_attendance_employees(self):
-        employees = self.employee_manager.get_all_employees()
-        self.att_employees = [f"{eid} - {name}" for eid, name, _, _, _ in employees]
-        self.att_employee_combo['values'] = self.att_employees
-        if self.att_employees:
-            self.att_employee_var.set(self.att_employees[0])
-        else:
-            self.att_employee_var.set("")
+    def _refresh_attendance_employees(self, keep_selection=False):
+        self._refresh_employee_combo(self.att_search_entry, self.att_employee_combo,
+                                     self.att_employee_var, keep_selection)
 
     def _view_attendance(self):
         for i in self.att_tree.get_children():
@@ -365,7 +606,16 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         month = int(self.att_month_var.get())
         year = int(self.att_year_var.get())
 
-        rows, summary = attendance.get_attendance_report(self.db.conn, self.payroll_system, emp_id, month, year)
+        import attendance
+        payroll_system = self.payroll_system
+
+        def work(db, report_progress, cancelled):
+            return attendance.get_attendance_report(payroll_system, emp_id, month, year)
+
+        self.att_summary_label.config(text="Loading attendance...", foreground='black')
+        self._run_in_background('attendance', work, lambda result: self._show_attendance(*result))
+
+    def _show_attendance(self, rows, summary):
         if isinstance(summary, dict) and summary.get('error'):
             self.att_summary_label.config(text=f"Error: {summary.get('error')}", foreground='red')
             return
@@ -401,14 +651,18 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
             return
 
         try:
-            cursor = self.db.conn.cursor()
-            cursor.execute("INSERT OR REPLACE INTO attendance (employee_id, date, time_in, time_out) VALUES (?, ?, ?, ?)", (emp_id, date_str, time_in, time_out))
-            self.db.conn.commit()
-            cursor.close()
+            with self.db.connections.write() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO attendance (employee_id, date, time_in, time_out, epoch_day, in_seconds, out_seconds) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (emp_id, date_str, time_in, time_out) + TimeHelper.punch_seconds(date_str, time_in, time_out)
+                )
+                timesheet.refresh(conn.cursor(), [(emp_id, date_str)])
+            self.punch_queue.invalidate(emp_id)
+            self.payroll_system.invalidate_month_snapshots(emp_id)
             messagebox.showinfo("Success", f"Attendance updated for {emp_id} on {date_str}.")
 
             try:
-                dt = datetime.datetime.strptime(date_str, '%Y-%m-%d')
+                dt = date.fromordinal(TimeHelper.date_ordinal(date_str))
                 sel_month = int(self.att_month_var.get())
                 sel_year = int(self.att_year_var.get())
                 if dt.month != sel_month or dt.year != sel_year:
@@ -422,15 +676,47 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         except Exception as e:
             messagebox.showerror("Database Error", f"Failed to update attendance: {e}")
 
+    def _import_punches(self):
+        path = filedialog.askopenfilename(
+            title="Import Biometric Punches",
+            filetypes=[("Punch exports", "*.csv *.jsonl *.ndjson"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        import punch_import
+
+        def done(stats):
+            self.punch_queue.invalidate()
+            self.payroll_system.invalidate_month_snapshots()
+            lines = [
+                f"Punches read: {stats['punches_read']}",
+                f"Attendance rows written: {stats['rows_written']}",
+                f"Duplicate punches skipped: {stats['duplicates']}",
+                f"Rejected: {stats['rejected']}",
+            ]
+            lines += [f"  {reason}: {count}" for reason, count in sorted(stats['rejected_by_reason'].items())]
+            lines += [f"  line {line}: {reason}" for line, reason in stats['rejected_samples'][:5]]
+            lines.append(f"Time: {stats['seconds']:.2f}s ({stats['punches_per_second'] or 0:,} punches/s)")
+            messagebox.showinfo("Import Complete", "\n".join(lines))
+            if self.att_employee_var.get():
+                self._view_attendance()
+
+        self.att_summary_label.config(text="Importing punches...", foreground='black')
+        self._run_in_background(
+            'punch_import',
+            lambda db, report_progress, cancelled: punch_import.import_punches(db, path),
+            done
+        )
+
     def _setup_schedule_tab(self):
         select_frame = ttk.Frame(self.schedule_tab, padding="10", style='Header.TLabel')
         select_frame.pack(fill='x', pady=5)
         self._label(select_frame, "View Schedule for:", side='left', padx=5)
-        employees = self.employee_manager.get_all_employees()
-        self.sched_employees = [f"{eid} - {name}" for eid, name, _, _, _ in employees]
+        self.sched_search_entry = self._entry(select_frame, width=15, side='left', padx=5)
+        self.sched_search_entry.bind('<KeyRelease>', lambda e: self._debounce(self.sched_search_entry, self._refresh_schedule_employees))
         self.sched_employee_var = tk.StringVar(self.schedule_tab)
-        self.sched_employee_combo = self._combo(select_frame, self.sched_employee_var, self.sched_employees, side='left', padx=10)
-        if self.sched_employees: self.sched_employee_var.set(self.sched_employees[0])
+        self.sched_employee_combo = self._combo(select_frame, self.sched_employee_var, [], side='left', padx=10)
+        self._refresh_schedule_employees()
         self._button(select_frame, "Refresh Employees", self._refresh_schedule_employees, side='left', padx=10)
         cur_m, cur_y = datetime.date.today().month, datetime.date.today().year
         self.sched_month_var = tk.StringVar(self.schedule_tab, value=str(cur_m))
@@ -447,14 +733,9 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         self.schedule_tree.tag_configure('rest_day', background='#e0e0e0')
         self.schedule_info_label = self._label(self.schedule_tab, "", style='Header.TLabel', fill='x', pady=5)
 
-    def _refresh_schedule_employees(self):
-        employees = self.employee_manager.get_all_employees()
-        self.sched_employees = [f"{eid} - {name}" for eid, name, _, _, _ in employees]
-        self.sched_employee_combo['values'] = self.sched_employees
-        if self.sched_employees:
-            self.sched_employee_var.set(self.sched_employees[0])
-        else:
-            self.sched_employee_var.set("")
+    def _refresh_schedule_employees(self, keep_selection=False):
+        self._refresh_employee_combo(self.sched_search_entry, self.sched_employee_combo,
+                                     self.sched_employee_var, keep_selection)
 
     def _generate_schedule_view(self):
         # Delegate to ScheduleGenerator in schedule.py
@@ -478,45 +759,142 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         )
 
     def _generate_all_payroll(self):
-        # produce overview for all employees for selected month/year/period
+        # preview overview for all employees for selected month/year/period; nothing is saved
+        month = int(self.payroll_month_var.get())
+        year = int(self.payroll_year_var.get())
+        period = int(self.payroll_period_var.get())
+
+        payroll_system = self.payroll_system
+
+        def work(db, report_progress, cancelled):
+            results = []
+            for chunk, done, total in payroll_system.iter_preview_payroll(month, year, period):
+                if cancelled.is_set():
+                    return None
+                results.extend(chunk)
+                report_progress((done, total))
+            return results
+
+        def progress(item):
+            done, total = item
+            self.payroll_progress.config(value=done, maximum=max(total, 1))
+            self.payroll_status_label.config(text=f"{done}/{total} employees")
+
+        def done(results):
+            self._finish_payroll_job()
+            self._show_payroll_overview(results, month, year, period, "Payroll Preview")
+
+        self.payroll_text.delete('1.0', tk.END)
+        self._start_payroll_job("Previewing payroll...")
+        self._run_in_background('payroll', work, done, progress, on_error=self._payroll_job_failed)
+
+    def _finalize_payroll_period(self):
+        month = int(self.payroll_month_var.get())
+        year = int(self.payroll_year_var.get())
+        period = int(self.payroll_period_var.get())
+        label = f"{date(year, month, 1).strftime('%B %Y')} - Period {period}"
+        if self.payroll_system.is_period_locked(month, year, period):
+            messagebox.showwarning("Period Locked", f"{label} is locked. Unlock it before finalizing again.")
+            return
+        if not self._confirm("Finalize Payroll", f"Save payroll for {label} and deduct loan balances for all employees?"):
+            return
+
+        payroll_system = self.payroll_system
+
+        def work(db, report_progress, cancelled):
+            return payroll_system.calculate_payroll_batch(month, year, period)
+
+        def done(results):
+            self._finish_period_job()
+            self._show_payroll_overview(results, month, year, period, "Payroll Finalized")
+
+        self._start_period_job("Finalizing payroll...")
+        self._run_in_background('payroll-period', work, done, on_error=self._period_job_failed)
+
+    def _regenerate_payroll_period(self):
+        month = int(self.payroll_month_var.get())
+        year = int(self.payroll_year_var.get())
+        period = int(self.payroll_period_var.get())
+        label = f"{date(year, month, 1).strftime('%B %Y')} - Period {period}"
+        if self.payroll_system.is_period_locked(month, year, period):
+            messagebox.showwarning("Period Locked", f"{label} is locked. Unlock it before regenerating.")
+            return
+
+        payroll_system = self.payroll_system
+
+        def work(db, report_progress, cancelled):
+            return payroll_system.regenerate_payroll_period(month, year, period)
+
+        def done(result):
+            results, unchanged = result
+            self._finish_period_job()
+            self._show_payroll_overview(
+                results, month, year, period, f"Payroll Regenerated ({unchanged} unchanged)",
+                empty_text=f"No payslips changed since {label} was finalized ({unchanged} unchanged)."
+            )
+
+        self._start_period_job("Regenerating payroll...")
+        self._run_in_background('payroll-period', work, done, on_error=self._period_job_failed)
+
+    def _start_period_job(self, status):
+        """Start a finalize/regenerate job: it writes the period, so it cannot be cancelled."""
+        self._cancel_background('payroll')
+        self._finish_payroll_job(status)
+        self.payroll_progress.config(value=0, maximum=1)
+        for button in (self.payroll_finalize_button, self.payroll_regenerate_button):
+            button.config(state='disabled')
+
+    def _finish_period_job(self):
+        self._finish_payroll_job()
+        for button in (self.payroll_finalize_button, self.payroll_regenerate_button):
+            button.config(state='normal')
+
+    def _period_job_failed(self, error):
+        self._finish_period_job()
         self.payroll_text.delete('1.0', tk.END)
+        self.payroll_text.insert(tk.END, f"Error: {error}\n")
+
+    def _set_payroll_period_lock(self, locked):
         month = int(self.payroll_month_var.get())
         year = int(self.payroll_year_var.get())
         period = int(self.payroll_period_var.get())
+        if locked:
+            success, msg = self.payroll_system.lock_period(month, year, period)
+        else:
+            success, msg = self.payroll_system.unlock_period(month, year, period)
+        if success: messagebox.showinfo("Payroll Period", msg)
+        else: messagebox.showerror("Payroll Period", msg)
 
-        employees = self.employee_manager.get_all_employees()
-        if not employees:
-            self.payroll_text.insert(tk.END, "No employees found.\n")
+    def _show_payroll_overview(self, results, month, year, period, heading, empty_text="No employees found."):
+        self.payroll_text.delete('1.0', tk.END)
+        if not results:
+            self.payroll_text.insert(tk.END, f"{empty_text}\n")
             return
 
         # header
-        title = f"Payroll Overview - {date(year, month, 1).strftime('%B %Y')} - Period {period}"
-        header = f"{title:^100}\n"
-        header += "="*100 + "\n"
-        header += f"{'ID':<12} | {'Name':<25} | {'Gross Pay':>18} | {'Total Deductions':>18} | {'Net Pay':>18}\n"
-        header += "-"*100 + "\n"
-        self.payroll_text.insert(tk.END, header)
+        title = f"{heading} - {date(year, month, 1).strftime('%B %Y')} - Period {period}"
+        lines = [
+            f"{title:^100}",
+            "="*100,
+            f"{'ID':<12} | {'Name':<25} | {'Gross Pay':>18} | {'Total Deductions':>18} | {'Net Pay':>18}",
+            "-"*100,
+        ]
 
         grand_totals = {'gross': 0.0, 'deductions': 0.0, 'net': 0.0}
-        for eid, name, _, _, _ in employees:
-            report, error = self.payroll_system.calculate_pay(eid, month, year, period)
-            if error or not report:
-                line = f"{eid:<12} | {name:<25} | Error: {error or 'N/A'}\n"
-                self.payroll_text.insert(tk.END, line)
-                continue
+        for eid, name, report in results:
             gross = report.get('gross_pay', 0.0)
             deductions = report.get('total_deductions', 0.0)
             net = report.get('net_pay', 0.0)
             grand_totals['gross'] += gross
             grand_totals['deductions'] += deductions
             grand_totals['net'] += net
-            line = f"{eid:<12} | {name:<25} | PHP {gross:>14,.2f} | PHP {deductions:>14,.2f} | PHP {net:>14,.2f}\n"
-            self.payroll_text.insert(tk.END, line)
+            lines.append(f"{eid:<12} | {name:<25} | PHP {gross:>14,.2f} | PHP {deductions:>14,.2f} | PHP {net:>14,.2f}")
 
-        footer = "-"*100 + "\n"
-        footer += f"{'TOTAL':<12} | {'':<25} | PHP {grand_totals['gross']:>14,.2f} | PHP {grand_totals['deductions']:>14,.2f} | PHP {grand_totals['net']:>14,.2f}\n"
-        footer += "="*100 + "\n"
-        self.payroll_text.insert(tk.END, footer)
+        lines.append("-"*100)
+        lines.append(f"{'TOTAL':<12} | {'':<25} | PHP {grand_totals['gross']:>14,.2f} | PHP {grand_totals['deductions']:>14,.2f} | PHP {grand_totals['net']:>14,.2f}")
+        lines.append("="*100)
+        # one insert for the whole overview instead of one per employee line
+        self.payroll_text.insert(tk.END, "\n".join(lines) + "\n")
 
     def _open_calendar_view(self):
         try:
@@ -576,6 +954,11 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         self.delete_button = self._button(button_frame, "Delete Selected", self._delete_employee, side='left', padx=10)
         self.delete_button.config(state='disabled')
         self._label(self.employee_tab, "All Employees (Click to Edit or Delete)", style='Header.TLabel', fill='x', pady=10)
+        search_frame = ttk.Frame(self.employee_tab)
+        search_frame.pack(fill='x')
+        self._label(search_frame, "Search:", side='left', padx=5)
+        self.employee_search_entry = self._entry(search_frame, width=30, side='left', padx=5)
+        self.employee_search_entry.bind('<KeyRelease>', lambda e: self._debounce(self.employee_search_entry, self._load_all_employees))
         cols = ('id', 'name', 'position', 'department', 'salary')
         col_widths = {'id': 100, 'name': 150, 'position': 150, 'department': 150, 'salary': 100}
         self.employee_tree = self._treeview(self.employee_tab, cols, col_widths, expand=True, fill='both', pady=5)
@@ -583,9 +966,19 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         self._load_all_employees()
 
     def _load_all_employees(self):
-        self._clear_tree(self.employee_tree)
-        for emp in self.employee_manager.get_all_employees():
-            self.employee_tree.insert('', tk.END, values=(emp[0], emp[1], emp[2], emp[3], f"PHP {emp[4]:,.2f}"))
+        query = self.employee_search_entry.get().strip()
+        if query:
+            matches = self.employee_manager.search_index.search(query)
+
+            def fetch_page(after):
+                start = after or 0
+                end = start + config.PAGE_SIZE
+                rows = [self.employee_manager.get_employee_by_id(emp_id) for emp_id in matches[start:end]]
+                return [row for row in rows if row], end if end < len(matches) else None
+        else:
+            fetch_page = self.employee_manager.get_employees_page
+        self._load_tree_data(self.employee_tree, fetch_page,
+                             format_row=lambda emp: (emp[0], emp[1], emp[2], emp[3], f"PHP {emp[4]:,.2f}"))
 
     def _cancel_edit(self):
         for entry in self.emp_entries.values():
@@ -627,7 +1020,7 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         salary = self._validate_salary(data['Monthly Salary:'])
         if not salary or not all([emp_id, name, position, department]): messagebox.showerror("Input Error", "All fields are required."); return
         success, msg = self.employee_manager.add_employee(emp_id, name, position, department, salary)
-        if success: messagebox.showinfo("Success", msg); self._load_all_employees(); self._cancel_edit()
+        if success: messagebox.showinfo("Success", msg); self._cancel_edit()
         else: messagebox.showerror("Error", msg)
 
     def _edit_employee(self):
@@ -638,7 +1031,7 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         salary = self._validate_salary(data['Monthly Salary:'])
         if not salary or not all([name, position, department]): messagebox.showerror("Input Error", "All fields are required."); return
         success, msg = self.employee_manager.update_employee(emp_id, name, position, department, salary)
-        if success: messagebox.showinfo("Success", msg); self._load_all_employees(); self._cancel_edit()
+        if success: messagebox.showinfo("Success", msg); self._cancel_edit()
         else: messagebox.showerror("Error", msg)
 
     def _delete_employee(self):
@@ -648,7 +1041,7 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         if not emp_id: messagebox.showerror("Error", "Please select an employee from the list to delete."); return
         if not self._confirm("Confirm Deletion", f"Delete employee {emp_id} and ALL their records?"): return
         success, msg = self.employee_manager.delete_employee(emp_id)
-        if success: messagebox.showinfo("Success", msg); self._load_all_employees(); self._cancel_edit()
+        if success: messagebox.showinfo("Success", msg); self._cancel_edit()
         else: messagebox.showerror("Error", msg)
 
     def _setup_leave_tab(self):
@@ -657,20 +1050,23 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         actions = [("Approve Selected Leave", lambda: self._approve_reject_leave('Approved')), 
                    ("Reject Selected Leave", lambda: self._approve_reject_leave('Rejected')), 
                    ("Delete Selected Leave", self._delete_leave), ("Refresh List", self._load_leave_requests)]
-        self.leave_tree = self._setup_request_tab(self.leave_management_tab, "Leave Requests (All Statuses)", 
-                                                   self.leave_manager, cols, col_widths, actions, 5)
+        self.leave_status_var = tk.StringVar(value="All")
+        self.leave_tree = self._setup_request_tab(self.leave_management_tab, "Leave Requests", 
+                                                   self.leave_manager, cols, col_widths, actions, 5,
+                                                   self.leave_status_var, self._load_leave_requests)
         self._load_leave_requests()
 
     def _load_leave_requests(self):
-        requests = self.leave_manager.get_all_leave_requests()
-        self._load_tree_data(self.leave_tree, requests, tag_index=5)
+        status = self.leave_status_var.get()
+        status = None if status == "All" else status
+        self._load_tree_data(self.leave_tree, lambda after: self.leave_manager.get_leave_requests_page(after, status=status),
+                             tag_index=5)
 
     def _approve_reject_leave(self, status):
         selected_item = self.leave_tree.focus()
         if not selected_item: messagebox.showwarning("Selection Error", "Please select a leave request."); return
         values = self.leave_tree.item(selected_item, 'values')
-        leave_date = datetime.datetime.strptime(values[3], '%Y-%m-%d').date()
-        if leave_date < date.today(): messagebox.showerror("Invalid Action", "Cannot modify leave requests for past dates."); return
+        if TimeHelper.date_ordinal(values[3]) < date.today().toordinal(): messagebox.showerror("Invalid Action", "Cannot modify leave requests for past dates."); return
         if self._confirm("Confirm Action", f"Set leave ID {values[0]} to '{status}'?"):
             (self.leave_manager.approve_leave if status == 'Approved' else self.leave_manager.reject_leave)(values[0])
             self._load_leave_requests()
@@ -679,8 +1075,7 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         selected_item = self.leave_tree.focus()
         if not selected_item: messagebox.showwarning("Selection Error", "Select a leave to delete."); return
         values = self.leave_tree.item(selected_item, 'values')
-        leave_date = datetime.datetime.strptime(values[3], '%Y-%m-%d').date()
-        if leave_date < date.today(): messagebox.showerror("Invalid Action", "Cannot delete leave requests for past dates."); return
+        if TimeHelper.date_ordinal(values[3]) < date.today().toordinal(): messagebox.showerror("Invalid Action", "Cannot delete leave requests for past dates."); return
         if self._confirm("Confirm Deletion", f"Delete leave ID {values[0]}?"): 
             self.leave_manager.delete_leave(values[0]); self._load_leave_requests()
 
@@ -690,13 +1085,17 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         actions = [("Approve Selected Loan", lambda: self._approve_reject_loan('Approved')), 
                    ("Reject Selected Loan", lambda: self._approve_reject_loan('Rejected')), 
                    ("Refresh List", self._load_loans)]
+        self.loan_status_var = tk.StringVar(value="All")
         self.loan_tree = self._setup_request_tab(self.loan_management_tab, "Loan Requests", 
-                                                  self.loan_manager, cols, col_widths, actions, 6)
+                                                  self.loan_manager, cols, col_widths, actions, 6,
+                                                  self.loan_status_var, self._load_loans)
         self._load_loans()
 
     def _load_loans(self):
-        loans = self.loan_manager.get_all_loans()
-        self._load_tree_data(self.loan_tree, loans, tag_index=6)
+        status = self.loan_status_var.get()
+        status = None if status == "All" else status
+        self._load_tree_data(self.loan_tree, lambda after: self.loan_manager.get_loans_page(after, status=status),
+                             tag_index=6)
 
     def _approve_reject_loan(self, status):
         selected_item = self.loan_tree.focus()
@@ -707,6 +1106,7 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
             self._load_loans()
 
     def show_employee_interface(self):
+        started = time.perf_counter()
         for widget in self.winfo_children():
             widget.destroy()
         emp_frame = ttk.Frame(self, padding="50 50 50 50")
@@ -741,6 +1141,7 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         self.loan_amount_entry = ttk.Entry(loan_frame, width=15)
         self.loan_amount_entry.grid(row=0, column=1, padx=5, pady=5, sticky='w')
         ttk.Button(loan_frame, text="Submit Loan Request", command=self._submit_loan_request, style='TButton').grid(row=0, column=2, padx=15, sticky='e')
+        self._time_first_paint('employee', started)
 
     def _time_in(self):
         success, message = self.employee_manager.time_in(self.user_id)
@@ -756,6 +1157,20 @@ Employee ID: {emp_id:<20} | Period: {report['month']} - {report['period_label']}
         else:
             self.status_label.config(text=message, foreground='red')
 
+    def _report_failed_punches(self):
+        """Show punches the queue acknowledged but could not save; polled from the Tk thread."""
+        failed = self.punch_queue.take_failed()
+        if failed:
+            lines = [
+                f"{row[0]} {row[1]}: clock {'in' if row[2] else 'out'} at {row[2] or row[3]} ({error})"
+                for row, error in failed
+            ]
+            messagebox.showerror(
+                "Time Clock",
+                "These punches could not be saved and must be entered by an admin:\n\n" + "\n".join(lines)
+            )
+        self.after(1000, self._report_failed_punches)
+
     def _submit_leave_request(self):
         leave_date_str = self.leave_date_entry.get().strip()
         leave_type = self.leave_type_var.get()
@@ -1,52 +1,30 @@
-from datetime import date, datetime, timedelta, time
 from typing import List, Dict, Tuple, Optional
 
+import config
 from time_utils import TimeHelper
 
 
-def get_attendance_report(db_conn, payroll_system, emp_id: str, month: int, year: int) -> Tuple[List[Dict], Dict]:
+def get_attendance_report(payroll_system, emp_id: str, month: int, year: int) -> Tuple[List[Dict], Dict]:
     """Return attendance rows and summary for the given employee/month/year.
 
     rows: list of dicts with keys: date (YYYY-MM-DD), time_in, time_out, overtime (float or None), status
     summary: dict with keys: total_workdays, days_present, days_absent
 
-    This is a pure data/function implementation without GUI calls.
+    Everything is read from the employee's cached month snapshot (see
+    PayrollSystem.get_month_snapshot); overtime comes from the snapshot's timesheet rows
+    when config.USE_TIMESHEET_TABLE is on. This is a pure data/function implementation
+    without GUI calls.
     """
-    cursor = db_conn.cursor()
-    start_date = date(year, month, 1)
-    # compute end of month safely
-    end_date = (start_date.replace(day=28) + timedelta(days=4))
-    end_date = end_date - timedelta(days=end_date.day)
+    snapshot = payroll_system.get_month_snapshot(emp_id, month, year)
+    schedule, total_workdays = payroll_system.snapshot_schedule(snapshot)
 
-    # get schedule from payroll system (may return schedule dict or error string)
-    schedule, total_workdays = payroll_system.get_employee_schedule(emp_id, month, year)
-    if isinstance(schedule, str):
-        return [], {"error": schedule}
+    att_map = {r[0]: r[1:] for r in snapshot.attendance}
+    leave_map = snapshot.leaves
 
-    attendance_records = cursor.execute(
-        """
-        SELECT date, time_in, time_out FROM attendance
-        WHERE employee_id=? AND date BETWEEN ? AND ?
-        ORDER BY date
-        """,
-        (emp_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
-    ).fetchall()
-
-    att_map = {r[0]: (r[1], r[2]) for r in attendance_records}
-
-    leaves = cursor.execute(
-        """
-        SELECT date, leave_type FROM leaves
-        WHERE employee_id=? AND status='Approved' AND date BETWEEN ? AND ?
-        """,
-        (emp_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
-    ).fetchall()
-    leave_map = {l[0]: l[1] for l in leaves}
-
-    # lookup employee position/department to determine scheduled end time
-    emp_row = cursor.execute("SELECT position, department FROM employees WHERE id= ?", (emp_id,)).fetchone()
-    emp_pos = emp_row[0] if emp_row else None
-    emp_dept = emp_row[1] if emp_row and len(emp_row) > 1 else None
+    # resolve the compiled shift from the employee's position/department
+    emp_pos = snapshot.employee[1] if snapshot.employee else None
+    emp_dept = snapshot.employee[2] if snapshot.employee else None
+    shift = payroll_system.resolve_shift(emp_pos, emp_dept)
 
     rows = []
     days_present = 0.0
@@ -57,38 +35,25 @@ def get_attendance_report(db_conn, payroll_system, emp_id: str, month: int, year
         if "Rest Day" in day_info:
             continue
 
-        time_in = att_map.get(date_str, (None, None))[0] or "-"
-        time_out = att_map.get(date_str, (None, None))[1] or "-"
+        raw_in, raw_out, in_seconds, out_seconds = att_map.get(date_str, (None, None, None, None))
+        time_in = raw_in or "-"
+        time_out = raw_out or "-"
 
         overtime_val: Optional[float] = None
-        if time_out != "-":
-            try:
-                 sch_start = None
-                sch_end = None
-                if emp_pos and emp_pos.startswith("Security Guard") and emp_dept == "Security":
-                    if emp_pos.endswith("A"):
-                        shift = payroll_system.GUARD_SHIFTS[0]
-                    elif emp_pos.endswith("B"):
-                        shift = payroll_system.GUARD_SHIFTS[1]
-                    else:
-                        shift = payroll_system.GUARD_SHIFTS[2]
-                    sch_start = shift.get('start')
-                    sch_end = shift.get('end')
-                else:
-                    shift_def = payroll_system.POSITION_SHIFTS.get(emp_pos, {"start": datetime.time(8, 0), "end": datetime.time(16, 0)})
-                    sch_end = shift_def.get('end')
-
-                 ot = None
-                if sch_start and sch_end:
-                    ot = TimeHelper.calculate_overtime_hours(sch_start, sch_end, date_str, time_out)
-                overtime_val = ot
-            except Exception:
-                overtime_val = None
+        if out_seconds is not None:
+            day = snapshot.timesheet.get(date_str) if config.USE_TIMESHEET_TABLE else None
+            if day is not None:
+                overtime_minutes = day[3]
+            else:
+                _, _, overtime_minutes = payroll_system.evaluate_day(
+                    shift, TimeHelper.clock_minutes(in_seconds), TimeHelper.clock_minutes(out_seconds)
+                )
+            overtime_val = round(overtime_minutes / 60.0, 2)
 
         if date_str in leave_map:
             status = f"On Leave ({leave_map[date_str]})"
             days_present += 0.5 if leave_map[date_str] == 'VLH' else 1
-        elif time_in != "-" and time_out != "-":
+        elif in_seconds is not None and out_seconds is not None:
             status = "Present"
             days_present += 1
         else:
@@ -102,13 +67,9 @@ def get_attendance_report(db_conn, payroll_system, emp_id: str, month: int, year
             "overtime": overtime_val,
             "status": status,
         })
-         if overtime_val is not None:
-            try:
-                total_overtime_hours += float(overtime_val)
-            except Exception:
-                pass
+        if overtime_val is not None:
+            total_overtime_hours += overtime_val
 
-    cursor.close()
     summary = {
         "total_workdays": total_workdays,
         "days_present": days_present,
@@ -0,0 +1,286 @@
+"""Benchmarks of payroll, attendance and time-clock operations on synthetic data.
+
+For each size a fresh database is generated with `generate`: employees cycle through
+every config.POSITION_QUOTAS position (guards also as Security Guard A/B/C, and the plain
+"Security Guard" both inside and outside the Security department, so every shift
+branch of `shifts.resolve_shift` is exercised), with three months of
+attendance, leaves and loans ending in the benchmarked month. Quotas are not enforced.
+The same seed always produces the same data.
+
+    python -m benchmark [--sizes 100 1000 10000] [--sample 50] [--out benchmark.json]
+
+Per-call operations are timed over a sample of employees; results, with the mean,
+median, 95th percentile and maximum per call in milliseconds, are written as JSON.
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import config
+import database
+import timesheet
+from database import ATTENDANCE_UPSERT
+from time_utils import TimeHelper
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_SAMPLE = 50
+DEFAULT_SEED = 20251101
+# The benchmarked pay month and the attendance history generated before it
+BENCH_MONTH, BENCH_YEAR = 11, 2025
+HISTORY_START = date(2025, 9, 1)
+
+_DEPARTMENTS = {
+    "Manager": "Human Resource",
+    "HR": "Human Resource",
+    "Sales": "Finance",
+    "Production Worker A": "Production",
+    "Production Worker B": "Production",
+    "Security Guard": "Security",
+}
+_POSITIONS = [(position, _DEPARTMENTS.get(position, "Operations")) for position in config.POSITION_QUOTAS]
+_POSITIONS += [
+    ("Security Guard A", "Security"),
+    ("Security Guard B", "Security"),
+    ("Security Guard C", "Security"),
+    ("Security Guard", "Operations"),
+]
+_FIRST_NAMES = ["ANA", "BEN", "CARLO", "DIANA", "ELMER", "FE", "GINA", "HECTOR", "IRENE", "JOSE", "KARLA", "LUIS"]
+_LAST_NAMES = ["REYES", "SANTOS", "CRUZ", "BAUTISTA", "OCAMPO", "GARCIA", "MENDOZA", "TORRES", "DELA CRUZ", "RAMOS"]
+_SALARIES = [18000.0, 25000.0, 32000.0, 45000.0, 60000.0]
+
+
+def _clock(minutes, rng):
+    minutes %= 1440
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:{rng.randint(0, 59):02d}"
+
+
+def generate(db_path, employees, seed=DEFAULT_SEED):
+    """Create a database at `db_path` filled with `employees` synthetic employees.
+
+    Returns the number of rows written to each table.
+    """
+    rng = random.Random(seed)
+    db = database.AppDB(str(db_path))
+    payroll_system = _payroll_system(db)
+    end = date(BENCH_YEAR, BENCH_MONTH + 1, 1) if BENCH_MONTH < 12 else date(BENCH_YEAR + 1, 1, 1)
+    days = [HISTORY_START + timedelta(days=i) for i in range((end - HISTORY_START).days)]
+    width = max(3, len(str(employees)))
+
+    employee_rows, attendance_rows, leave_rows, loan_rows = [], [], [], []
+    for i in range(1, employees + 1):
+        emp_id = f"EMP{i:0{width}d}"
+        position, department = _POSITIONS[i % len(_POSITIONS)]
+        name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)} {i}"
+        employee_rows.append((emp_id, name, position, department, rng.choice(_SALARIES)))
+
+        shift = payroll_system.resolve_shift(position, department)
+        guard = shift in payroll_system.GUARD_SHIFT_TABLE
+        for day in days:
+            if day.weekday() == 6 or (day.weekday() == 5 and not guard):
+                continue
+            date_str = day.isoformat()
+            roll = rng.random()
+            if roll < 0.03:
+                leave_rows.append((emp_id, date_str, rng.choice(('SL', 'VL', 'VLH')),
+                                   rng.choice(('Approved', 'Approved', 'Pending', 'Rejected'))))
+                continue
+            if roll < 0.08:
+                continue
+            time_in = _clock(shift["start"] + rng.randint(-20, 25), rng)
+            time_out = None if roll > 0.97 else _clock(shift["end"] + rng.randint(-30, 90), rng)
+            attendance_rows.append(
+                (emp_id, date_str, time_in, time_out) + TimeHelper.punch_seconds(date_str, time_in, time_out)
+            )
+
+        for _ in range(rng.choice((0, 0, 1, 1, 2))):
+            amount = float(rng.choice((2000, 5000, 10000, 20000)))
+            status = rng.choice(('Approved', 'Approved', 'Pending', 'Rejected'))
+            remaining = rng.choice((amount, amount / 2)) if status == 'Approved' else amount
+            requested = rng.choice(days[:len(days) // 2]).isoformat()
+            loan_rows.append((emp_id, amount, remaining, requested, status))
+
+    cursor = db.conn.cursor()
+    cursor.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?)", employee_rows)
+    cursor.executemany(ATTENDANCE_UPSERT, attendance_rows)
+    cursor.executemany(
+        "INSERT INTO leaves (employee_id, date, leave_type, status) VALUES (?, ?, ?, ?)", leave_rows
+    )
+    cursor.executemany("""
+        INSERT INTO loans (employee_id, amount, remaining_balance, date_requested, status)
+        VALUES (?, ?, ?, ?, ?)
+    """, loan_rows)
+    timesheet.backfill(cursor)
+    db.conn.commit()
+    cursor.execute("ANALYZE")
+    cursor.close()
+    db.close()
+    return {
+        'employees': len(employee_rows),
+        'attendance': len(attendance_rows),
+        'leaves': len(leave_rows),
+        'loans': len(loan_rows),
+    }
+
+
+def _payroll_system(db):
+    import payroll
+    return payroll.PayrollSystem(db.connections)
+
+
+def _stats(durations):
+    """Summarize per-call durations in seconds as milliseconds."""
+    ordered = sorted(durations)
+    ms = [d * 1000.0 for d in ordered]
+    return {
+        'calls': len(ms),
+        'total_seconds': round(sum(ordered), 4),
+        'mean_ms': round(statistics.fmean(ms), 3) if ms else None,
+        'p50_ms': round(statistics.median(ms), 3) if ms else None,
+        'p95_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3) if ms else None,
+        'max_ms': round(ms[-1], 3) if ms else None,
+    }
+
+
+def _time_calls(func, args_list):
+    """Call `func(*args)` for each args tuple; return (stats, results)."""
+    durations, results = [], []
+    for args in args_list:
+        started = time.perf_counter()
+        results.append(func(*args))
+        durations.append(time.perf_counter() - started)
+    return _stats(durations), results
+
+
+def _time_once(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return round(time.perf_counter() - started, 4), result
+
+
+def _punch_throughput(submit_in, submit_out, emp_ids, finish=None):
+    """Clock each employee in then out; return punches per second and the failures."""
+    started = time.perf_counter()
+    failures = 0
+    for emp_id in emp_ids:
+        failures += not submit_in(emp_id)[0]
+        failures += not submit_out(emp_id)[0]
+    if finish is not None:
+        finish()
+    elapsed = time.perf_counter() - started
+    punches = 2 * len(emp_ids)
+    return {
+        'punches': punches,
+        'seconds': round(elapsed, 4),
+        'punches_per_second': round(punches / elapsed) if elapsed else None,
+        'failures': failures,
+    }
+
+
+def run_size(db_path, employees, sample=DEFAULT_SAMPLE, seed=DEFAULT_SEED):
+    """Generate a database of `employees` employees and time every benchmarked operation."""
+    import attendance
+    import employee
+    import leave_management
+    import punch_queue
+    import timesheet_vectorized
+
+    generate_seconds, rows = _time_once(generate, db_path, employees, seed)
+    result = {'rows': rows, 'generate_seconds': generate_seconds}
+
+    db = database.AppDB(str(db_path))
+    try:
+        payroll_system = _payroll_system(db)
+        ids = [row[0] for row in db.conn.execute("SELECT id FROM employees ORDER BY id")]
+        rng = random.Random(seed)
+        sampled = sorted(rng.sample(ids, min(sample, len(ids))))
+        month, year = BENCH_MONTH, BENCH_YEAR
+
+        timings = result['timings'] = {}
+        timings['generate_all_preview_seconds'], _ = _time_once(
+            payroll_system.preview_payroll_batch, month, year, 1)
+        timings['generate_all_finalize_seconds'], _ = _time_once(
+            payroll_system.calculate_payroll_batch, month, year, 1)
+        timings['calculate_pay'], _ = _time_calls(
+            payroll_system.calculate_pay, [(emp_id, month, year, 2) for emp_id in sampled])
+
+        # Each call reads a different employee, so the month snapshot cache never hits
+        payroll_system.invalidate_month_snapshots()
+        timings['get_attendance_report'], _ = _time_calls(
+            attendance.get_attendance_report, [(payroll_system, emp_id, month, year) for emp_id in sampled])
+        payroll_system.invalidate_month_snapshots()
+        timings['get_employee_schedule'], _ = _time_calls(
+            payroll_system.get_employee_schedule, [(emp_id, month, year) for emp_id in sampled])
+
+        leave_manager = leave_management.LeaveManager(db.connections)
+        leave_day = date(year + month // 12, month % 12 + 1, 1)
+        leave_day += timedelta(days=(7 - leave_day.weekday()) % 7)
+        timings['submit_leave_request'], outcomes = _time_calls(
+            leave_manager.submit_leave_request,
+            [(emp_id, leave_day.isoformat(), 'Vacation Leave') for emp_id in sampled])
+        timings['submit_leave_request']['failures'] = sum(1 for ok, _ in outcomes if not ok)
+
+        # Punches are stamped with today's date, which the generated history never reaches
+        direct_ids, queued_ids = ids[0::2][:sample * 10], ids[1::2][:sample * 10]
+        manager = employee.EmployeeManager(db.connections)
+        timings['time_clock_direct'] = _punch_throughput(manager.time_in, manager.time_out, direct_ids)
+        queue = punch_queue.PunchQueue(str(db_path))
+        queued_manager = employee.EmployeeManager(db.connections, punch_queue=queue)
+        timings['time_clock_queued'] = _punch_throughput(
+            queued_manager.time_in, queued_manager.time_out, queued_ids, finish=queue.close)
+        timings['time_clock_queued']['ack_mode'] = queue.ack_mode
+
+        timings['timesheet_summary'] = timesheet_vectorized.benchmark(payroll_system, month, year, 1, repeat=3)
+    finally:
+        db.close()
+    return result
+
+
+def run(sizes=DEFAULT_SIZES, sample=DEFAULT_SAMPLE, seed=DEFAULT_SEED, work_dir=None):
+    """Benchmark each size in turn; returns the JSON-ready results."""
+    results = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'seed': seed,
+        'sample': sample,
+        'period': f"{BENCH_YEAR}-{BENCH_MONTH:02d}",
+        'config': {
+            'PAYROLL_WORKERS': config.PAYROLL_WORKERS,
+            'USE_NUMPY_TIMESHEETS': config.USE_NUMPY_TIMESHEETS,
+            'PUNCH_ACK_MODE': config.PUNCH_ACK_MODE,
+            'DB_SYNCHRONOUS': config.DB_SYNCHRONOUS,
+        },
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        for size in sizes:
+            results['sizes'][str(size)] = run_size(Path(tmp) / f"bench_{size}.db", size, sample, seed)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--sample', type=int, default=DEFAULT_SAMPLE, help="employees timed per operation")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--out', default='benchmark.json', help="results file (default benchmark.json)")
+    parser.add_argument('--work-dir', default=None, help="where the generated databases are kept while running")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.sample, args.seed, args.work_dir)
+    Path(args.out).write_text(json.dumps(results, indent=2), encoding='utf-8')
+    for size, size_results in results['sizes'].items():
+        timings = size_results['timings']
+        print(f"{size:>6} employees: finalize {timings['generate_all_finalize_seconds']}s, "
+              f"calculate_pay p50 {timings['calculate_pay']['p50_ms']}ms, "
+              f"time clock {timings['time_clock_direct']['punches_per_second']}/s direct, "
+              f"{timings['time_clock_queued']['punches_per_second']}/s queued")
+    print(f"Results written to {args.out}")
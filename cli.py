@@ -0,0 +1,297 @@
+"""Headless command-line entry point for batch jobs, e.g. from cron.
+
+    python -m cli payroll finalize --month 12 --year 2025 --period 1
+    python -m cli import-punches export.csv
+    python -m cli export-payslips --month 12 --year 2025 --period 1 --out payslips.csv
+    python -m cli export-attendance --month 12 --year 2025 --out attendance.json
+    python -m cli approve-leaves --all-pending
+    python -m cli approve-loans 12 13 --reject
+    python -m cli backfill-timesheet
+
+Every command prints one JSON object on stdout with "ok", "command" and "seconds"
+(wall time of the command itself), plus "query_stats" with --query-stats. Any failure
+sets "ok" to false with an "error" message and exits with status 1. Only the data-layer modules are used; tkinter and
+app are never imported.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import config
+import database
+from query_stats import QueryStats
+
+_SUMMARY_FIELDS = ('gross_pay', 'total_deductions', 'net_pay')
+
+
+class CommandError(Exception):
+    """A command could not run; reported as {"ok": false, "error": ...}."""
+
+
+def _period_args(parser, with_period=True):
+    today = date.today()
+    parser.add_argument('--month', type=int, default=today.month, choices=range(1, 13), metavar='MONTH')
+    parser.add_argument('--year', type=int, default=today.year)
+    if with_period:
+        parser.add_argument('--period', type=int, default=1, choices=(1, 2))
+
+
+def _write_rows(path, rows, fieldnames):
+    """Write dict rows to `path` as CSV, or as a JSON list when it ends in .json."""
+    path = Path(path)
+    if path.suffix.lower() == '.json':
+        path.write_text(json.dumps(rows, indent=2), encoding='utf-8')
+        return
+    with path.open('w', newline='', encoding='utf-8') as handle:
+        writer = csv.DictWriter(handle, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_payroll(db, args):
+    import payroll
+
+    payroll_system = payroll.PayrollSystem(db.connections)
+    if args.action == 'preview':
+        results = payroll_system.preview_payroll_batch(args.month, args.year, args.period, args.workers)
+        unchanged = None
+    elif args.action == 'finalize':
+        results = payroll_system.calculate_payroll_batch(args.month, args.year, args.period, args.workers)
+        unchanged = None
+    else:
+        if payroll_system.is_period_locked(args.month, args.year, args.period):
+            raise CommandError(f"{payroll_system.period_key(args.month, args.year, args.period)} is locked.")
+        results, unchanged = payroll_system.regenerate_payroll_period(args.month, args.year, args.period, args.workers)
+
+    employees = []
+    for emp_id, name, report in results:
+        entry = {'employee_id': emp_id, 'name': name}
+        entry.update(report if args.full else {field: report[field] for field in _SUMMARY_FIELDS})
+        employees.append(entry)
+    output = {
+        'period': payroll_system.period_key(args.month, args.year, args.period),
+        'locked': payroll_system.is_period_locked(args.month, args.year, args.period),
+        'employees': len(results),
+        'totals': {field: round(sum(report[field] for _, _, report in results), 2) for field in _SUMMARY_FIELDS},
+        'results': employees,
+    }
+    if unchanged is not None:
+        output['unchanged'] = unchanged
+    return output
+
+
+def run_import_punches(db, args):
+    import punch_import
+
+    if not Path(args.path).is_file():
+        raise CommandError(f"No such file: {args.path}")
+    stats = punch_import.import_punches(db.connections, args.path, args.chunk_size)
+    stats['rejected_samples'] = [
+        {'line': line_number, 'reason': reason} for line_number, reason in stats['rejected_samples']
+    ]
+    return stats
+
+
+def run_export_payslips(db, args):
+    import payroll
+
+    payroll_system = payroll.PayrollSystem(db.connections)
+    stored = payroll_system.get_stored_period(args.month, args.year, args.period)
+    rows = []
+    for emp_id, name, report in payroll_system.preview_payroll_batch(args.month, args.year, args.period, args.workers):
+        # Finalized payslips are exported as stored; everyone else gets a preview
+        report = stored.get(emp_id, report)
+        row = {'employee_id': emp_id, 'name': name, 'finalized': emp_id in stored}
+        row.update(report)
+        rows.append(row)
+    fieldnames = list(rows[0]) if rows else ['employee_id', 'name', 'finalized']
+    _write_rows(args.out, rows, fieldnames)
+    return {
+        'period': payroll_system.period_key(args.month, args.year, args.period),
+        'employees': len(rows),
+        'finalized': sum(1 for row in rows if row['finalized']),
+        'out': str(args.out),
+    }
+
+
+def run_export_attendance(db, args):
+    import attendance
+    import employee
+    import payroll
+
+    payroll_system = payroll.PayrollSystem(db.connections)
+    directory = employee.EmployeeManager(db.connections).directory
+    emp_ids = args.employee or [row[0] for row in directory.rows()]
+    unknown = [emp_id for emp_id in emp_ids if not directory.exists(emp_id)]
+    if unknown:
+        raise CommandError(f"Unknown employee ID(s): {', '.join(unknown)}")
+
+    rows, summaries = [], []
+    for emp_id in emp_ids:
+        report_rows, summary = attendance.get_attendance_report(payroll_system, emp_id, args.month, args.year)
+        rows.extend(dict(row, employee_id=emp_id) for row in report_rows)
+        summaries.append(dict(summary, employee_id=emp_id))
+    _write_rows(args.out, rows, ['employee_id', 'date', 'time_in', 'time_out', 'overtime', 'status'])
+    return {
+        'month': date(args.year, args.month, 1).strftime('%B %Y'),
+        'employees': len(emp_ids),
+        'rows': len(rows),
+        'summaries': summaries,
+        'out': str(args.out),
+    }
+
+
+def run_backfill_timesheet(db, args):
+    import timesheet
+
+    if args.employee and not db.conn.execute("SELECT 1 FROM employees WHERE id=?", (args.employee,)).fetchone():
+        raise CommandError(f"Unknown employee ID: {args.employee}")
+    with db.connections.write() as conn:
+        cursor = conn.cursor()
+        rows = timesheet.backfill(cursor, args.employee)
+        cursor.close()
+    return {'employee': args.employee, 'rows': rows}
+
+
+def _pending_ids(fetch_page):
+    """Collect the IDs of every pending request from a manager's *_page method."""
+    ids, after = [], None
+    while True:
+        rows, after = fetch_page(after)
+        ids.extend(row[0] for row in rows)
+        if after is None:
+            return ids
+
+
+def _decide_requests(args, rows_by_id, decide, is_past=None):
+    """Apply `decide(request_id)` to each selected request; returns the JSON summary."""
+    if not (args.ids or args.all_pending):
+        raise CommandError("Give request IDs or --all-pending.")
+    request_ids = _pending_ids(args.fetch_pending) if args.all_pending else args.ids
+
+    changed, skipped = [], []
+    for request_id in request_ids:
+        row = rows_by_id(request_id)
+        if row is None:
+            skipped.append({'id': request_id, 'reason': 'not found'})
+        elif row['status'] != 'Pending':
+            skipped.append({'id': request_id, 'reason': f"already {row['status']}"})
+        elif is_past and is_past(row):
+            skipped.append({'id': request_id, 'reason': 'past date'})
+        else:
+            decide(request_id)
+            changed.append(request_id)
+    return {'status': 'Rejected' if args.reject else 'Approved', 'changed': changed, 'skipped': skipped}
+
+
+def run_approve_leaves(db, args):
+    import leave_management
+
+    manager = leave_management.LeaveManager(db.connections)
+    args.fetch_pending = lambda after: manager.get_leave_requests_page(after, status='Pending')
+
+    def leave(leave_id):
+        row = db.connections.reader().execute("SELECT date, status FROM leaves WHERE id=?", (leave_id,)).fetchone()
+        return {'date': row[0], 'status': row[1]} if row else None
+
+    # Same rule as the Leave Management tab: past-dated requests are not modified
+    today = date.today().isoformat()
+    return _decide_requests(
+        args, leave, manager.reject_leave if args.reject else manager.approve_leave,
+        is_past=lambda row: row['date'] < today,
+    )
+
+
+def run_approve_loans(db, args):
+    import loan_management
+
+    manager = loan_management.LoanManager(db.connections)
+    args.fetch_pending = lambda after: manager.get_loans_page(after, status='Pending')
+
+    def loan(loan_id):
+        row = db.connections.reader().execute("SELECT status FROM loans WHERE id=?", (loan_id,)).fetchone()
+        return {'status': row[0]} if row else None
+
+    return _decide_requests(args, loan, manager.reject_loan if args.reject else manager.approve_loan)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--db', default=config.DB_NAME, help=f"database file (default {config.DB_NAME})")
+    parser.add_argument('--query-stats', action='store_true',
+                        help="add per-method query counts and timings to the output (see query_stats.py)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    payroll_parser = commands.add_parser('payroll', help="preview, finalize or regenerate a pay period")
+    payroll_parser.add_argument('action', choices=('preview', 'finalize', 'regenerate'))
+    _period_args(payroll_parser)
+    payroll_parser.add_argument('--workers', type=int, default=None,
+                                help="worker processes (default config.PAYROLL_WORKERS)")
+    payroll_parser.add_argument('--full', action='store_true', help="include every report field per employee")
+    payroll_parser.set_defaults(run=run_payroll)
+
+    import_parser = commands.add_parser('import-punches', help="import a biometric punch export (CSV or JSONL)")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--chunk-size', type=int, default=None)
+    import_parser.set_defaults(run=run_import_punches)
+
+    payslip_parser = commands.add_parser('export-payslips', help="write a period's payslips to CSV or JSON")
+    _period_args(payslip_parser)
+    payslip_parser.add_argument('--out', required=True, help="output file; .json for JSON, anything else for CSV")
+    payslip_parser.add_argument('--workers', type=int, default=None)
+    payslip_parser.set_defaults(run=run_export_payslips)
+
+    attendance_parser = commands.add_parser('export-attendance', help="write a month's attendance report to CSV or JSON")
+    _period_args(attendance_parser, with_period=False)
+    attendance_parser.add_argument('--employee', action='append', type=str.upper, help="employee ID; repeatable (default all)")
+    attendance_parser.add_argument('--out', required=True, help="output file; .json for JSON, anything else for CSV")
+    attendance_parser.set_defaults(run=run_export_attendance)
+
+    backfill_parser = commands.add_parser('backfill-timesheet', help="recompute the timesheet table from attendance")
+    backfill_parser.add_argument('--employee', type=str.upper, default=None, help="only this employee ID")
+    backfill_parser.set_defaults(run=run_backfill_timesheet)
+
+    for name, noun, run in (('approve-leaves', 'leave', run_approve_leaves), ('approve-loans', 'loan', run_approve_loans)):
+        request_parser = commands.add_parser(name, help=f"approve (or --reject) pending {noun} requests in bulk")
+        request_parser.add_argument('ids', nargs='*', type=int, help=f"{noun} request IDs")
+        request_parser.add_argument('--all-pending', action='store_true', help=f"every pending {noun} request")
+        request_parser.add_argument('--reject', action='store_true', help="reject instead of approve")
+        request_parser.set_defaults(run=run)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    output = {'command': args.command}
+    started = time.perf_counter()
+    query_stats = QueryStats() if args.query_stats else None
+    db = None
+    try:
+        # SQLite would create an empty database for a mistyped path
+        if not Path(args.db).is_file():
+            raise CommandError(f"No such database: {args.db}")
+        db = database.AppDB(args.db, query_stats)
+        output.update(args.run(db, args))
+        output['ok'] = True
+    except CommandError as e:
+        output.update(ok=False, error=str(e))
+    except Exception as e:
+        # e.g. an unwritable --out path or a database error; still reported as JSON
+        output.update(ok=False, error=f"{type(e).__name__}: {e}")
+    finally:
+        if db is not None:
+            db.close()
+    output['seconds'] = round(time.perf_counter() - started, 3)
+    if query_stats is not None:
+        output['query_stats'] = query_stats.summary()
+    print(json.dumps(output, indent=2, default=str))
+    return 0 if output['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
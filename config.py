@@ -1,4 +1,11 @@
 DB_NAME = "employee_management.db"
+# Write-ahead logging lets readers on other threads run while punches are committed
+DB_JOURNAL_MODE = "WAL"
+# Connection pragmas set by database.ConnectionManager; a negative cache_size is in KiB
+DB_SYNCHRONOUS = "NORMAL"
+DB_CACHE_SIZE = -16000
+DB_MMAP_SIZE = 128 * 1024 * 1024
+DB_TEMP_STORE = "MEMORY"
 
 SSS_RATE = 0.045
 PAGIBIG_RATE = 0.02
@@ -8,6 +15,57 @@ TAX_RATE = 0.10
 STANDARD_PAID_HOURS = 8
 LUNCH_BREAK_HOURS = 1
 
+# Month calendars and per-position schedule templates kept in memory by payroll.py
+CALENDAR_CACHE_SIZE = 24
+SCHEDULE_CACHE_SIZE = 64
+# Per-employee month snapshots shared by the attendance, schedule and payroll views
+SNAPSHOT_CACHE_SIZE = 32
+
+# Payroll and attendance reports read each day's minutes from the timesheet table
+# (timesheet.py); off, they evaluate every punch again, with NumPy arrays for
+# period-wide runs when NumPy is installed and USE_NUMPY_TIMESHEETS is on
+USE_TIMESHEET_TABLE = True
+USE_NUMPY_TIMESHEETS = True
+
+# "Generate All Payroll" worker processes; 1 computes everything in the GUI process
+PAYROLL_WORKERS = 1
+PAYROLL_MIN_EMPLOYEES_PER_WORKER = 250
+
+# Employees per progress update when the GUI previews a whole period in the background
+PAYROLL_PROGRESS_CHUNK = 200
+
+# Employee search boxes wait this long after the last keystroke, and combos list at most this many matches
+SEARCH_DEBOUNCE_MS = 150
+SEARCH_RESULT_LIMIT = 200
+
+# Rows fetched per page by the lazily loaded employee, leave and loan lists
+PAGE_SIZE = 100
+
+# Biometric punch imports (punch_import.py): rows per executemany batch, the longest
+# in-to-out span paired as one shift, and repeated in punches treated as one
+PUNCH_IMPORT_CHUNK_SIZE = 1000
+PUNCH_MAX_SHIFT_HOURS = 16
+PUNCH_DUPLICATE_SECONDS = 120
+
+# Time-clock group commits (punch_queue.py): flush after this many punches or this many
+# milliseconds; "accepted" acknowledges a punch once queued, "durable" once committed
+PUNCH_FLUSH_SIZE = 50
+PUNCH_FLUSH_INTERVAL_MS = 200
+PUNCH_ACK_MODE = "accepted"
+PUNCH_SYNCHRONOUS = "NORMAL"
+# Commit attempts for a group of punches, and the first wait between them (doubled each time)
+PUNCH_RETRY_ATTEMPTS = 4
+PUNCH_RETRY_DELAY_MS = 100
+
+# Print how long the login, admin and employee screens take to first paint
+REPORT_STARTUP_TIMING = False
+
+# Per-method query counts and latencies (query_stats.py), shown from the admin dashboard;
+# statements slower than QUERY_SLOW_MS are kept with their query plan
+QUERY_STATS = False
+QUERY_SLOW_MS = 50
+QUERY_SLOW_LOG_SIZE = 20
+
 POSITION_QUOTAS = {
     "Manager": 3,
     "Sales": 6,
@@ -1,11 +1,362 @@
+import calendar
+import functools
 import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+import config
+import timesheet
+from query_stats import QueryStats
+from time_utils import TimeHelper
+
+
+# Payroll breakdown columns persisted next to gross_pay/total_deductions/net_pay so a
+# stored payslip can be reopened without recomputing it.
+PAYROLL_BREAKDOWN_COLUMNS = [
+    ("monthly_salary", "REAL"),
+    ("daily_rate", "REAL"),
+    ("hourly_rate", "REAL"),
+    ("days_present", "REAL"),
+    ("approved_leaves_days", "REAL"),
+    ("days_absent", "REAL"),
+    ("total_overtime_hours", "REAL"),
+    ("base_pay", "REAL"),
+    ("overtime_pay", "REAL"),
+    ("sss", "REAL"),
+    ("pagibig", "REAL"),
+    ("philhealth", "REAL"),
+    ("tax", "REAL"),
+    ("absence_deduction", "REAL"),
+    ("total_tardiness_minutes", "INTEGER"),
+    ("total_undertime_minutes", "INTEGER"),
+    ("tardiness_deduction", "REAL"),
+    ("undertime_deduction", "REAL"),
+    ("loan_deduction", "REAL"),
+    ("total_mandatory_deductions", "REAL"),
+]
+
+# Payroll amounts accumulated per employee and year in payroll_ytd.
+PAYROLL_YTD_COLUMNS = ["gross_pay", "sss", "pagibig", "philhealth", "tax", "loan_deduction", "net_pay"]
+# Of those, the deductions that payslips stored before the breakdown columns existed
+# lack; such periods are counted in payroll_ytd.incomplete rather than summed as zeros
+PAYROLL_YTD_BREAKDOWN = [name for name in PAYROLL_YTD_COLUMNS if name in dict(PAYROLL_BREAKDOWN_COLUMNS)]
+
+
+def _add_missing_columns(table, columns):
+    """Return a migration step that adds each (name, type) column not yet on `table`."""
+    def step(cursor):
+        existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        for name, col_type in columns:
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+    return step
+
+
+def _backfill_attendance_seconds(cursor):
+    rows = cursor.execute("SELECT employee_id, date, time_in, time_out FROM attendance").fetchall()
+    cursor.executemany(
+        "UPDATE attendance SET epoch_day = ?, in_seconds = ?, out_seconds = ? WHERE employee_id = ? AND date = ?",
+        [TimeHelper.punch_seconds(d, time_in, time_out) + (emp_id, d) for emp_id, d, time_in, time_out in rows]
+    )
+
+
+def _parse_period_key(month_year):
+    """Return (year, month, period) for a payroll.month_year key, or None if unrecognized.
+
+    Keys are 'December 2025 - 1st Half (1-15)' as PayrollSystem.period_key writes them,
+    or the 'YYYY-MM-P' form of older rows.
+    """
+    label, _, half = (month_year or '').partition(' - ')
+    if half:
+        month_name, _, year = label.partition(' ')
+        months = [name.lower() for name in calendar.month_name]
+        if month_name.lower() not in months or not year.isdigit():
+            return None
+        period = 1 if half.startswith('1st') else 2 if half.startswith('2nd') else None
+        return (int(year), months.index(month_name.lower()), period) if period else None
+    parts = label.split('-')
+    if len(parts) == 3 and all(part.isdigit() for part in parts) and 1 <= int(parts[1]) <= 12 and parts[2] in ('1', '2'):
+        return int(parts[0]), int(parts[1]), int(parts[2])
+    return None
+
+
+def _backfill_payroll_periods(cursor):
+    """Fill payroll.year/month/period from month_year.
+
+    When an employee has rows under both key forms for one period, only the current
+    'Month YYYY - ...' row gets the columns, as the unique index allows one per period.
+    """
+    # Old-format keys start with the year, so they sort last
+    rows = cursor.execute("SELECT employee_id, month_year FROM payroll ORDER BY month_year GLOB '[0-9]*'").fetchall()
+    claimed, updates = set(), []
+    for employee_id, month_year in rows:
+        parsed = _parse_period_key(month_year)
+        if parsed is None or (employee_id,) + parsed in claimed:
+            continue
+        claimed.add((employee_id,) + parsed)
+        updates.append(parsed + (employee_id, month_year))
+    cursor.executemany("UPDATE payroll SET year = ?, month = ?, period = ? WHERE employee_id = ? AND month_year = ?", updates)
+
+
+def _backfill_payroll_ytd(cursor):
+    cursor.execute("DELETE FROM payroll_ytd")
+    cursor.execute(f"""
+        INSERT INTO payroll_ytd (employee_id, year, {', '.join(PAYROLL_YTD_COLUMNS)}, periods, incomplete)
+        SELECT employee_id, year, {', '.join(f'COALESCE(SUM({name}), 0)' for name in PAYROLL_YTD_COLUMNS)}, COUNT(*),
+               SUM({' OR '.join(f'{name} IS NULL' for name in PAYROLL_YTD_BREAKDOWN)})
+        FROM payroll WHERE year IS NOT NULL
+        GROUP BY employee_id, year
+    """)
+
+
+# Upsert of one attendance row: a NULL time keeps the stored one, and the integer
+# columns are recomputed from the merged row. Parameters are employee_id, date,
+# time_in, time_out followed by TimeHelper.punch_seconds() of the new values.
+ATTENDANCE_UPSERT = """
+    INSERT INTO attendance (employee_id, date, time_in, time_out, epoch_day, in_seconds, out_seconds)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(employee_id, date) DO UPDATE SET
+        time_in = COALESCE(excluded.time_in, attendance.time_in),
+        time_out = COALESCE(excluded.time_out, attendance.time_out),
+        epoch_day = excluded.epoch_day,
+        in_seconds = COALESCE(excluded.in_seconds, attendance.in_seconds),
+        out_seconds = CASE
+            WHEN COALESCE(excluded.out_seconds, attendance.out_seconds) % 86400
+                <= COALESCE(excluded.in_seconds, attendance.in_seconds)
+            THEN COALESCE(excluded.out_seconds, attendance.out_seconds) % 86400 + 86400
+            ELSE COALESCE(excluded.out_seconds, attendance.out_seconds) % 86400
+        END
+"""
+
+
+# Ordered schema migrations. Migration N (1-based position in this list) is applied
+# once, when PRAGMA user_version is below N. Each step is either an SQL statement or a
+# callable taking a cursor, and must be safe to re-run against a partially upgraded file.
+MIGRATIONS = [
+    # 1: approved-leave lookups filter on (employee_id, status, date) and read leave_type
+    [
+        "CREATE INDEX IF NOT EXISTS idx_leaves_emp_status_date ON leaves (employee_id, status, date, leave_type)",
+    ],
+    # 2: open-loan lookups filter on (employee_id, status, remaining_balance)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_loans_emp_status_balance ON loans (employee_id, status, remaining_balance, date_requested)",
+    ],
+    # 3: position quota check in EmployeeManager.add_employee
+    [
+        "CREATE INDEX IF NOT EXISTS idx_employees_position ON employees (position)",
+    ],
+    # 4: period-wide attendance range scans for reports and batch payroll
+    [
+        "CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date, employee_id, time_in, time_out)",
+    ],
+    # 5: full payslip breakdown plus a fingerprint of the inputs it was computed from
+    [
+        _add_missing_columns("payroll", PAYROLL_BREAKDOWN_COLUMNS + [("fingerprint", "TEXT"), ("finalized_at", "TEXT")]),
+    ],
+    # 6: closed pay periods, keyed like payroll.month_year
+    [
+        """
+        CREATE TABLE IF NOT EXISTS payroll_periods (
+            month_year TEXT PRIMARY KEY,
+            locked INTEGER NOT NULL DEFAULT 0,
+            locked_at TEXT
+        )
+        """,
+    ],
+    # 7: per-loan deductions of each finalized payslip, so regenerating a period
+    # restores the balances it took instead of deducting twice
+    [
+        """
+        CREATE TABLE IF NOT EXISTS payroll_loan_deductions (
+            employee_id TEXT,
+            month_year TEXT,
+            loan_id INTEGER,
+            amount REAL,
+            PRIMARY KEY (month_year, employee_id, loan_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_payroll_loan_deductions_loan ON payroll_loan_deductions (loan_id, month_year)",
+    ],
+    # 8: keyset pagination of the leave and loan lists, optionally filtered by status
+    [
+        "CREATE INDEX IF NOT EXISTS idx_leaves_date ON leaves (date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_leaves_status_date ON leaves (status, date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_loans_date ON loans (date_requested, id)",
+        "CREATE INDEX IF NOT EXISTS idx_loans_status_date ON loans (status, date_requested, id)",
+    ],
+    # 9: integer attendance: days since 1970-01-01 and seconds from the start of that day,
+    # with overnight time-outs past 86400; payroll range scans read these instead of text
+    [
+        _add_missing_columns("attendance", [("epoch_day", "INTEGER"), ("in_seconds", "INTEGER"), ("out_seconds", "INTEGER")]),
+        _backfill_attendance_seconds,
+        "DROP INDEX IF EXISTS idx_attendance_date",
+        "CREATE INDEX IF NOT EXISTS idx_attendance_day ON attendance (epoch_day, employee_id, date, in_seconds, out_seconds)",
+    ],
+    # 10: per-day worked, tardiness, undertime and overtime minutes, written with the
+    # attendance row (see timesheet.py) so period summaries are a SUM
+    [
+        """
+        CREATE TABLE IF NOT EXISTS timesheet (
+            employee_id TEXT,
+            epoch_day INTEGER,
+            date TEXT,
+            shift TEXT,
+            scheduled INTEGER,
+            present INTEGER,
+            worked_minutes INTEGER,
+            tardiness_minutes INTEGER,
+            undertime_minutes INTEGER,
+            overtime_minutes INTEGER,
+            PRIMARY KEY (employee_id, epoch_day)
+        )
+        """,
+        timesheet.backfill,
+    ],
+    # 11: integer pay period columns, so history and period totals are indexed range
+    # queries; the unique index makes a new payslip replace an old-format row
+    [
+        _add_missing_columns("payroll", [("year", "INTEGER"), ("month", "INTEGER"), ("period", "INTEGER")]),
+        _backfill_payroll_periods,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_payroll_emp_period ON payroll (employee_id, year, month, period)",
+        "CREATE INDEX IF NOT EXISTS idx_payroll_period ON payroll (year, month, period)",
+    ],
+    # 12: year-to-date totals per employee, kept current by PayrollSystem.apply_payroll_batch
+    [
+        f"""
+        CREATE TABLE IF NOT EXISTS payroll_ytd (
+            employee_id TEXT,
+            year INTEGER,
+            {' '.join(f'{name} REAL NOT NULL DEFAULT 0,' for name in PAYROLL_YTD_COLUMNS)}
+            periods INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (employee_id, year)
+        )
+        """,
+    ],
+    # 13: count the periods whose legacy payslips have no breakdown instead of adding them
+    # as zeros, and fill payroll_ytd from the payslips
+    [
+        _add_missing_columns("payroll_ytd", [("incomplete", "INTEGER NOT NULL DEFAULT 0")]),
+        _backfill_payroll_ytd,
+    ],
+]
+
+
+def _apply_pragmas(conn, writer):
+    if writer:
+        conn.execute(f"PRAGMA journal_mode={config.DB_JOURNAL_MODE}")
+        conn.execute(f"PRAGMA synchronous={config.DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size={config.DB_CACHE_SIZE:d}")
+    conn.execute(f"PRAGMA mmap_size={config.DB_MMAP_SIZE:d}")
+    conn.execute(f"PRAGMA temp_store={config.DB_TEMP_STORE}")
+
+
+class ConnectionManager:
+    """One serialized writer connection plus a read-only connection per thread.
+
+    PayrollSystem and the managers accept it in place of a raw connection: their reads
+    go through the calling thread's `reader()` and their writes run on `writer` while
+    holding `write_lock`, so they can be used from background threads. Short-lived
+    threads should read inside `closing_reader()`; readers of threads that exited
+    without it are closed the next time a reader is opened.
+    """
+
+    def __init__(self, db_name, query_stats=None):
+        self.db_name = db_name
+        # Optional query_stats.QueryStats; its connections time every statement
+        self.query_stats = query_stats
+        self._connect = query_stats.connect if query_stats is not None else sqlite3.connect
+        self.writer = self._connect(db_name, check_same_thread=False)
+        _apply_pragmas(self.writer, writer=True)
+        self.write_lock = threading.RLock()
+        self._local = threading.local()
+        # {thread: its reader}; weak, so finished threads are not kept alive by it
+        self._readers = weakref.WeakKeyDictionary()
+        self._readers_lock = threading.Lock()
+        # An in-memory database cannot be reopened, so it is read through the writer
+        self._shared = db_name in ("", ":memory:")
+
+    def reader(self):
+        """Return this thread's read-only connection, opening it on first use."""
+        if self._shared:
+            return self.writer
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect(
+                f"{Path(self.db_name).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+            )
+            _apply_pragmas(conn, writer=False)
+            self._local.conn = conn
+            with self._readers_lock:
+                for thread in [thread for thread in self._readers if not thread.is_alive()]:
+                    self._readers.pop(thread).close()
+                self._readers[threading.current_thread()] = conn
+        return conn
+
+    def release_reader(self):
+        """Close this thread's reader, if it has one; the next `reader()` opens a new one."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._readers_lock:
+            self._readers.pop(threading.current_thread(), None)
+        conn.close()
+
+    @contextmanager
+    def closing_reader(self):
+        """Yield this thread's reader and close it on exit, e.g. around a background job."""
+        try:
+            yield self.reader()
+        finally:
+            self.release_reader()
+
+    @contextmanager
+    def write(self):
+        """Hold the write lock and yield the writer; commit on success, roll back on error."""
+        with self.write_lock:
+            try:
+                yield self.writer
+                self.writer.commit()
+            except Exception:
+                self.writer.rollback()
+                raise
+
+    def close(self):
+        with self._readers_lock:
+            for conn in list(self._readers.values()):
+                conn.close()
+            self._readers.clear()
+        self.writer.close()
+
+
+def connections(db):
+    """Return (writer connection, reader callable, write lock) for a connection or ConnectionManager."""
+    if isinstance(db, ConnectionManager):
+        return db.writer, db.reader, db.write_lock
+    return db, lambda: db, threading.RLock()
+
+
+def serialized_write(method):
+    """Run a manager method while holding its `_write_lock`."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class AppDB:
-    def __init__(self, db_name):
-        self.conn = sqlite3.connect(db_name)
+    def __init__(self, db_name, query_stats=None):
+        if query_stats is None and config.QUERY_STATS:
+            query_stats = QueryStats()
+        self.connections = ConnectionManager(db_name, query_stats)
+        self.query_stats = query_stats
+        self.conn = self.connections.writer
         self.cursor = self.conn.cursor()
         self._create_tables()
+        self._apply_migrations()
 
     def _create_tables(self):
         self.cursor.execute("""
@@ -60,5 +411,26 @@ class AppDB:
         """)
         self.conn.commit()
 
+    def schema_version(self):
+        return self.cursor.execute("PRAGMA user_version").fetchone()[0]
+
+    def _apply_migrations(self):
+        current = self.schema_version()
+        for version, steps in enumerate(MIGRATIONS, start=1):
+            if version <= current:
+                continue
+            try:
+                self.cursor.execute("BEGIN")
+                for step in steps:
+                    if callable(step):
+                        step(self.cursor)
+                    else:
+                        self.cursor.execute(step)
+                self.cursor.execute(f"PRAGMA user_version = {version:d}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
     def close(self):
-        self.conn.close()
+        self.connections.close()
@@ -1,41 +1,182 @@
-from datetime import datetime
+import bisect
+import threading
+from datetime import datetime, timedelta
 import config
+from database import ATTENDANCE_UPSERT, connections, serialized_write
+import timesheet
+from search_index import EmployeeSearchIndex
+from time_utils import TimeHelper
+
+
+class EmployeeDirectory:
+    """In-memory copy of the employees table, owned and kept current by EmployeeManager.
+
+    Rows are (id, name, position, department, salary) as in get_all_employees. The table
+    is read once, on first use; after that EmployeeManager applies each add, update and
+    delete it commits, and subscribers are called with (event, employee_id, row) where
+    event is "added", "updated", "deleted" or "reloaded" (with no ID or row). Writes made
+    by other processes are only seen after `reload`.
+    """
+
+    def __init__(self, load_rows):
+        self._load_rows = load_rows
+        self._rows = None
+        self._ids = []
+        self._position_counts = {}
+        self._labels = None
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _publish(self, event, employee_id, row):
+        for listener in list(self._listeners):
+            listener(event, employee_id, row)
+
+    def _loaded(self):
+        with self._lock:
+            if self._rows is None:
+                self._fill(self._load_rows())
+            return self._rows
+
+    def _fill(self, rows):
+        self._rows = {row[0]: tuple(row) for row in rows}
+        self._ids = sorted(self._rows)
+        self._position_counts = {}
+        for row in self._rows.values():
+            self._position_counts[row[2]] = self._position_counts.get(row[2], 0) + 1
+        self._labels = None
+
+    def reload(self):
+        """Re-read the whole table, e.g. after another process changed it."""
+        with self._lock:
+            self._fill(self._load_rows())
+        self._publish("reloaded", None, None)
+
+    def get(self, employee_id):
+        return self._loaded().get(employee_id)
+
+    def exists(self, employee_id):
+        return employee_id in self._loaded()
+
+    def position_count(self, position):
+        with self._lock:
+            self._loaded()
+            return self._position_counts.get(position, 0)
+
+    def rows(self):
+        """Return every row ordered by ID."""
+        with self._lock:
+            rows = self._loaded()
+            return [rows[emp_id] for emp_id in self._ids]
+
+    def labels(self):
+        """Return the "ID - Name" strings the employee combos show, ordered by ID."""
+        with self._lock:
+            rows = self._loaded()
+            if self._labels is None:
+                self._labels = [f"{emp_id} - {rows[emp_id][1]}" for emp_id in self._ids]
+            return self._labels
+
+    def page(self, after=None, limit=None):
+        """Return up to `limit` rows with IDs after `after`, ordered by ID."""
+        with self._lock:
+            rows = self._loaded()
+            start = 0 if after is None else bisect.bisect_right(self._ids, after)
+            return [rows[emp_id] for emp_id in self._ids[start:start + limit]]
+
+    def _put(self, row):
+        with self._lock:
+            rows = self._loaded()
+            previous = rows.get(row[0])
+            if previous is None:
+                bisect.insort(self._ids, row[0])
+            else:
+                self._position_counts[previous[2]] -= 1
+            rows[row[0]] = row
+            self._position_counts[row[2]] = self._position_counts.get(row[2], 0) + 1
+            self._labels = None
+        self._publish("added" if previous is None else "updated", row[0], row)
+
+    def _remove(self, employee_id):
+        with self._lock:
+            row = self._loaded().pop(employee_id, None)
+            if row is None:
+                return
+            del self._ids[bisect.bisect_left(self._ids, employee_id)]
+            self._position_counts[row[2]] -= 1
+            self._labels = None
+        self._publish("deleted", employee_id, row)
 
 
 class EmployeeManager:
-    def __init__(self, db_conn):
-        self.conn = db_conn
+    def __init__(self, db_conn, punch_queue=None):
+        # db_conn is a sqlite3 connection or a database.ConnectionManager
+        self.conn, self._reader, self._write_lock = connections(db_conn)
+        # Optional punch_queue.PunchQueue that batches time-clock writes into group commits
+        self.punch_queue = punch_queue
+        # Callables taking an employee ID, run after its position/department changes or it is deleted
+        self.position_listeners = []
+        # Callables taking an employee ID, run after its record or attendance is written
+        self.change_listeners = []
+        self.directory = EmployeeDirectory(self._load_directory)
+        self.search_index = EmployeeSearchIndex(self.directory)
 
-    def get_all_employees(self):
-        cursor = self.conn.cursor()
+    def _notify_position_change(self, emp_id):
+        for listener in self.position_listeners:
+            listener(emp_id)
+
+    def _notify_change(self, emp_id):
+        for listener in self.change_listeners:
+            listener(emp_id)
+
+    def _load_directory(self):
+        cursor = self._reader().cursor()
         employees = cursor.execute("SELECT id, name, position, department, salary FROM employees ORDER BY id").fetchall()
         cursor.close()
         return employees
 
+    def _stored_row(self, cursor, emp_id):
+        # Read back what was written, so the directory holds the same values as the table
+        return tuple(cursor.execute(
+            "SELECT id, name, position, department, salary FROM employees WHERE id=?", (emp_id,)
+        ).fetchone())
+
+    def get_all_employees(self):
+        return self.directory.rows()
+
+    def get_employees_page(self, after=None, limit=None):
+        """Return (rows, next_cursor) for one page of employees ordered by ID.
+
+        Pass the returned cursor (the last ID) as `after` for the next page; it is None
+        on the last page.
+        """
+        limit = limit or config.PAGE_SIZE
+        rows = self.directory.page(after, limit)
+        next_cursor = rows[-1][0] if len(rows) == limit else None
+        return rows, next_cursor
+
     def get_employee_by_id(self, employee_id):
-        cursor = self.conn.cursor()
-        employee = cursor.execute("SELECT id, name, position, department, salary FROM employees WHERE id=?", (employee_id,)).fetchone()
-        cursor.close()
-        return employee
+        return self.directory.get(employee_id)
 
     def get_employee_name(self, employee_id):
-        cursor = self.conn.cursor()
-        result = cursor.execute("SELECT name FROM employees WHERE id=?", (employee_id,)).fetchone()
-        cursor.close()
-        return result[0] if result else None
+        employee = self.directory.get(employee_id)
+        return employee[1] if employee else None
 
     def employee_exists(self, employee_id):
-        cursor = self.conn.cursor()
-        result = cursor.execute("SELECT 1 FROM employees WHERE id=?", (employee_id,)).fetchone()
-        cursor.close()
-        return result is not None
+        return self.directory.exists(employee_id)
 
+    @serialized_write
     def add_employee(self, emp_id, name, position, department, salary):
         cursor = self.conn.cursor()
 
         if position in config.POSITION_QUOTAS:
-            count = cursor.execute("SELECT COUNT(*) FROM employees WHERE position=?", (position,)).fetchone()[0]
-            if count >= config.POSITION_QUOTAS[position]:
+            if self.directory.position_count(position) >= config.POSITION_QUOTAS[position]:
                 cursor.close()
                 return False, f"Maximum for {position} is {config.POSITION_QUOTAS[position]}."
 
@@ -43,41 +184,75 @@ class EmployeeManager:
             cursor.execute("INSERT INTO employees VALUES (?, ?, ?, ?, ?)",
                            (emp_id, name, position, department, salary))
             self.conn.commit()
-            cursor.close()
-            return True, f"Employee {emp_id} ({name}) added successfully."
         except Exception:
             cursor.close()
             return False, f"Employee ID {emp_id} already exists or cannot be added."
 
+        # Committed: subscribers run outside the try so their errors are not reported as a failed add
+        self.directory._put(self._stored_row(cursor, emp_id))
+        cursor.close()
+        self._notify_change(emp_id)
+        return True, f"Employee {emp_id} ({name}) added successfully."
+
+    @serialized_write
     def update_employee(self, emp_id, name, position, department, salary):
         cursor = self.conn.cursor()
+        previous = self.directory.get(emp_id)
+        position_changed = previous is not None and previous[2:4] != (position, department)
         try:
             cursor.execute("""
                 UPDATE employees SET name=?, position=?, department=?, salary=? WHERE id=?
             """, (name, position, department, salary, emp_id))
+            if position_changed:
+                # The resolved shift changed, so every day is evaluated again
+                timesheet.refresh_employee(cursor, emp_id)
             self.conn.commit()
-            cursor.close()
-            return True, f"Employee {emp_id} details updated successfully."
         except Exception as e:
             cursor.close()
             return False, f"An unexpected error occurred during update: {e}"
 
+        if previous:
+            self.directory._put(self._stored_row(cursor, emp_id))
+        cursor.close()
+        if position_changed:
+            self._notify_position_change(emp_id)
+        self._notify_change(emp_id)
+        return True, f"Employee {emp_id} details updated successfully."
+
+    @serialized_write
     def delete_employee(self, emp_id):
         cursor = self.conn.cursor()
         try:
             cursor.execute("DELETE FROM leaves WHERE employee_id=?", (emp_id,))
             cursor.execute("DELETE FROM attendance WHERE employee_id=?", (emp_id,))
+            cursor.execute("DELETE FROM timesheet WHERE employee_id=?", (emp_id,))
             cursor.execute("DELETE FROM payroll WHERE employee_id=?", (emp_id,))
+            cursor.execute("DELETE FROM payroll_ytd WHERE employee_id=?", (emp_id,))
+            cursor.execute("DELETE FROM payroll_loan_deductions WHERE employee_id=?", (emp_id,))
             cursor.execute("DELETE FROM loans WHERE employee_id=?", (emp_id,))
             cursor.execute("DELETE FROM employees WHERE id=?", (emp_id,))
             self.conn.commit()
-            cursor.close()
-            return True, f"Employee {emp_id} deleted."
         except Exception as e:
             cursor.close()
             return False, f"Deletion failed: {e}"
 
+        cursor.close()
+        self.directory._remove(emp_id)
+        self._notify_position_change(emp_id)
+        self._notify_change(emp_id)
+        if self.punch_queue is not None:
+            self.punch_queue.invalidate(emp_id)
+        return True, f"Employee {emp_id} deleted."
+
     def time_in(self, employee_id):
+        # The queue orders punches under its own lock and, in durable mode, waits for the
+        # commit after releasing it; the write lock is only taken to write directly
+        if self.punch_queue is not None:
+            return self.punch_queue.time_in(employee_id)
+        return self._write_time_in(employee_id)
+
+    @serialized_write
+    def _write_time_in(self, employee_id):
         cursor = self.conn.cursor()
         today = datetime.now().strftime('%Y-%m-%d')
         time_now = datetime.now().strftime('%H:%M:%S')
@@ -92,43 +267,66 @@ class EmployeeManager:
             return False, f"Already clocked in today at {existing[0]}."
 
         try:
-            cursor.execute("""
-                INSERT INTO attendance (employee_id, date, time_in, time_out)
-                VALUES (?, ?, ?, NULL)
-                ON CONFLICT(employee_id, date) DO UPDATE SET time_in=?
-            """, (employee_id, today, time_now, time_now))
+            cursor.execute(
+                ATTENDANCE_UPSERT,
+                (employee_id, today, time_now, None) + TimeHelper.punch_seconds(today, time_now, None)
+            )
+            timesheet.refresh(cursor, [(employee_id, today)])
             self.conn.commit()
-            cursor.close()
-            return True, f"Clocked in at {time_now}."
         except Exception as e:
             cursor.close()
             return False, f"Clock in failed: {e}"
 
+        cursor.close()
+        self._notify_change(employee_id)
+        return True, f"Clocked in at {time_now}."
+
     def time_out(self, employee_id):
+        if self.punch_queue is not None:
+            return self.punch_queue.time_out(employee_id)
+        return self._write_time_out(employee_id)
+
+    @serialized_write
+    def _write_time_out(self, employee_id):
         cursor = self.conn.cursor()
-        today = datetime.now().strftime('%Y-%m-%d')
-        time_now = datetime.now().strftime('%H:%M:%S')
+        now = datetime.now()
+        shift_date = now.strftime('%Y-%m-%d')
+        time_now = now.strftime('%H:%M:%S')
 
         existing = cursor.execute(
             "SELECT time_in, time_out FROM attendance WHERE employee_id=? AND date=?",
-            (employee_id, today)
+            (employee_id, shift_date)
         ).fetchone()
 
         if not existing or not existing[0]:
-            cursor.close()
-            return False, "You must clock in before clocking out."
+            # An overnight shift is clocked out the day after its time-in
+            yesterday = (now - timedelta(days=1)).strftime('%Y-%m-%d')
+            previous = cursor.execute(
+                "SELECT time_in, time_out FROM attendance WHERE employee_id=? AND date=?",
+                (employee_id, yesterday)
+            ).fetchone()
+            if (previous and previous[0] and not previous[1]
+                    and TimeHelper.continues_overnight(previous[0], time_now, config.PUNCH_MAX_SHIFT_HOURS)):
+                shift_date, existing = yesterday, previous
+            else:
+                cursor.close()
+                return False, "You must clock in before clocking out."
 
         if existing[1]:
             cursor.close()
             return False, f"Already clocked out today at {existing[1]}."
 
         try:
+            _, _, out_seconds = TimeHelper.punch_seconds(shift_date, existing[0], time_now)
             cursor.execute("""
-                UPDATE attendance SET time_out=? WHERE employee_id=? AND date=?
-            """, (time_now, employee_id, today))
+                UPDATE attendance SET time_out=?, out_seconds=? WHERE employee_id=? AND date=?
+            """, (time_now, out_seconds, employee_id, shift_date))
+            timesheet.refresh(cursor, [(employee_id, shift_date)])
             self.conn.commit()
-            cursor.close()
-            return True, f"Clocked out at {time_now}."
         except Exception as e:
             cursor.close()
             return False, f"Clock out failed: {e}"
+
+        cursor.close()
+        self._notify_change(employee_id)
+        return True, f"Clocked out at {time_now}."
@@ -1,12 +1,25 @@
 from datetime import date, timedelta
 
+import config
+from database import connections, serialized_write
+
 
 class LeaveManager:
     def __init__(self, db_conn):
-        self.conn = db_conn
+        # db_conn is a sqlite3 connection or a database.ConnectionManager
+        self.conn, self._reader, self._write_lock = connections(db_conn)
+        # Callables taking an employee ID, run after one of its leaves is approved, rejected or deleted
+        self.change_listeners = []
+
+    def _notify_change(self, cursor, leave_id):
+        """Run the change listeners for the employee a leave belongs to; call before deleting it."""
+        row = cursor.execute("SELECT employee_id FROM leaves WHERE id=?", (leave_id,)).fetchone()
+        if row:
+            for listener in self.change_listeners:
+                listener(row[0])
 
     def get_all_leave_requests(self):
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         requests = cursor.execute("""
             SELECT l.id, l.employee_id, e.name, l.date, l.leave_type, l.status
             FROM leaves l
@@ -16,24 +29,67 @@ class LeaveManager:
         cursor.close()
         return requests
 
+    def get_leave_requests_page(self, after=None, limit=None, status=None, start_date=None, end_date=None):
+        """Return (rows, next_cursor) for one page of leave requests, newest first.
+
+        Rows match get_all_leave_requests. Pages are keyed on (date, id): pass the
+        returned cursor as `after` to fetch the next page; it is None on the last page.
+        Status and YYYY-MM-DD date bounds are filtered in SQL.
+        """
+        limit = limit or config.PAGE_SIZE
+        conditions, params = [], []
+        if status:
+            conditions.append("l.status = ?")
+            params.append(status)
+        if start_date:
+            conditions.append("l.date >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("l.date <= ?")
+            params.append(end_date)
+        if after:
+            conditions.append("(l.date, l.id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor = self._reader().cursor()
+        rows = cursor.execute(f"""
+            SELECT l.id, l.employee_id, e.name, l.date, l.leave_type, l.status
+            FROM leaves l
+            JOIN employees e ON l.employee_id = e.id
+            {where}
+            ORDER BY l.date DESC, l.id DESC
+            LIMIT ?
+        """, params + [limit]).fetchall()
+        cursor.close()
+        next_cursor = (rows[-1][3], rows[-1][0]) if len(rows) == limit else None
+        return rows, next_cursor
+
+    @serialized_write
     def approve_leave(self, leave_id):
         cursor = self.conn.cursor()
         cursor.execute("UPDATE leaves SET status='Approved' WHERE id=?", (leave_id,))
         self.conn.commit()
+        self._notify_change(cursor, leave_id)
         cursor.close()
 
+    @serialized_write
     def reject_leave(self, leave_id):
         cursor = self.conn.cursor()
         cursor.execute("UPDATE leaves SET status='Rejected' WHERE id=?", (leave_id,))
         self.conn.commit()
+        self._notify_change(cursor, leave_id)
         cursor.close()
 
+    @serialized_write
     def delete_leave(self, leave_id):
         cursor = self.conn.cursor()
+        self._notify_change(cursor, leave_id)
         cursor.execute("DELETE FROM leaves WHERE id=?", (leave_id,))
         self.conn.commit()
         cursor.close()
 
+    @serialized_write
     def submit_leave_request(self, employee_id, leave_date_str, leave_type):
         cursor = self.conn.cursor()
         
@@ -1,12 +1,25 @@
 from datetime import datetime
 
+import config
+from database import connections, serialized_write
+
 
 class LoanManager:
     def __init__(self, db_conn):
-        self.conn = db_conn
+        # db_conn is a sqlite3 connection or a database.ConnectionManager
+        self.conn, self._reader, self._write_lock = connections(db_conn)
+        # Callables taking an employee ID, run after one of its loans is approved or rejected
+        self.change_listeners = []
+
+    def _notify_change(self, cursor, loan_id):
+        """Run the change listeners for the employee a loan belongs to; call before deleting it."""
+        row = cursor.execute("SELECT employee_id FROM loans WHERE id=?", (loan_id,)).fetchone()
+        if row:
+            for listener in self.change_listeners:
+                listener(row[0])
 
     def get_all_loans(self):
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         loans = cursor.execute("""
             SELECT l.id, l.employee_id, e.name, l.amount, l.remaining_balance, l.date_requested, l.status
             FROM loans l
@@ -16,20 +29,62 @@ class LoanManager:
         cursor.close()
         return loans
 
+    def get_loans_page(self, after=None, limit=None, status=None, start_date=None, end_date=None):
+        """Return (rows, next_cursor) for one page of loans, most recently requested first.
+
+        Rows match get_all_loans. Pages are keyed on (date_requested, id): pass the
+        returned cursor as `after` to fetch the next page; it is None on the last page.
+        Status and YYYY-MM-DD request-date bounds are filtered in SQL.
+        """
+        limit = limit or config.PAGE_SIZE
+        conditions, params = [], []
+        if status:
+            conditions.append("l.status = ?")
+            params.append(status)
+        if start_date:
+            conditions.append("l.date_requested >= ?")
+            params.append(start_date)
+        if end_date:
+            # date_requested carries a time, so compare against the end of that day
+            conditions.append("l.date_requested <= ?")
+            params.append(f"{end_date} 23:59:59")
+        if after:
+            conditions.append("(l.date_requested, l.id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor = self._reader().cursor()
+        rows = cursor.execute(f"""
+            SELECT l.id, l.employee_id, e.name, l.amount, l.remaining_balance, l.date_requested, l.status
+            FROM loans l
+            JOIN employees e ON l.employee_id = e.id
+            {where}
+            ORDER BY l.date_requested DESC, l.id DESC
+            LIMIT ?
+        """, params + [limit]).fetchall()
+        cursor.close()
+        next_cursor = (rows[-1][5], rows[-1][0]) if len(rows) == limit else None
+        return rows, next_cursor
+
+    @serialized_write
     def approve_loan(self, loan_id):
         cursor = self.conn.cursor()
         cursor.execute("""
             UPDATE loans SET status='Approved', remaining_balance=amount WHERE id=?
         """, (loan_id,))
         self.conn.commit()
+        self._notify_change(cursor, loan_id)
         cursor.close()
 
+    @serialized_write
     def reject_loan(self, loan_id):
         cursor = self.conn.cursor()
         cursor.execute("UPDATE loans SET status='Rejected' WHERE id=?", (loan_id,))
         self.conn.commit()
+        self._notify_change(cursor, loan_id)
         cursor.close()
 
+    @serialized_write
     def submit_loan_request(self, employee_id, amount):
         cursor = self.conn.cursor()
 
@@ -1,18 +1,15 @@
-import config
-import database
-import payroll
-import employee
-import leave_management
-import loan_management
+import time
+
+_started_at = time.perf_counter()
+
+# Everything else is imported by app.py, or later by the screens that use it
 import app
-import time_utils as time_module 
-import schedule 
 
 
 def main():
-    application = app.EmployeeApp()
+    application = app.EmployeeApp(started_at=_started_at)
     application.mainloop()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,27 +1,188 @@
-import datetime
-from datetime import timedelta, time, date
-from time_utils import TimeHelper
+import calendar
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+from datetime import datetime, date
+from functools import lru_cache
+from pathlib import Path
+from time_utils import TimeHelper, UNIX_EPOCH_ORDINAL
 import config
+from database import PAYROLL_BREAKDOWN_COLUMNS, PAYROLL_YTD_BREAKDOWN, PAYROLL_YTD_COLUMNS, connections, serialized_write
+import shifts
+import timesheet
+import timesheet_vectorized
 
 
-class PayrollSystem:
+@lru_cache(maxsize=config.CALENDAR_CACHE_SIZE)
+def month_calendar(year, month):
+    """Return (date strings, workday mask) for every day of a month.
+
+    The mask holds True for Monday-Friday. Both tuples are shared between callers,
+    so each month is only laid out once per process.
+    """
+    first_weekday, days_in_month = calendar.monthrange(year, month)
+    dates = tuple(f"{year:04d}-{month:02d}-{day:02d}" for day in range(1, days_in_month + 1))
+    workdays = tuple((first_weekday + offset) % 7 < 5 for offset in range(days_in_month))
+    return dates, workdays
+
+
+# Report fields read back from a stored payslip, and the full payroll row layout.
+_STORED_COLUMNS = ["gross_pay", "total_deductions", "net_pay"] + [name for name, _ in PAYROLL_BREAKDOWN_COLUMNS]
+_PAYROLL_INSERT = f"""
+    INSERT OR REPLACE INTO payroll (
+        employee_id, month_year, year, month, period, {', '.join(_STORED_COLUMNS)}, fingerprint, finalized_at
+    )
+    VALUES ({', '.join('?' * (len(_STORED_COLUMNS) + 7))})
+"""
+# Positions of the payroll_ytd amounts in a payroll_row(), after its five key fields
+_YTD_ROW_INDEXES = [5 + _STORED_COLUMNS.index(name) for name in PAYROLL_YTD_COLUMNS]
+_YTD_UPSERT = f"""
+    INSERT INTO payroll_ytd (employee_id, year, {', '.join(PAYROLL_YTD_COLUMNS)}, periods, incomplete)
+    VALUES ({', '.join('?' * (len(PAYROLL_YTD_COLUMNS) + 4))})
+    ON CONFLICT(employee_id, year) DO UPDATE SET
+        {', '.join(f'{name} = {name} + excluded.{name}' for name in PAYROLL_YTD_COLUMNS)},
+        periods = periods + excluded.periods,
+        incomplete = incomplete + excluded.incomplete
+"""
+# Loan deductions finalized for pay period (?, ?, ?) or any later one, for the loan `l`.
+# Added back to its remaining_balance they give the balance the period opened with, which
+# does not change when later periods are finalized.
+_DEDUCTED_SINCE = """
+    SELECT COALESCE(SUM(d.amount), 0) FROM payroll_loan_deductions d
+    JOIN payroll p ON p.employee_id = d.employee_id AND p.month_year = d.month_year
+    WHERE d.loan_id = l.id AND d.employee_id = l.employee_id AND (p.year, p.month, p.period) >= (?, ?, ?)
+"""
+
+
+class EmployeeMonthSnapshot:
+    """Everything the attendance, schedule and payroll views read for one employee-month.
+
+    `employee` is (name, position, department, salary), or None for an unknown ID.
+    `attendance` holds (date, time_in, time_out, in_seconds, out_seconds) rows in date
+    order, `timesheet` maps their dates to (present, tardiness, undertime, overtime
+    minutes) from the timesheet table, `leaves` maps the dates of approved leaves to
+    their type and `loans` holds (loan_id, remaining_balance, deducted since the first
+    half, deducted since the second half) for the approved loans in deduction order. Snapshots are
+    read-only once loaded.
+    """
+
+    __slots__ = ('employee_id', 'month', 'year', 'employee', 'attendance', 'timesheet', 'leaves', 'loans')
+
+    # One statement, so the reads are a single round trip and see one consistent state
+    _QUERY = """
+        SELECT 'e', name, position, department, salary, NULL FROM employees WHERE id = ?
+        UNION ALL
+        SELECT 'a', date, time_in, time_out, in_seconds, out_seconds FROM attendance
+        WHERE employee_id = ? AND epoch_day BETWEEN ? AND ?
+        UNION ALL
+        SELECT 't', date, present, tardiness_minutes, undertime_minutes, overtime_minutes FROM timesheet
+        WHERE employee_id = ? AND epoch_day BETWEEN ? AND ?
+        UNION ALL
+        SELECT 'l', date, leave_type, NULL, NULL, NULL FROM leaves
+        WHERE employee_id = ? AND status = 'Approved' AND date BETWEEN ? AND ?
+        UNION ALL
+        SELECT 'n', l.id, l.remaining_balance, ({_DEDUCTED_SINCE}), ({_DEDUCTED_SINCE}), l.date_requested
+        FROM loans l
+        WHERE l.employee_id = ? AND l.status = 'Approved'
+    """.format(_DEDUCTED_SINCE=_DEDUCTED_SINCE)
+
+    def __init__(self, employee_id, month, year, employee, attendance, timesheet_days, leaves, loans):
+        self.employee_id = employee_id
+        self.month = month
+        self.year = year
+        self.employee = employee
+        self.attendance = attendance
+        self.timesheet = timesheet_days
+        self.leaves = leaves
+        self.loans = loans
+
+    @classmethod
+    def load(cls, cursor, employee_id, month, year):
+        """Load the snapshot of one employee-month."""
+        days_in_month = calendar.monthrange(year, month)[1]
+        first_day = date(year, month, 1).toordinal() - UNIX_EPOCH_ORDINAL
+        first_str, last_str = f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{days_in_month:02d}"
+
+        employee, attendance, timesheet_days, leaves, loans = None, [], {}, {}, []
+        for kind, a, b, c, d, e in cursor.execute(cls._QUERY, (
+            employee_id,
+            employee_id, first_day, first_day + days_in_month - 1,
+            employee_id, first_day, first_day + days_in_month - 1,
+            employee_id, first_str, last_str,
+            year, month, 1, year, month, 2, employee_id,
+        )):
+            if kind == 'e':
+                employee = (a, b, c, d)
+            elif kind == 'a':
+                attendance.append((a, b, c, d, e))
+            elif kind == 't':
+                timesheet_days[a] = (b, c, d, e)
+            elif kind == 'l':
+                leaves[a] = b
+            else:
+                loans.append((e, a, b, c or 0, d or 0))
+        attendance.sort()
+        loans.sort()
+        return cls(employee_id, month, year, employee, attendance, timesheet_days,
+                   leaves, [loan[1:] for loan in loans])
+
+    def records(self, start_str, end_str):
+        """Return the (date, in_seconds, out_seconds) rows between two YYYY-MM-DD dates."""
+        return [(d, in_seconds, out_seconds) for d, _, _, in_seconds, out_seconds in self.attendance
+                if start_str <= d <= end_str]
+
+    def timesheet_totals(self, dates, approved_leaves):
+        """Return (days_present, tardiness, undertime, overtime minutes) summed over `dates`.
+
+        Dates in `approved_leaves` are skipped, as in `timesheet.period_totals`.
+        """
+        totals = [0, 0, 0, 0]
+        for d in dates:
+            day = self.timesheet.get(d)
+            if day is not None and d not in approved_leaves:
+                for i, value in enumerate(day):
+                    totals[i] += value
+        return tuple(totals)
+
+    def approved_leaves(self, start_str, end_str):
+        """Return {date: leave_type} for approved leaves between two YYYY-MM-DD dates."""
+        return {d: leave_type for d, leave_type in self.leaves.items() if start_str <= d <= end_str}
 
-    POSITION_SHIFTS = {
-        "Manager": {"start": time(9, 0), "end": time(17, 0), "window_hours": 8},
-        "Sales": {"start": time(7, 0), "end": time(15, 0), "window_hours": 8},
-        "HR": {"start": time(8, 0), "end": time(16, 0), "window_hours": 8},
-        "Production Worker A": {"start": time(7, 0), "end": time(15, 0), "window_hours": 8},
-        "Production Worker B": {"start": time(15, 0), "end": time(23, 0), "window_hours": 8},
-    }
+    def open_loans(self, period):
+        """Return (loan_id, balance) of the open loans for this month's `period`, in deduction order.
 
-    GUARD_SHIFTS = [
-        {"start": time(6, 0), "end": time(14, 0), "window_hours": 8, "shift_name": "Shift A (6AM-2PM)"},
-        {"start": time(14, 0), "end": time(22, 0), "window_hours": 8, "shift_name": "Shift B (2PM-10PM)"},
-        {"start": time(22, 0), "end": time(6, 0), "window_hours": 8, "shift_name": "Shift C (10PM-6AM)"},
-    ]
+        Balances are as the period opened: anything it or a later period deducted is
+        added back, so recomputing a finalized period sees the same loans it saw the
+        first time, even after later periods were finalized.
+        """
+        open_loans = []
+        for loan_id, remaining_balance, first_half, second_half in self.loans:
+            balance = remaining_balance + (first_half if period == 1 else second_half)
+            if balance > 0:
+                open_loans.append((loan_id, balance))
+        return open_loans
+
+
+class PayrollSystem:
+
+    # Shift rules live in shifts.py so the time clock can use them without payroll
+    POSITION_SHIFTS = shifts.POSITION_SHIFTS
+    GUARD_SHIFTS = shifts.GUARD_SHIFTS
+    DEFAULT_SHIFT = shifts.DEFAULT_SHIFT
+    SHIFT_TABLE = shifts.SHIFT_TABLE
+    GUARD_SHIFT_TABLE = shifts.GUARD_SHIFT_TABLE
+    DEFAULT_SHIFT_ENTRY = shifts.DEFAULT_SHIFT_ENTRY
 
     def __init__(self, db_conn):
-        self.conn = db_conn
+        # db_conn is a sqlite3 connection or a database.ConnectionManager
+        self.conn, self._reader, self._write_lock = connections(db_conn)
+        self._schedule_cache = OrderedDict()
+        # Shared by the GUI thread and background jobs, so guarded by a lock
+        self._snapshot_cache = OrderedDict()
+        self._snapshot_generation = 0
+        self._cache_lock = threading.Lock()
 
     def calculate_daily_rate(self, monthly_salary):
         return monthly_salary / 20 if monthly_salary else 0
@@ -38,8 +199,29 @@ class PayrollSystem:
 
         return sss, pagibig, philhealth, tax
 
+    def get_period_range(self, month, year, period=1):
+        """Return (start_date, end_date, period_label) for a half-month pay period."""
+        if period == 1:
+            start_date = date(year, month, 1)
+            end_date = date(year, month, 15)
+            period_label = "1st Half (1-15)"
+        else:
+            start_date = date(year, month, 16)
+            end_date = date(year, month, calendar.monthrange(year, month)[1])
+            period_label = "2nd Half (16-End)"
+        return start_date, end_date, period_label
+
+    def _leave_entry(self, leave_type):
+        if leave_type == 'SL':
+            return ('SL', 1.0)
+        elif leave_type == 'VL':
+            return ('VL', 1.0)
+        elif leave_type == 'VLH':
+            return ('VLH', 0.5)
+        return (leave_type, 1.0)
+
     def get_approved_leaves(self, employee_id, start_date, end_date):
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         query = """
             SELECT date, leave_type
             FROM leaves
@@ -48,95 +230,148 @@ class PayrollSystem:
         cursor.execute(query, (employee_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')))
         leave_map = {}
         for d, lt in cursor.fetchall():
-            if lt == 'SL':
-                leave_map[d] = ('SL', 1.0)
-            elif lt == 'VL':
-                leave_map[d] = ('VL', 1.0)
-            elif lt == 'VLH':
-                leave_map[d] = ('VLH', 0.5)
-            else:
-                leave_map[d] = (lt, 1.0)
+            leave_map[d] = self._leave_entry(lt)
         cursor.close()
         return leave_map
 
-    def get_employee_schedule(self, employee_id, month, year):
-        cursor = self.conn.cursor()
-        employee_data = cursor.execute("SELECT position, department FROM employees WHERE id=?", (employee_id,)).fetchone()
-        if not employee_data:
-            cursor.close()
-            return {}, 0
+    resolve_shift = staticmethod(shifts.resolve_shift)
+    evaluate_day = staticmethod(shifts.evaluate_day)
+
+    def build_schedule(self, position, department, month, year):
+        """Build the month schedule for a position/department without touching the database.
 
-        position, department = employee_data
-        schedule = {}
-
-        start_date = date(year, month, 1)
-        end_date = (start_date.replace(day=28) + timedelta(days=4))
-        end_date = end_date - timedelta(days=end_date.day)
-
-        current = start_date
-        weekdays = 0
-        while current <= end_date:
-            if current.weekday() < 5:
-                if position.startswith("Security Guard") and department == "Security":
-                    if position == "Security Guard A":
-                        shift = self.GUARD_SHIFTS[0]
-                    elif position == "Security Guard B":
-                        shift = self.GUARD_SHIFTS[1]
-                    else:
-                        shift = self.GUARD_SHIFTS[2]
-
-                    schedule[current.strftime('%Y-%m-%d')] = f"{position}: {shift['shift_name']} (1HR Break)"
-                else:
-                    shift_def = self.POSITION_SHIFTS.get(position, {"start": time(8, 0), "end": time(16, 0), "window_hours": 8})
-                    schedule[current.strftime('%Y-%m-%d')] = (
-                        f"Work Day: {shift_def['start'].strftime('%I:%M %p')} - {shift_def['end'].strftime('%I:%M %p')} (1HR Break)"
-                    )
-                weekdays += 1
+        Schedules are cached per (position, department, year, month); callers get a copy.
+        """
+        key = (position, department, year, month)
+        with self._cache_lock:
+            cached = self._schedule_cache.get(key)
+            if cached is not None:
+                self._schedule_cache.move_to_end(key)
+        if cached is None:
+            shift = self.resolve_shift(position, department)
+            if shift["shift_name"]:
+                work_label = f"{position}: {shift['shift_name']} (1HR Break)"
             else:
-                schedule[current.strftime('%Y-%m-%d')] = "Rest Day (Weekend)"
-            current += timedelta(days=1)
+                work_label = shift["label"]
 
-        cursor.close()
-        return schedule, weekdays
+            dates, workdays = month_calendar(year, month)
+            schedule = {
+                d: work_label if is_workday else "Rest Day (Weekend)"
+                for d, is_workday in zip(dates, workdays)
+            }
+            cached = (schedule, sum(workdays))
+            with self._cache_lock:
+                self._schedule_cache[key] = cached
+                if len(self._schedule_cache) > config.SCHEDULE_CACHE_SIZE:
+                    self._schedule_cache.popitem(last=False)
 
-    def get_attendance_summary(self, employee_id, start_date, end_date):
-        cursor = self.conn.cursor()
+        schedule, weekdays = cached
+        return dict(schedule), weekdays
 
-        query = """
-            SELECT date, time_in, time_out
-            FROM attendance
-            WHERE employee_id = ? AND date BETWEEN ? AND ?
-            ORDER BY date
+    def invalidate_employee(self, employee_id):
+        """Forget the cached month snapshots of an employee after it was changed or deleted."""
+        self.invalidate_month_snapshots(employee_id)
+
+    def load_month_snapshot(self, employee_id, month, year):
+        """Read an EmployeeMonthSnapshot straight from the database, bypassing the cache."""
+        cursor = self._reader().cursor()
+        try:
+            return EmployeeMonthSnapshot.load(cursor, employee_id, month, year)
+        finally:
+            cursor.close()
+
+    def get_month_snapshot(self, employee_id, month, year):
+        """Return the EmployeeMonthSnapshot for (employee, month), from a small LRU cache.
+
+        Entries are dropped by `invalidate_month_snapshots`, which must be called after
+        any write to the employee, its attendance, leaves or loans.
         """
-        cursor.execute(query, (employee_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')))
-        records = cursor.fetchall()
+        key = (employee_id, year, month)
+        with self._cache_lock:
+            snapshot = self._snapshot_cache.get(key)
+            if snapshot is not None:
+                self._snapshot_cache.move_to_end(key)
+                return snapshot
+            generation = self._snapshot_generation
+
+        snapshot = self.load_month_snapshot(employee_id, month, year)
+        with self._cache_lock:
+            # Not cached if a write was invalidated while it loaded
+            if generation == self._snapshot_generation:
+                self._snapshot_cache[key] = snapshot
+                if len(self._snapshot_cache) > config.SNAPSHOT_CACHE_SIZE:
+                    self._snapshot_cache.popitem(last=False)
+        return snapshot
+
+    def invalidate_month_snapshots(self, employee_id=None):
+        """Drop the cached snapshots of one employee, or of everyone when no ID is given."""
+        with self._cache_lock:
+            self._snapshot_generation += 1
+            if employee_id is None:
+                self._snapshot_cache.clear()
+            else:
+                for key in [key for key in self._snapshot_cache if key[0] == employee_id]:
+                    del self._snapshot_cache[key]
+
+    def snapshot_schedule(self, snapshot):
+        """Return (schedule, workdays) for a snapshot's employee and month; ({}, 0) if unknown."""
+        if snapshot.employee is None:
+            return {}, 0
+        _, position, department, _ = snapshot.employee
+        return self.build_schedule(position, department, snapshot.month, snapshot.year)
 
-        approved_leaves = self.get_approved_leaves(employee_id, start_date, end_date)
+    def get_employee_schedule(self, employee_id, month, year):
+        return self.snapshot_schedule(self.get_month_snapshot(employee_id, month, year))
+
+    def scheduled_dates(self, start_date, end_date):
+        """Return the Monday-Friday dates between two dates of the same month, as YYYY-MM-DD."""
+        dates, workdays = month_calendar(start_date.year, start_date.month)
+        start_str, end_str = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+        return [d for d, is_workday in zip(dates, workdays) if is_workday and start_str <= d <= end_str]
+
+    def summarize_timesheet(self, totals, approved_leaves, scheduled):
+        """Build the `summarize_attendance` summary from summed timesheet rows.
 
-        full_schedule, _ = self.get_employee_schedule(employee_id, start_date.month, start_date.year)
-        schedule = {
-            d: full_schedule[d] for d in full_schedule
-            if start_date.strftime('%Y-%m-%d') <= d <= end_date.strftime('%Y-%m-%d')
+        `totals` are (days_present, tardiness, undertime, overtime minutes) over the
+        `scheduled` dates without an approved leave, as `timesheet.period_totals` returns
+        them; leave days are credited here from `approved_leaves`.
+        """
+        days_present, tardiness, undertime, overtime = totals
+        scheduled = set(scheduled)
+        return {
+            'days_present': float(days_present) + sum(days for d, (_, days) in approved_leaves.items() if d in scheduled),
+            'total_overtime_hours': round(overtime / 60.0, 2),
+            'total_working_days': len(scheduled),
+            'approved_leaves_days': sum(days for _, days in approved_leaves.values()),
+            'total_tardiness_minutes': tardiness,
+            'total_undertime_minutes': undertime,
         }
 
+    def summarize_attendance(self, shift, full_schedule, records, approved_leaves, start_date, end_date):
+        """Compute the attendance summary for one employee from already-loaded rows.
+
+        `shift` is the entry from `resolve_shift`, `records` are (date, in_seconds, out_seconds)
+        tuples and `approved_leaves` is the map returned by `get_approved_leaves`. No
+        queries are issued here.
+        """
+        start_str, end_str = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+        schedule = {d: label for d, label in full_schedule.items() if start_str <= d <= end_str}
+
         # determine expected working days for this period based on filtered schedule
         total_working_days = sum(1 for d, label in schedule.items() if 'Rest Day' not in label)
 
         attendance_map = {}
-        for d, tin, tout in records:
-            attendance_map[d] = (tin, tout)
+        for d, in_seconds, out_seconds in records:
+            attendance_map[d] = (in_seconds, out_seconds)
 
-        total_overtime_hours = 0.0
-        total_tardiness_minutes = 0.0
-        total_undertime_minutes = 0.0
+        total_overtime_minutes = 0
+        total_tardiness_minutes = 0
+        total_undertime_minutes = 0
 
         days_present = 0.0
-        logged_dates = set()
 
         for d in sorted(schedule.keys()):
-            day_label = schedule[d]
-
-            if "Rest Day" in day_label:
+            if "Rest Day" in schedule[d]:
                 continue
 
             if d in approved_leaves:
@@ -148,110 +383,39 @@ class PayrollSystem:
             if not tin_tout:
                 continue
 
-            time_in_str, time_out_str = tin_tout
+            in_seconds, out_seconds = tin_tout
 
-            if time_in_str and time_out_str:
-                logged_dates.add(d)
+            if in_seconds is not None and out_seconds is not None:
                 days_present += 1.0
 
-            try:
-                if "Shift" in day_label:
-                    shift = next((s for s in self.GUARD_SHIFTS if s["shift_name"] in day_label), None)
-                    if not shift:
-                        continue
-                    sch_start = shift["start"]
-                    sch_end = shift["end"]
-                    window_hours = shift["window_hours"]
-                else:
-                    emp_pos_row = cursor.execute("SELECT position FROM employees WHERE id=?", (employee_id,)).fetchone()
-                    emp_pos = emp_pos_row[0] if emp_pos_row else None
-                    shift_def = self.POSITION_SHIFTS.get(emp_pos, {"start": time(8, 0), "end": time(16, 0), "window_hours": 8})
-                    sch_start = shift_def["start"]
-                    sch_end = shift_def["end"]
-                    window_hours = shift_def["window_hours"]
-
-                paid_hours = window_hours - config.LUNCH_BREAK_HOURS
-
-                att_date = datetime.datetime.strptime(d, "%Y-%m-%d").date()
-                sch_start_dt = datetime.datetime.combine(att_date, sch_start)
-                sch_end_dt = datetime.datetime.combine(att_date, sch_end)
-                if sch_end <= sch_start:
-                    sch_end_dt += timedelta(days=1)
-
-                if time_in_str:
-                    time_in_dt = datetime.datetime.strptime(f"{d} {time_in_str}", "%Y-%m-%d %H:%M:%S")
-                else:
-                    time_in_dt = None
-
-                if time_out_str:
-                    time_out_dt = datetime.datetime.strptime(f"{d} {time_out_str}", "%Y-%m-%d %H:%M:%S")
-                else:
-                    time_out_dt = None
-
-                if time_out_dt and time_out_dt <= time_in_dt:
-                    time_out_dt += timedelta(days=1)
-
-                if time_in_dt and time_in_dt < sch_start_dt:
-                    time_in_dt = sch_start_dt
-
-                if time_in_dt and time_in_dt > sch_start_dt:
-                    tardiness_duration = time_in_dt - sch_start_dt
-                    total_tardiness_minutes += tardiness_duration.total_seconds() / 60.0
-
-                if time_out_dt and time_out_dt < sch_end_dt:
-                    undertime_duration = sch_end_dt - time_out_dt
-                    total_undertime_minutes += undertime_duration.total_seconds() / 60.0
-
-                if time_out_dt and time_out_dt > sch_end_dt:
-                    overtime_duration = time_out_dt - sch_end_dt
-                    total_overtime_hours += overtime_duration.total_seconds() / 3600.0
-
-                 # Use TimeHelper.calculate_overtime_hours to compute OT consistently
-                ot_hours = TimeHelper.calculate_overtime_hours(sch_start, sch_end, d, time_out_str)
-                if ot_hours is not None:
-                    total_overtime_hours += ot_hours
-
-            except Exception:
-                continue
+            tardiness, undertime, overtime = self.evaluate_day(
+                shift, TimeHelper.clock_minutes(in_seconds), TimeHelper.clock_minutes(out_seconds)
+            )
+            total_tardiness_minutes += tardiness
+            total_undertime_minutes += undertime
+            total_overtime_minutes += overtime
 
         total_leave_days = sum(v for _, v in approved_leaves.values())
 
-        cursor.close()
-
         return {
             'days_present': days_present,
-            'total_overtime_hours': round(total_overtime_hours, 2),
+            'total_overtime_hours': round(total_overtime_minutes / 60.0, 2),
             'total_working_days': total_working_days,
             'approved_leaves_days': total_leave_days,
-            'total_tardiness_minutes': round(total_tardiness_minutes, 2),
-            'total_undertime_minutes': round(total_undertime_minutes, 2),
+            'total_tardiness_minutes': total_tardiness_minutes,
+            'total_undertime_minutes': total_undertime_minutes,
         }
 
-    def calculate_pay(self, employee_id, month, year, period=1):
-        cursor = self.conn.cursor()
-        emp_row = cursor.execute("SELECT salary FROM employees WHERE id=?", (employee_id,)).fetchone()
-        if not emp_row:
-            cursor.close()
-            return None, "Employee not found."
+    def build_pay_report(self, monthly_salary, attendance, loans, month, year, period_label):
+        """Turn an attendance summary into a payroll report.
 
-        monthly_salary = emp_row[0]
+        `loans` are (loan_id, remaining_balance) tuples in deduction order. Returns the
+        report and the list of (deduct_now, loan_id) balance updates to apply.
+        """
         daily_rate = self.calculate_daily_rate(monthly_salary)
         hourly_rate = daily_rate / config.STANDARD_PAID_HOURS
         minute_rate = hourly_rate / 60.0
 
-        if period == 1:
-            start_date = date(year, month, 1)
-            end_date = date(year, month, 15)
-            period_label = "1st Half (1-15)"
-        else:
-            start_date = date(year, month, 16)
-            end_of_month = (date(year, month, 1).replace(day=28) + timedelta(days=4))
-            end_of_month = end_of_month - timedelta(days=end_of_month.day)
-            end_date = end_of_month
-            period_label = "2nd Half (16-End)"
-
-        attendance = self.get_attendance_summary(employee_id, start_date, end_date)
-
         total_working_days = attendance['total_working_days']
         days_present = attendance['days_present']
         total_overtime_hours = attendance['total_overtime_hours']
@@ -280,12 +444,7 @@ class PayrollSystem:
         total_mandatory_deductions = sss + pagibig + philhealth + tax
 
         loan_deduction = 0.0
-        loans = cursor.execute("""
-            SELECT id, remaining_balance FROM loans
-            WHERE employee_id = ? AND status = 'Approved' AND remaining_balance > 0
-            ORDER BY date_requested ASC
-        """, (employee_id,)).fetchall()
-
+        loan_updates = []
         remaining_to_deduct = gross_pay * 0.10
         for loan_id, remaining_balance in loans:
             if remaining_to_deduct <= 0:
@@ -293,7 +452,7 @@ class PayrollSystem:
             deduct_now = min(remaining_balance, remaining_to_deduct)
             loan_deduction += deduct_now
             remaining_to_deduct -= deduct_now
-            cursor.execute("UPDATE loans SET remaining_balance = remaining_balance - ? WHERE id = ?", (deduct_now, loan_id))
+            loan_updates.append((deduct_now, loan_id))
 
         total_deductions = total_mandatory_deductions + absence_deduction + total_time_based_deduction + loan_deduction
         net_pay = gross_pay - total_deductions
@@ -326,13 +485,579 @@ class PayrollSystem:
             'net_pay': round(net_pay, 2)
         }
 
-        period_key = f"{report['month']} - {report['period_label']}"
+        return report, loan_updates
+
+    def period_key(self, month, year, period=1):
+        """Return the payroll.month_year key, e.g. 'December 2025 - 1st Half (1-15)'."""
+        _, _, period_label = self.get_period_range(month, year, period)
+        return f"{date(year, month, 1).strftime('%B %Y')} - {period_label}"
+
+    def input_fingerprint(self, monthly_salary, position, department, records, approved_leaves, loans):
+        """Hash everything a payslip depends on, to tell whether a stored one is stale.
+
+        `loans` are (loan_id, balance) with balances as they stood before this period's
+        own deduction, so finalizing a period does not change its fingerprint.
+        """
+        payload = repr((
+            monthly_salary, position, department,
+            sorted(tuple(r) for r in records),
+            sorted(approved_leaves.items()),
+            [(loan_id, round(balance, 2)) for loan_id, balance in loans],
+            (config.SSS_RATE, config.PAGIBIG_RATE, config.PHILHEALTH_RATE, config.TAX_RATE,
+             config.STANDARD_PAID_HOURS, config.LUNCH_BREAK_HOURS),
+        ))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def payroll_row(self, employee_id, report, fingerprint, month, year, period):
+        """Return the `payroll` table row for a computed report, minus finalized_at."""
+        return (
+            (employee_id, self.period_key(month, year, period), year, month, period)
+            + (report['gross_pay'], report['total_deductions'], report['net_pay'])
+            + tuple(report[name] for name, _ in PAYROLL_BREAKDOWN_COLUMNS)
+            + (fingerprint,)
+        )
+
+    def _compute_pay(self, employee_id, month, year, period, snapshot):
+        """Return (report, loan_updates, fingerprint, error) for one employee without writing anything.
+
+        Every input is read from `snapshot`, the employee's EmployeeMonthSnapshot for the month.
+        """
+        if snapshot.employee is None:
+            return None, [], None, "Employee not found."
+
+        _, position, department, monthly_salary = snapshot.employee
+        start_date, end_date, period_label = self.get_period_range(month, year, period)
+        period_key = self.period_key(month, year, period)
+
+        start_str, end_str = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+        records = snapshot.records(start_str, end_str)
+        approved_leaves = {
+            d: self._leave_entry(leave_type) for d, leave_type in snapshot.approved_leaves(start_str, end_str).items()
+        }
+        loans = snapshot.open_loans(period)
+
+        if config.USE_TIMESHEET_TABLE:
+            scheduled = self.scheduled_dates(start_date, end_date)
+            attendance = self.summarize_timesheet(
+                snapshot.timesheet_totals(scheduled, approved_leaves), approved_leaves, scheduled
+            )
+        else:
+            full_schedule, _ = self.build_schedule(position, department, start_date.month, start_date.year)
+            attendance = self.summarize_attendance(
+                self.resolve_shift(position, department), full_schedule, records, approved_leaves, start_date, end_date
+            )
+        report, updates = self.build_pay_report(monthly_salary, attendance, loans, month, year, period_label)
+        fingerprint = self.input_fingerprint(monthly_salary, position, department, records, approved_leaves, loans)
+        loan_updates = [(employee_id, period_key, loan_id, amount) for amount, loan_id in updates]
+        return report, loan_updates, fingerprint, None
+
+    def is_period_locked(self, month, year, period=1):
+        cursor = self._reader().cursor()
+        row = cursor.execute(
+            "SELECT locked FROM payroll_periods WHERE month_year=?", (self.period_key(month, year, period),)
+        ).fetchone()
+        cursor.close()
+        return bool(row and row[0])
+
+    @serialized_write
+    def lock_period(self, month, year, period=1):
+        """Close a finalized period so its stored payslips are read instead of recomputed."""
+        period_key = self.period_key(month, year, period)
+        cursor = self.conn.cursor()
+        finalized = cursor.execute(
+            "SELECT COUNT(*) FROM payroll WHERE year=? AND month=? AND period=? AND fingerprint IS NOT NULL",
+            (year, month, period)
+        ).fetchone()[0]
+        if not finalized:
+            cursor.close()
+            return False, f"Finalize {period_key} before locking it."
+
         cursor.execute("""
-            INSERT OR REPLACE INTO payroll (employee_id, month_year, gross_pay, total_deductions, net_pay)
-            VALUES (?, ?, ?, ?, ?)
-        """, (employee_id, period_key, report['gross_pay'], report['total_deductions'], report['net_pay']))
+            INSERT OR REPLACE INTO payroll_periods (month_year, locked, locked_at) VALUES (?, 1, ?)
+        """, (period_key, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
         self.conn.commit()
         cursor.close()
+        return True, f"{period_key} locked."
+
+    @serialized_write
+    def unlock_period(self, month, year, period=1):
+        period_key = self.period_key(month, year, period)
+        cursor = self.conn.cursor()
+        cursor.execute("UPDATE payroll_periods SET locked=0, locked_at=NULL WHERE month_year=?", (period_key,))
+        self.conn.commit()
+        cursor.close()
+        return True, f"{period_key} unlocked."
+
+    def _stored_report(self, row, month, year, period):
+        """Rebuild a report dict from a `payroll` row selected with _STORED_COLUMNS."""
+        _, _, period_label = self.get_period_range(month, year, period)
+        report = {'month': date(year, month, 1).strftime("%B %Y"), 'period_label': period_label}
+        report.update(zip(_STORED_COLUMNS, row))
+        return report
+
+    def get_stored_period(self, month, year, period=1):
+        """Return {employee_id: report} of the finalized payslips stored for a period."""
+        cursor = self._reader().cursor()
+        rows = cursor.execute(f"""
+            SELECT employee_id, {', '.join(_STORED_COLUMNS)} FROM payroll
+            WHERE year = ? AND month = ? AND period = ? AND fingerprint IS NOT NULL
+        """, (year, month, period)).fetchall()
+        cursor.close()
+        return {row[0]: self._stored_report(row[1:], month, year, period) for row in rows}
+
+    def get_stored_report(self, employee_id, month, year, period=1):
+        """Return the finalized payslip stored for an employee and period, or None."""
+        cursor = self._reader().cursor()
+        row = cursor.execute(f"""
+            SELECT {', '.join(_STORED_COLUMNS)} FROM payroll
+            WHERE employee_id = ? AND year = ? AND month = ? AND period = ? AND fingerprint IS NOT NULL
+        """, (employee_id, year, month, period)).fetchone()
+        cursor.close()
+        return self._stored_report(row, month, year, period) if row else None
+
+    def get_payroll_history(self, employee_id, start=None, end=None):
+        """Return an employee's stored payslips in pay-period order.
+
+        `start` and `end` are optional inclusive (year, month, period) bounds. Returns
+        (year, month, period, report) tuples; rows stored before payslips were finalized
+        carry only the pay totals, with None for the breakdown.
+        """
+        conditions, params = ["employee_id = ?", "year IS NOT NULL"], [employee_id]
+        if start:
+            conditions.append("(year, month, period) >= (?, ?, ?)")
+            params.extend(start)
+        if end:
+            conditions.append("(year, month, period) <= (?, ?, ?)")
+            params.extend(end)
+        cursor = self._reader().cursor()
+        rows = cursor.execute(f"""
+            SELECT year, month, period, {', '.join(_STORED_COLUMNS)} FROM payroll
+            WHERE {' AND '.join(conditions)}
+            ORDER BY year, month, period
+        """, params).fetchall()
+        cursor.close()
+        history = []
+        for row in rows:
+            row_year, row_month, row_period = row[:3]
+            history.append((row_year, row_month, row_period,
+                            self._stored_report(row[3:], row_month, row_year, row_period)))
+        return history
+
+    def get_period_totals(self, month, year, period=1):
+        """Return the employee count and summed pay and deductions stored for a period."""
+        columns = ["gross_pay", "total_deductions", "net_pay", "sss", "pagibig", "philhealth", "tax", "loan_deduction"]
+        cursor = self._reader().cursor()
+        row = cursor.execute(f"""
+            SELECT COUNT(*), {', '.join(f'COALESCE(SUM({name}), 0)' for name in columns)} FROM payroll
+            WHERE year = ? AND month = ? AND period = ?
+        """, (year, month, period)).fetchone()
+        cursor.close()
+        totals = {'period': self.period_key(month, year, period), 'employees': row[0]}
+        totals.update((name, round(value, 2)) for name, value in zip(columns, row[1:]))
+        return totals
+
+    def preview_pay(self, employee_id, month, year, period=1):
+        """Compute a payslip with loan deductions simulated in memory; nothing is written.
+
+        For a locked period the stored payslip is returned instead of recomputing it.
+        """
+        if self.is_period_locked(month, year, period):
+            stored = self.get_stored_report(employee_id, month, year, period)
+            if stored:
+                return stored, None
+        snapshot = self.get_month_snapshot(employee_id, month, year)
+        report, _, _, error = self._compute_pay(employee_id, month, year, period, snapshot)
+        return report, error
 
+    @serialized_write
+    def calculate_pay(self, employee_id, month, year, period=1):
+        """Compute a payslip and commit it: store the payroll row and deduct loan balances.
+
+        Locked periods are never rewritten; their stored payslip is returned.
+        """
+        if self.is_period_locked(month, year, period):
+            stored = self.get_stored_report(employee_id, month, year, period)
+            if stored:
+                return stored, None
+            return None, f"{self.period_key(month, year, period)} is locked."
+
+        # Finalizing always reads fresh rows rather than a cached snapshot
+        snapshot = self.load_month_snapshot(employee_id, month, year)
+        report, loan_updates, fingerprint, error = self._compute_pay(employee_id, month, year, period, snapshot)
+        if error:
+            return None, error
+
+        self.apply_payroll_batch([self.payroll_row(employee_id, report, fingerprint, month, year, period)], loan_updates)
         return report, None
 
+    def load_period_inputs(self, start_date, end_date, id_range=None, period=None):
+        """Load everything a period-wide payroll run needs with one range query per table.
+
+        `id_range` optionally limits the load to employees whose ID falls between
+        (first_id, last_id) inclusive. With `period`, loan balances are as that period of
+        the start date's month opened (see `EmployeeMonthSnapshot.open_loans`). Returns
+        (employees, records_by_emp, leaves_by_emp, loans_by_emp), where employees are
+        (id, name, position, department, salary) rows ordered by ID.
+        """
+        start_str, end_str = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+        start_day, end_day = start_date.toordinal() - UNIX_EPOCH_ORDINAL, end_date.toordinal() - UNIX_EPOCH_ORDINAL
+        if id_range:
+            id_filter, id_params = " AND {column} BETWEEN ? AND ?", tuple(id_range)
+        else:
+            id_filter, id_params = "", ()
+
+        cursor = self._reader().cursor()
+        employees = cursor.execute(
+            "SELECT id, name, position, department, salary FROM employees WHERE 1=1"
+            + id_filter.format(column="id") + " ORDER BY id",
+            id_params
+        ).fetchall()
+
+        records_by_emp = {}
+        for emp_id, d, in_seconds, out_seconds in cursor.execute("""
+            SELECT employee_id, date, in_seconds, out_seconds
+            FROM attendance
+            WHERE epoch_day BETWEEN ? AND ?""" + id_filter.format(column="employee_id") + """
+            ORDER BY epoch_day
+        """, (start_day, end_day) + id_params):
+            records_by_emp.setdefault(emp_id, []).append((d, in_seconds, out_seconds))
+
+        leaves_by_emp = {}
+        for emp_id, d, lt in cursor.execute("""
+            SELECT employee_id, date, leave_type
+            FROM leaves
+            WHERE status = 'Approved' AND date BETWEEN ? AND ?""" + id_filter.format(column="employee_id") + """
+        """, (start_str, end_str) + id_params):
+            leaves_by_emp.setdefault(emp_id, {})[d] = self._leave_entry(lt)
+
+        # Without a period nothing is added back: comparisons with NULL match no deduction
+        since = (start_date.year, start_date.month, period) if period else (None, None, None)
+        loans_by_emp = {}
+        for loan_id, emp_id, balance in cursor.execute(f"""
+            SELECT l.id, l.employee_id, l.remaining_balance + ({_DEDUCTED_SINCE})
+            FROM loans l
+            WHERE l.status = 'Approved'""" + id_filter.format(column="l.employee_id") + """
+            ORDER BY l.date_requested ASC, l.id ASC
+        """, since + id_params):
+            if balance > 0:
+                loans_by_emp.setdefault(emp_id, []).append((loan_id, balance))
+
+        cursor.close()
+        return employees, records_by_emp, leaves_by_emp, loans_by_emp
+
+    def summarize_period(self, employees, records_by_emp, leaves_by_emp, start_date, end_date, use_numpy=None,
+                         totals=None):
+        """Return {employee_id: attendance summary} for every (id, position, department).
+
+        With `totals` from `timesheet.period_totals`, the summaries are built from them
+        and no punch is evaluated. Otherwise the array kernel in timesheet_vectorized is
+        used when NumPy is installed and config.USE_NUMPY_TIMESHEETS is on (or `use_numpy`
+        says so), else summarize_attendance per employee. All paths return identical summaries.
+        """
+        if totals is not None:
+            scheduled = self.scheduled_dates(start_date, end_date)
+            return {
+                emp_id: self.summarize_timesheet(
+                    totals.get(emp_id, (0, 0, 0, 0)), leaves_by_emp.get(emp_id, {}), scheduled
+                )
+                for emp_id, _, _ in employees
+            }
+        if use_numpy is None:
+            use_numpy = config.USE_NUMPY_TIMESHEETS
+        if use_numpy and timesheet_vectorized.available():
+            start_str, end_str = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+            dates, workdays = month_calendar(start_date.year, start_date.month)
+            period = [(d, w) for d, w in zip(dates, workdays) if start_str <= d <= end_str]
+            shifts = [self.resolve_shift(position, department) for _, position, department in employees]
+            return timesheet_vectorized.summarize_period(
+                [emp_id for emp_id, _, _ in employees], shifts,
+                [d for d, _ in period], [w for _, w in period],
+                records_by_emp, leaves_by_emp,
+            )
+
+        summaries = {}
+        for emp_id, position, department in employees:
+            full_schedule, _ = self.build_schedule(position, department, start_date.month, start_date.year)
+            summaries[emp_id] = self.summarize_attendance(
+                self.resolve_shift(position, department), full_schedule, records_by_emp.get(emp_id, []),
+                leaves_by_emp.get(emp_id, {}), start_date, end_date
+            )
+        return summaries
+
+    def compute_payroll_batch(self, month, year, period=1, id_range=None, only_changed=False):
+        """Compute payroll for every employee (or an ID range of them) without writing.
+
+        With `only_changed`, employees whose stored payslip fingerprint still matches
+        their current inputs are skipped. Returns (results, payroll_rows, loan_updates):
+        results are (employee_id, name, report) tuples ordered by ID, and the other two
+        are ready for `apply_payroll_batch`.
+        """
+        start_date, end_date, period_label = self.get_period_range(month, year, period)
+        period_key = self.period_key(month, year, period)
+        employees, records_by_emp, leaves_by_emp, loans_by_emp = self.load_period_inputs(
+            start_date, end_date, id_range, period
+        )
+
+        stored_fingerprints = {}
+        if only_changed:
+            cursor = self._reader().cursor()
+            stored_fingerprints = dict(cursor.execute(
+                """
+                SELECT employee_id, fingerprint FROM payroll
+                WHERE year = ? AND month = ? AND period = ? AND fingerprint IS NOT NULL
+                """,
+                (year, month, period)
+            ).fetchall())
+            cursor.close()
+
+        pending = []
+        for emp_id, name, position, department, monthly_salary in employees:
+            fingerprint = self.input_fingerprint(
+                monthly_salary, position, department, records_by_emp.get(emp_id, []),
+                leaves_by_emp.get(emp_id, {}), loans_by_emp.get(emp_id, [])
+            )
+            if stored_fingerprints.get(emp_id) != fingerprint:
+                pending.append((emp_id, name, position, department, monthly_salary, fingerprint))
+
+        totals = None
+        if config.USE_TIMESHEET_TABLE and pending:
+            cursor = self._reader().cursor()
+            totals = timesheet.period_totals(cursor, start_date, end_date, id_range=id_range)
+            cursor.close()
+        summaries = self.summarize_period(
+            [(emp_id, position, department) for emp_id, _, position, department, _, _ in pending],
+            records_by_emp, leaves_by_emp, start_date, end_date, totals=totals,
+        )
+
+        results = []
+        payroll_rows = []
+        loan_updates = []
+        for emp_id, name, position, department, monthly_salary, fingerprint in pending:
+            report, updates = self.build_pay_report(
+                monthly_salary, summaries[emp_id], loans_by_emp.get(emp_id, []), month, year, period_label
+            )
+            loan_updates.extend((emp_id, period_key, loan_id, amount) for amount, loan_id in updates)
+            payroll_rows.append(self.payroll_row(emp_id, report, fingerprint, month, year, period))
+            results.append((emp_id, name, report))
+
+        return results, payroll_rows, loan_updates
+
+    @serialized_write
+    def apply_payroll_batch(self, payroll_rows, loan_updates):
+        """Write computed payroll rows and their loan deductions in one transaction.
+
+        Deductions an earlier run recorded for the same employee and period are given
+        back to the loans first, so regenerating a period never deducts twice.
+        """
+        finalized_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        keys = {(row[0], row[1]) for row in payroll_rows}
+        cursor = self.conn.cursor()
+        try:
+            previous = []
+            for month_year in {month_year for _, month_year in keys}:
+                previous.extend(
+                    (amount, loan_id)
+                    for employee_id, loan_id, amount in cursor.execute(
+                        "SELECT employee_id, loan_id, amount FROM payroll_loan_deductions WHERE month_year = ?",
+                        (month_year,)
+                    ).fetchall()
+                    if (employee_id, month_year) in keys
+                )
+            cursor.executemany("UPDATE loans SET remaining_balance = remaining_balance + ? WHERE id = ?", previous)
+            cursor.executemany("DELETE FROM payroll_loan_deductions WHERE employee_id = ? AND month_year = ?", keys)
+
+            cursor.executemany(
+                "UPDATE loans SET remaining_balance = remaining_balance - ? WHERE id = ?",
+                [(amount, loan_id) for _, _, loan_id, amount in loan_updates]
+            )
+            cursor.executemany("""
+                INSERT INTO payroll_loan_deductions (employee_id, month_year, loan_id, amount)
+                VALUES (?, ?, ?, ?)
+            """, loan_updates)
+            cursor.executemany(_YTD_UPSERT, self._ytd_deltas(cursor, payroll_rows))
+            cursor.executemany(_PAYROLL_INSERT, [row + (finalized_at,) for row in payroll_rows])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        # Loan balances changed
+        self.invalidate_month_snapshots()
+
+    def _ytd_deltas(self, cursor, payroll_rows):
+        """Return payroll_ytd upsert rows adding `payroll_rows` and removing the rows they replace."""
+        deltas = {}
+        breakdown = [PAYROLL_YTD_COLUMNS.index(name) for name in PAYROLL_YTD_BREAKDOWN]
+
+        def add(employee_id, year, amounts, sign):
+            delta = deltas.setdefault((employee_id, year), [0.0] * len(PAYROLL_YTD_COLUMNS) + [0, 0])
+            for i, amount in enumerate(amounts):
+                delta[i] += sign * (amount or 0.0)
+            delta[-2] += sign
+            if any(amounts[i] is None for i in breakdown):
+                delta[-1] += sign
+
+        new_keys = {(row[0], row[2], row[3], row[4]) for row in payroll_rows}
+        for year, month, period in {key[1:] for key in new_keys}:
+            for row in cursor.execute(f"""
+                SELECT employee_id, {', '.join(PAYROLL_YTD_COLUMNS)} FROM payroll
+                WHERE year = ? AND month = ? AND period = ?
+            """, (year, month, period)).fetchall():
+                if (row[0], year, month, period) in new_keys:
+                    add(row[0], year, row[1:], -1)
+        for row in payroll_rows:
+            add(row[0], row[2], [row[i] for i in _YTD_ROW_INDEXES], 1)
+        return [key + tuple(delta) for key, delta in deltas.items()]
+
+    def get_ytd(self, employee_id, year):
+        """Return an employee's year-to-date totals from payroll_ytd, with zeros before any payslip.
+
+        `incomplete` counts the periods whose stored payslip predates the deduction
+        breakdown; while it is non-zero those deductions are None, as their totals are unknown.
+        """
+        cursor = self._reader().cursor()
+        row = cursor.execute(f"""
+            SELECT {', '.join(PAYROLL_YTD_COLUMNS)}, periods, incomplete FROM payroll_ytd
+            WHERE employee_id = ? AND year = ?
+        """, (employee_id, year)).fetchone()
+        cursor.close()
+        row = row or (0.0,) * len(PAYROLL_YTD_COLUMNS) + (0, 0)
+        ytd = {'employee_id': employee_id, 'year': year, 'periods': row[-2], 'incomplete': row[-1]}
+        ytd.update((name, round(amount, 2)) for name, amount in zip(PAYROLL_YTD_COLUMNS, row))
+        if ytd['incomplete']:
+            ytd.update(dict.fromkeys(PAYROLL_YTD_BREAKDOWN))
+        return ytd
+
+    def _database_path(self):
+        """Return the file behind this connection, or None for in-memory databases."""
+        for _, name, path in self.conn.execute("PRAGMA database_list"):
+            if name == "main":
+                return path or None
+        return None
+
+    def _payroll_shards(self, workers):
+        """Split the sorted employee IDs into at most `workers` contiguous (first, last) ranges."""
+        ids = [row[0] for row in self.conn.execute("SELECT id FROM employees ORDER BY id")]
+        workers = min(workers, -(-len(ids) // config.PAYROLL_MIN_EMPLOYEES_PER_WORKER))
+        if workers <= 1:
+            return []
+        size = -(-len(ids) // workers)
+        return [(ids[i], ids[min(i + size, len(ids)) - 1]) for i in range(0, len(ids), size)]
+
+    def _compute_all(self, month, year, period, workers, only_changed=False):
+        """Compute every employee's payroll, in a process pool when `workers` > 1.
+
+        With more than one worker and a file-backed database, contiguous ID ranges are
+        computed in worker processes over read-only connections. Results are combined in
+        ID order, so they do not depend on the worker count.
+        """
+        if workers is None:
+            workers = config.PAYROLL_WORKERS
+        db_path = self._database_path() if workers > 1 else None
+        shards = self._payroll_shards(workers) if db_path else []
+        if not shards:
+            return self.compute_payroll_batch(month, year, period, only_changed=only_changed)
+
+        results, payroll_rows, loan_updates = [], [], []
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            futures = [
+                executor.submit(_compute_payroll_shard, db_path, month, year, period, shard, only_changed)
+                for shard in shards
+            ]
+            for future in futures:
+                shard_results, shard_rows, shard_updates = future.result()
+                results.extend(shard_results)
+                payroll_rows.extend(shard_rows)
+                loan_updates.extend(shard_updates)
+        return results, payroll_rows, loan_updates
+
+    def _stored_results(self, month, year, period, workers):
+        """Results for a locked period: stored payslips, previews for anyone without one."""
+        stored = self.get_stored_period(month, year, period)
+        cursor = self._reader().cursor()
+        employees = cursor.execute("SELECT id, name FROM employees ORDER BY id").fetchall()
+        cursor.close()
+
+        computed = {}
+        if any(emp_id not in stored for emp_id, _ in employees):
+            results, _, _ = self._compute_all(month, year, period, workers)
+            computed = {emp_id: report for emp_id, _, report in results}
+        return [(emp_id, name, stored.get(emp_id) or computed[emp_id]) for emp_id, name in employees]
+
+    def preview_payroll_batch(self, month, year, period=1, workers=None):
+        """Compute every employee's payslip for a period without writing anything.
+
+        Loan deductions are simulated in memory, so previews can be repeated freely and
+        run alongside clock-ins. Locked periods return their stored payslips.
+        Returns (employee_id, name, report) tuples ordered by ID.
+        """
+        if self.is_period_locked(month, year, period):
+            return self._stored_results(month, year, period, workers)
+        results, _, _ = self._compute_all(month, year, period, workers)
+        return results
+
+    def iter_preview_payroll(self, month, year, period=1, chunk_size=None):
+        """Yield (results, done, total) while previewing a period in ID-ordered chunks.
+
+        Same reports as preview_payroll_batch, computed `chunk_size` employees at a time
+        (default `config.PAYROLL_PROGRESS_CHUNK`) so callers can show progress or stop early.
+        """
+        if self.is_period_locked(month, year, period):
+            results = self._stored_results(month, year, period, 1)
+            yield results, len(results), len(results)
+            return
+
+        cursor = self._reader().cursor()
+        ids = [row[0] for row in cursor.execute("SELECT id FROM employees ORDER BY id")]
+        cursor.close()
+        chunk_size = chunk_size or config.PAYROLL_PROGRESS_CHUNK
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            results, _, _ = self.compute_payroll_batch(month, year, period, (chunk[0], chunk[-1]))
+            yield results, i + len(chunk), len(ids)
+
+    @serialized_write
+    def calculate_payroll_batch(self, month, year, period=1, workers=None):
+        """Finalize payroll for every employee in one pass.
+
+        Employees, attendance, approved leaves and open loans for the period are loaded
+        with one range query each, and the payroll rows and loan balance updates are
+        written with `executemany` in a single transaction by this process alone. Each
+        report is identical to what `calculate_pay` returns for that employee, whatever
+        the worker count (default `config.PAYROLL_WORKERS`). A locked period is not
+        rewritten; its stored payslips are returned.
+
+        Returns a list of (employee_id, name, report) tuples ordered by employee ID.
+        """
+        if self.is_period_locked(month, year, period):
+            return self._stored_results(month, year, period, workers)
+        results, payroll_rows, loan_updates = self._compute_all(month, year, period, workers)
+        self.apply_payroll_batch(payroll_rows, loan_updates)
+        return results
+
+    @serialized_write
+    def regenerate_payroll_period(self, month, year, period=1, workers=None):
+        """Recompute and store only payslips whose inputs changed since they were finalized.
+
+        Employees with no stored payslip for the period are computed too. Returns
+        (results, unchanged_count), where results cover the recomputed employees only.
+        Locked periods are left untouched.
+        """
+        if self.is_period_locked(month, year, period):
+            return [], 0
+        results, payroll_rows, loan_updates = self._compute_all(month, year, period, workers, only_changed=True)
+        self.apply_payroll_batch(payroll_rows, loan_updates)
+        cursor = self.conn.cursor()
+        total = cursor.execute("SELECT COUNT(*) FROM employees").fetchone()[0]
+        cursor.close()
+        return results, total - len(results)
+
+
+def _compute_payroll_shard(db_path, month, year, period, id_range, only_changed=False):
+    """Process-pool entry point: compute one ID range over a read-only connection."""
+    conn = sqlite3.connect(f"{Path(db_path).as_uri()}?mode=ro", uri=True)
+    try:
+        return PayrollSystem(conn).compute_payroll_batch(month, year, period, id_range, only_changed)
+    finally:
+        conn.close()
@@ -0,0 +1,182 @@
+"""Bulk import of biometric punch exports into the attendance table.
+
+Terminals export one punch per line, as CSV with a header row or as JSON lines, with:
+
+- employee_id
+- timestamp as "YYYY-MM-DD HH:MM[:SS]" (or separate `date` and `time` fields)
+- direction (optional): "in" or "out"; without it punches alternate in/out
+
+Punches must be in chronological order per employee, which is how the terminals write
+them. An out punch is paired with the employee's open in punch when it falls within
+config.PUNCH_MAX_SHIFT_HOURS, so an overnight guard shift is stored on the date of its
+time-in, as `shifts.evaluate_day` expects. The file is streamed: only the open
+in punch per employee and one batch of rows are held in memory.
+"""
+import csv
+import json
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import config
+import timesheet
+from database import ATTENDANCE_UPSERT, connections
+from time_utils import TimeHelper
+
+_DIRECTIONS = {"in": "in", "i": "in", "0": "in", "out": "out", "o": "out", "1": "out"}
+_MAX_REJECTED_SAMPLES = 20
+
+def read_punches(path):
+    """Yield (line_number, record dict) for each punch in a CSV or JSONL file.
+
+    Lines that are not valid JSON are yielded with a None record so they can be counted
+    as rejected.
+    """
+    path = Path(path)
+    with path.open(newline='', encoding='utf-8-sig') as handle:
+        if path.suffix.lower() in ('.jsonl', '.json', '.ndjson'):
+            for line_number, line in enumerate(handle, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield line_number, record if isinstance(record, dict) else None
+        else:
+            reader = csv.DictReader(handle)
+            for record in reader:
+                yield reader.line_num, {(k or '').strip().lower(): v for k, v in record.items()}
+
+
+def parse_punch(record):
+    """Return (employee_id, datetime, direction or None), or (None, None, reason) if invalid."""
+    if record is None:
+        return None, None, "malformed line"
+    emp_id = str(record.get('employee_id') or '').strip().upper()
+    if not emp_id:
+        return None, None, "missing employee_id"
+
+    stamp = record.get('timestamp')
+    if not stamp and record.get('date') and record.get('time'):
+        stamp = f"{record['date']} {record['time']}"
+    try:
+        # fromisoformat is several times faster than strptime on large exports
+        when = datetime.fromisoformat(str(stamp or '').strip())
+    except ValueError:
+        return None, None, "invalid timestamp"
+    if when.tzinfo is not None:
+        return None, None, "invalid timestamp"
+
+    raw_direction = str(record.get('direction') or '').strip().lower()
+    if raw_direction and raw_direction not in _DIRECTIONS:
+        return None, None, "invalid direction"
+    return emp_id, when, _DIRECTIONS.get(raw_direction)
+
+
+def pair_punches(punches, known_ids, stats):
+    """Turn (line_number, record) punches into attendance rows.
+
+    Yields (employee_id, date, time_in, time_out) tuples, with None for a missing side.
+    Rejected punches are counted in `stats`.
+    """
+    max_shift = timedelta(hours=config.PUNCH_MAX_SHIFT_HOURS)
+    duplicate_window = timedelta(seconds=config.PUNCH_DUPLICATE_SECONDS)
+    open_ins = {}
+
+    def reject(line_number, reason):
+        stats['rejected'] += 1
+        stats['rejected_by_reason'][reason] = stats['rejected_by_reason'].get(reason, 0) + 1
+        if len(stats['rejected_samples']) < _MAX_REJECTED_SAMPLES:
+            stats['rejected_samples'].append((line_number, reason))
+
+    for line_number, record in punches:
+        stats['punches_read'] += 1
+        emp_id, when, direction = parse_punch(record)
+        if emp_id is None:
+            reject(line_number, direction)
+            continue
+        if emp_id not in known_ids:
+            reject(line_number, "unknown employee")
+            continue
+
+        open_in = open_ins.get(emp_id)
+        if open_in is not None and when < open_in:
+            reject(line_number, "out of order")
+            continue
+        if direction is None:
+            direction = "out" if open_in is not None and when - open_in <= max_shift else "in"
+
+        if direction == "in":
+            if open_in is not None and when - open_in <= duplicate_window:
+                stats['duplicates'] += 1
+                continue
+            if open_in is not None:
+                # The previous shift was never clocked out
+                yield emp_id, open_in.strftime('%Y-%m-%d'), open_in.strftime('%H:%M:%S'), None
+            open_ins[emp_id] = when
+        elif open_in is None or when - open_in > max_shift:
+            reject(line_number, "out without matching in")
+        else:
+            del open_ins[emp_id]
+            yield emp_id, open_in.strftime('%Y-%m-%d'), open_in.strftime('%H:%M:%S'), when.strftime('%H:%M:%S')
+
+    for emp_id, open_in in open_ins.items():
+        yield emp_id, open_in.strftime('%Y-%m-%d'), open_in.strftime('%H:%M:%S'), None
+
+
+def import_punches(db_conn, path, chunk_size=None):
+    """Stream a punch export into the attendance table in one transaction.
+
+    Rows are upserted on (employee_id, date) in executemany batches of `chunk_size`
+    (config.PUNCH_IMPORT_CHUNK_SIZE by default); a side missing from the file keeps the
+    stored value. Returns a stats dict with counts, the first rejected lines and
+    the throughput. Nothing is written if the file cannot be read. `db_conn` may be a
+    connection or a database.ConnectionManager, whose write lock is held throughout.
+    """
+    db_conn, _, write_lock = connections(db_conn)
+    chunk_size = chunk_size or config.PUNCH_IMPORT_CHUNK_SIZE
+    started = time.perf_counter()
+    stats = {
+        'punches_read': 0,
+        'rows_written': 0,
+        'duplicates': 0,
+        'rejected': 0,
+        'rejected_by_reason': {},
+        'rejected_samples': [],
+    }
+
+    with write_lock:
+        _import(db_conn, path, chunk_size, stats)
+
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = round(elapsed, 3)
+    stats['punches_per_second'] = round(stats['punches_read'] / elapsed) if elapsed else None
+    return stats
+
+
+def _import(db_conn, path, chunk_size, stats):
+    cursor = db_conn.cursor()
+    try:
+        known_ids = {row[0] for row in cursor.execute("SELECT id FROM employees")}
+        batch = []
+        for row in pair_punches(read_punches(path), known_ids, stats):
+            batch.append(row + TimeHelper.punch_seconds(*row[1:]))
+            if len(batch) >= chunk_size:
+                _write_batch(cursor, batch, stats)
+        if batch:
+            _write_batch(cursor, batch, stats)
+        db_conn.commit()
+    except Exception:
+        db_conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _write_batch(cursor, batch, stats):
+    """Upsert one batch of attendance rows with their timesheet rows, then clear it."""
+    cursor.executemany(ATTENDANCE_UPSERT, batch)
+    timesheet.refresh(cursor, [row[:2] for row in batch])
+    stats['rows_written'] += len(batch)
+    batch.clear()
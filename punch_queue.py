@@ -0,0 +1,246 @@
+"""Group-commit queue for time-clock punches.
+
+`PunchQueue.time_in`/`time_out` check the "already clocked in/out" rules against an
+in-memory map of today's (and, for overnight shifts, yesterday's) attendance and queue
+the write, so a burst of punches at
+shift change does not wait on one commit each. A writer thread with its own connection
+flushes queued punches to `attendance` in one transaction every
+config.PUNCH_FLUSH_SIZE punches or config.PUNCH_FLUSH_INTERVAL_MS milliseconds,
+whichever comes first.
+
+config.PUNCH_ACK_MODE chooses when a punch is acknowledged: "accepted" returns as soon
+as it is queued, "durable" waits until the group commit holding it has finished. In
+"durable" mode the writer does not wait out the interval, since callers are blocked on
+it: it commits whatever is queued, and punches arriving meanwhile form the next group.
+config.PUNCH_SYNCHRONOUS is the writer connection's `PRAGMA synchronous`; with WAL,
+"NORMAL" may lose the last commits on power loss and "FULL" does not.
+
+A group whose commit fails (e.g. the database stays locked) is retried
+config.PUNCH_RETRY_ATTEMPTS times, then committed punch by punch so one bad row does not
+lose the others. Punches that still fail are logged, kept for `take_failed` and passed to
+`error_listeners`; in "durable" mode their caller gets the error instead of an
+acknowledgement.
+"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import config
+import timesheet
+from database import ATTENDANCE_UPSERT
+from time_utils import TimeHelper
+
+_STOP = object()
+_log = logging.getLogger(__name__)
+
+
+class _Punch:
+    __slots__ = ('row', 'committed', 'error')
+
+    def __init__(self, row):
+        self.row = row
+        self.committed = threading.Event()
+        self.error = None
+
+
+class PunchQueue:
+    def __init__(self, db_name, flush_size=None, flush_interval_ms=None, ack_mode=None, synchronous=None):
+        self.db_name = db_name
+        self.flush_size = flush_size or config.PUNCH_FLUSH_SIZE
+        self.flush_interval = (flush_interval_ms or config.PUNCH_FLUSH_INTERVAL_MS) / 1000.0
+        self.ack_mode = ack_mode or config.PUNCH_ACK_MODE
+        self.synchronous = synchronous or config.PUNCH_SYNCHRONOUS
+        if self.ack_mode not in ("accepted", "durable"):
+            raise ValueError(f"Unknown punch acknowledgement mode: {self.ack_mode}")
+
+        # {date: {employee_id: [time_in, time_out]}} for the last two days, including queued punches
+        self._states = {}
+        self._pending = {}
+        # Callables taking an employee ID, run on the writer thread after its punches are committed
+        self.change_listeners = []
+        # Callables taking (employee_id, attendance row, error), run on the writer thread for
+        # punches that could not be committed
+        self.error_listeners = []
+        self._failed = []
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._lookup = sqlite3.connect(db_name, check_same_thread=False)
+        self._writer = threading.Thread(target=self._run, name="punch-writer", daemon=True)
+        self._writer.start()
+
+    def _day_state(self, employee_id, day):
+        """Return an employee's [time_in, time_out] on `day`; call with the lock held."""
+        states = self._states.get(day)
+        if states is None:
+            states = self._states[day] = {}
+            for old_day in sorted(self._states)[:-2]:
+                del self._states[old_day]
+        state = states.get(employee_id)
+        if state is None:
+            row = self._lookup.execute(
+                "SELECT time_in, time_out FROM attendance WHERE employee_id=? AND date=?",
+                (employee_id, day)
+            ).fetchone()
+            state = states[employee_id] = list(row) if row else [None, None]
+        return state
+
+    def _submit(self, employee_id, is_time_in):
+        now = datetime.now()
+        today, time_now = now.strftime('%Y-%m-%d'), now.strftime('%H:%M:%S')
+        with self._lock:
+            state = self._day_state(employee_id, today)
+            if is_time_in:
+                if state[0]:
+                    return False, f"Already clocked in today at {state[0]}."
+                state[0] = time_now
+                punch = _Punch((employee_id, today, time_now, None) + TimeHelper.punch_seconds(today, time_now, None))
+            else:
+                shift_date = today
+                if not state[0]:
+                    # An overnight shift is clocked out the day after its time-in
+                    yesterday = (now - timedelta(days=1)).strftime('%Y-%m-%d')
+                    previous = self._day_state(employee_id, yesterday)
+                    if not (previous[0] and not previous[1] and TimeHelper.continues_overnight(
+                            previous[0], time_now, config.PUNCH_MAX_SHIFT_HOURS)):
+                        return False, "You must clock in before clocking out."
+                    state, shift_date = previous, yesterday
+                if state[1]:
+                    return False, f"Already clocked out today at {state[1]}."
+                state[1] = time_now
+                epoch_day, _, out_seconds = TimeHelper.punch_seconds(shift_date, state[0], time_now)
+                punch = _Punch((employee_id, shift_date, None, time_now, epoch_day, None, out_seconds))
+            self._pending[employee_id] = self._pending.get(employee_id, 0) + 1
+            self._queue.put(punch)
+
+        action = "in" if is_time_in else "out"
+        if self.ack_mode == "durable":
+            punch.committed.wait()
+            if punch.error is not None:
+                return False, f"Clock {action} failed: {punch.error}"
+        return True, f"Clocked {action} at {time_now}."
+
+    def time_in(self, employee_id):
+        return self._submit(employee_id, True)
+
+    def time_out(self, employee_id):
+        return self._submit(employee_id, False)
+
+    def invalidate(self, employee_id=None):
+        """Forget cached state after attendance was written elsewhere (admin edits, imports).
+
+        Employees with queued punches keep their state, which already includes them.
+        """
+        with self._lock:
+            for states in self._states.values():
+                if employee_id is None:
+                    for emp_id in [e for e in states if e not in self._pending]:
+                        del states[emp_id]
+                elif employee_id not in self._pending:
+                    states.pop(employee_id, None)
+
+    def take_failed(self):
+        """Return and forget the (attendance row, error message) of punches that could not be committed."""
+        with self._lock:
+            failed, self._failed = self._failed, []
+        return failed
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_name)
+        conn.execute(f"PRAGMA journal_mode={config.DB_JOURNAL_MODE}")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                linger = self.flush_interval if self.ack_mode == "accepted" else 0
+                deadline = time.monotonic() + linger
+                while len(batch) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                try:
+                    self._flush(conn, batch)
+                except Exception:
+                    # Never lose the writer thread: later punches would be dropped silently
+                    _log.exception("Punch writer failed on a group of %d punches", len(batch))
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch, attempts):
+        """Write punches in one transaction, retrying with backoff; returns the last error or None."""
+        delay, error = config.PUNCH_RETRY_DELAY_MS / 1000.0, None
+        for attempt in range(attempts):
+            try:
+                conn.executemany(ATTENDANCE_UPSERT, [punch.row for punch in batch])
+                timesheet.refresh(conn.cursor(), [punch.row[:2] for punch in batch])
+                conn.commit()
+                return None
+            except Exception as e:
+                conn.rollback()
+                error = e
+            if attempt + 1 < attempts:
+                time.sleep(delay)
+                delay *= 2
+        return error
+
+    def _notify(self, listeners, *args):
+        for listener in list(listeners):
+            try:
+                listener(*args)
+            except Exception:
+                _log.exception("Punch queue listener %r failed", listener)
+
+    def _flush(self, conn, batch):
+        errors = {}
+        try:
+            error = self._commit(conn, batch, config.PUNCH_RETRY_ATTEMPTS)
+            if error is not None and len(batch) > 1:
+                for punch in batch:
+                    punch_error = self._commit(conn, [punch], 1)
+                    if punch_error is not None:
+                        errors[punch] = punch_error
+            elif error is not None:
+                errors[batch[0]] = error
+        except Exception as e:
+            errors = dict.fromkeys(batch, e)
+            raise
+        finally:
+            with self._lock:
+                for punch in batch:
+                    employee_id = punch.row[0]
+                    self._pending[employee_id] -= 1
+                    if not self._pending[employee_id]:
+                        del self._pending[employee_id]
+                    if punch in errors:
+                        self._failed.append((punch.row, str(errors[punch])))
+                        # Reload from the database on the next punch
+                        for states in self._states.values():
+                            states.pop(employee_id, None)
+            for punch in batch:
+                punch.error = errors.get(punch)
+                punch.committed.set()
+
+        for punch, error in errors.items():
+            _log.error("Punch not saved for %s on %s: %s (row %r)", punch.row[0], punch.row[1], error, punch.row)
+            self._notify(self.error_listeners, punch.row[0], punch.row, error)
+        for employee_id in {punch.row[0] for punch in batch if punch not in errors}:
+            self._notify(self.change_listeners, employee_id)
+
+    def close(self):
+        """Flush every queued punch and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._lookup.close()
@@ -0,0 +1,292 @@
+"""Opt-in timing of every SQL statement run through a database.ConnectionManager.
+
+When enabled (config.QUERY_STATS, or AppDB(query_stats=QueryStats())), the manager opens
+its connections through `QueryStats.connect`, whose connection and cursor subclasses
+time each execute and fetch. Each statement is attributed to the repository functions
+on the call stack: a method's "self" figures count the queries it ran itself, its
+inclusive figures also count those of everything it called, so
+`PayrollSystem.calculate_pay` includes the snapshot load it triggers. Per-call
+execute latencies go into a histogram per method, and statements slower than
+config.QUERY_SLOW_MS are kept with their EXPLAIN QUERY PLAN.
+
+Disabled, connections are plain sqlite3 connections and nothing here runs. Connections
+opened elsewhere (the punch queue writer, payroll worker processes) are not counted.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import config
+
+# Upper bounds of the latency histogram buckets, in milliseconds; the last is open-ended
+HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _bucket(ms):
+    for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+        if ms <= bound:
+            return index
+    return len(HISTOGRAM_BOUNDS_MS)
+
+
+def _bucket_labels():
+    labels, lower = [], 0
+    for bound in HISTOGRAM_BOUNDS_MS:
+        labels.append(f"{lower}-{bound}ms")
+        lower = bound
+    labels.append(f">{lower}ms")
+    return labels
+
+
+def _histogram(counts):
+    """Return {bucket label: count} for the non-empty buckets."""
+    return {label: count for label, count in zip(_bucket_labels(), counts) if count}
+
+
+class _MethodStats:
+    __slots__ = ('queries', 'self_queries', 'seconds', 'self_seconds', 'histogram')
+
+    def __init__(self):
+        self.queries = 0
+        self.self_queries = 0
+        self.seconds = 0.0
+        self.self_seconds = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's execute and fetch time to its connection's stats."""
+
+    _current = None
+
+    def _run(self, method, sql, params, many=False):
+        stats = self.connection.stats
+        callers = stats.callers()
+        started = time.perf_counter()
+        try:
+            return method(self, sql, params) if params is not None else method(self, sql)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._current = (callers, sql)
+            stats.record(self.connection, callers, sql, params, elapsed, many)
+
+    def execute(self, sql, params=None):
+        return self._run(sqlite3.Cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run(sqlite3.Cursor.executemany, sql, seq_of_params, many=True)
+
+    def executescript(self, script):
+        return self._run(sqlite3.Cursor.executescript, script, None)
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            if self._current is not None:
+                self.connection.stats.record_fetch(*self._current, time.perf_counter() - started)
+
+    def fetchone(self):
+        return self._fetch(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(sqlite3.Cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(sqlite3.Cursor.fetchall)
+
+    def __next__(self):
+        return self._fetch(sqlite3.Cursor.__next__)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including those of its execute shortcuts, are instrumented."""
+
+    stats = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+class QueryStats:
+    """Thread-safe per-method query counts, latencies and slow statements for one run."""
+
+    def __init__(self, slow_ms=None, slow_log_size=None):
+        self.slow_ms = config.QUERY_SLOW_MS if slow_ms is None else slow_ms
+        self.slow_log_size = slow_log_size or config.QUERY_SLOW_LOG_SIZE
+        self._lock = threading.Lock()
+        self._labels = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.queries = 0
+            self.seconds = 0.0
+            self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+            self.methods = {}
+            self.statements = {}
+            self.slow = {}
+
+    def connect(self, *args, **kwargs):
+        """sqlite3.connect() returning an instrumented connection that reports here."""
+        conn = sqlite3.connect(*args, factory=InstrumentedConnection, **kwargs)
+        conn.stats = self
+        return conn
+
+    def _label(self, code):
+        """Return "module.qualname" for a repository function, or '' for frames to skip.
+
+        Module-level code, comprehensions and decorator wrappers such as
+        database.serialized_write are skipped.
+        """
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            module = os.path.splitext(os.path.basename(filename))[0]
+            name = getattr(code, 'co_qualname', code.co_name)
+            if (filename.startswith('<') or os.path.dirname(os.path.abspath(filename)) != _REPO_DIR
+                    or module == __name__ or name.startswith('<') or code.co_name == 'wrapper'):
+                label = ''
+            else:
+                label = f"{module}.{name}"
+            self._labels[code] = label
+        return label
+
+    def callers(self):
+        """Return the repository functions on the stack, innermost first, without repeats."""
+        callers = []
+        frame = sys._getframe(2)
+        while frame is not None:
+            label = self._label(frame.f_code)
+            if label and label not in callers:
+                callers.append(label)
+            frame = frame.f_back
+        return tuple(callers)
+
+    def record(self, conn, callers, sql, params, elapsed, many):
+        ms = elapsed * 1000.0
+        bucket = _bucket(ms)
+        key = ' '.join(sql.split())
+        with self._lock:
+            self.queries += 1
+            self.seconds += elapsed
+            self.histogram[bucket] += 1
+            for index, label in enumerate(callers or ('(outside the app)',)):
+                method = self.methods.get(label)
+                if method is None:
+                    method = self.methods[label] = _MethodStats()
+                method.queries += 1
+                method.seconds += elapsed
+                if index == 0:
+                    method.self_queries += 1
+                    method.self_seconds += elapsed
+                    method.histogram[bucket] += 1
+            statement = self.statements.setdefault(key, [0, 0.0])
+            statement[0] += 1
+            statement[1] += elapsed
+            previous = self.slow.get(key)
+            slow = ms >= self.slow_ms and (previous is None or ms > previous['ms'])
+            if slow and previous is None and len(self.slow) >= self.slow_log_size:
+                slow = ms > min(entry['ms'] for entry in self.slow.values())
+        if slow:
+            entry = {
+                'sql': key,
+                'ms': round(ms, 3),
+                'method': callers[0] if callers else None,
+                'plan': self._query_plan(conn, sql, params, many),
+            }
+            with self._lock:
+                self.slow[key] = entry
+                if len(self.slow) > self.slow_log_size:
+                    del self.slow[min(self.slow, key=lambda k: self.slow[k]['ms'])]
+
+    def record_fetch(self, callers, sql, elapsed):
+        key = ' '.join(sql.split())
+        with self._lock:
+            self.seconds += elapsed
+            for index, label in enumerate(callers or ('(outside the app)',)):
+                method = self.methods.get(label)
+                if method is not None:
+                    method.seconds += elapsed
+                    if index == 0:
+                        method.self_seconds += elapsed
+            if key in self.statements:
+                self.statements[key][1] += elapsed
+
+    @staticmethod
+    def _query_plan(conn, sql, params, many):
+        """Return the EXPLAIN QUERY PLAN detail lines of a statement, run uninstrumented."""
+        if many:
+            params = params[0] if isinstance(params, (list, tuple)) and params else None
+        try:
+            rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+        except sqlite3.Error as e:
+            return [f"(no plan: {e})"]
+        return [row[-1] for row in rows]
+
+    def summary(self, top=None):
+        """Return the collected figures as a JSON-ready dict, methods by inclusive time."""
+        with self._lock:
+            methods = sorted(self.methods.items(), key=lambda item: item[1].seconds, reverse=True)
+            statements = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+            return {
+                'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+                'queries': self.queries,
+                'seconds': round(self.seconds, 4),
+                'slow_ms': self.slow_ms,
+                'histogram': _histogram(self.histogram),
+                'methods': [
+                    {
+                        'method': label,
+                        'queries': method.queries,
+                        'seconds': round(method.seconds, 4),
+                        'self_queries': method.self_queries,
+                        'self_seconds': round(method.self_seconds, 4),
+                        'histogram': _histogram(method.histogram),
+                    }
+                    for label, method in methods[:top]
+                ],
+                'statements': [
+                    {'sql': sql, 'count': count, 'seconds': round(seconds, 4)}
+                    for sql, (count, seconds) in statements[:top]
+                ],
+                'slow': sorted(self.slow.values(), key=lambda entry: entry['ms'], reverse=True),
+            }
+
+    def format_summary(self, top=15):
+        """Return the summary as plain text for the admin dashboard."""
+        summary = self.summary(top)
+        lines = [
+            f"{summary['queries']} queries, {summary['seconds'] * 1000:.1f} ms in SQLite since {summary['since']}",
+            "",
+            f"{'Method':<50} {'Queries':>8} {'ms':>10} {'Self':>8} {'Self ms':>10}",
+            "-" * 90,
+        ]
+        for method in summary['methods']:
+            lines.append(
+                f"{method['method'][:50]:<50} {method['queries']:>8} {method['seconds'] * 1000:>10.1f} "
+                f"{method['self_queries']:>8} {method['self_seconds'] * 1000:>10.1f}"
+            )
+        lines += ["", "Latency per statement execute:"]
+        lines += [f"  {label:>14}: {count}" for label, count in summary['histogram'].items()]
+        lines += ["", f"Statements over {summary['slow_ms']} ms:"]
+        if not summary['slow']:
+            lines.append("  none")
+        for entry in summary['slow']:
+            lines.append(f"  {entry['ms']:.1f} ms in {entry['method']}: {entry['sql'][:200]}")
+            lines += [f"      {step}" for step in entry['plan']]
+        return "\n".join(lines)
@@ -1,6 +1,10 @@
-import datetime
 from datetime import date
 
+from time_utils import TimeHelper
+
+_DAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
 class ScheduleGenerator:
     """Encapsulates schedule generation and population of a Treeview and label.
 
@@ -25,11 +29,8 @@ class ScheduleGenerator:
             return
 
         for date_str, details in schedule.items():
-            try:
-                date_obj = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
-                day_name = date_obj.strftime('%a')
-            except Exception:
-                day_name = ''
+            weekday = TimeHelper.weekday(date_str)
+            day_name = _DAY_NAMES[weekday] if weekday is not None else ''
 
             tag = 'work_day' if details.startswith("Work Day") or "Shift" in details else 'rest_day'
             schedule_tree.insert('', 'end', values=(date_str, day_name, details), tags=(tag,))
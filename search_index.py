@@ -0,0 +1,186 @@
+"""In-memory search over employee ID, name, position and department.
+
+`EmployeeSearchIndex` follows an `employee.EmployeeDirectory` through its change events,
+so it never rescans the table. Each field keeps a sorted vocabulary of its words, so a
+word-prefix lookup is a bisect. Terms also match anywhere in the text: through a
+trigram index from three characters, and by scanning the vocabularies for shorter
+ones. Every term must match. Matches are ranked, per
+term:
+
+- the exact ID
+- an ID prefix
+- a word prefix in the name, then position, then department
+- a plain substring
+"""
+import bisect
+import heapq
+import threading
+
+# Score of each field's word-prefix match, for ID, name, position and department
+_FIELD_SCORES = (60, 40, 20, 10)
+_EXACT_ID_SCORE = 100
+_SUBSTRING_SCORE = 1
+_FIELD_COUNT = len(_FIELD_SCORES)
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _field_words(row):
+    """Return the lowercase words of each searchable field; the ID is kept whole."""
+    fields = [str(value or '').lower() for value in row[:_FIELD_COUNT]]
+    return (fields[0],), *(tuple(set(field.split())) for field in fields[1:])
+
+
+class EmployeeSearchIndex:
+    def __init__(self, directory):
+        self.directory = directory
+        self._texts = None
+        self._words = [{} for _ in range(_FIELD_COUNT)]
+        self._vocab = [[] for _ in range(_FIELD_COUNT)]
+        self._grams = {}
+        self._lock = threading.Lock()
+        directory.subscribe(self._on_change)
+
+    def _on_change(self, event, employee_id, row):
+        with self._lock:
+            if self._texts is None:
+                return
+            if event == "reloaded":
+                self._texts = None
+                return
+            self._remove(employee_id)
+            if event != "deleted":
+                self._add(row)
+
+    def _build(self):
+        self._texts, self._grams = {}, {}
+        self._words = [{} for _ in range(_FIELD_COUNT)]
+        self._vocab = [[] for _ in range(_FIELD_COUNT)]
+        for row in self.directory.rows():
+            self._add(row)
+
+    def _add(self, row):
+        emp_id = row[0]
+        field_words = _field_words(row)
+        text = ' '.join(str(value or '').lower() for value in row[:_FIELD_COUNT])
+        self._texts[emp_id] = (field_words, text)
+        for words, vocab, field in zip(self._words, self._vocab, field_words):
+            for word in field:
+                if word not in words:
+                    words[word] = set()
+                    bisect.insort(vocab, word)
+                words[word].add(emp_id)
+        for gram in _trigrams(text):
+            self._grams.setdefault(gram, set()).add(emp_id)
+
+    def _remove(self, emp_id):
+        entry = self._texts.pop(emp_id, None)
+        if entry is None:
+            return
+        field_words, text = entry
+        for words, vocab, field in zip(self._words, self._vocab, field_words):
+            for word in field:
+                ids = words[word]
+                ids.discard(emp_id)
+                if not ids:
+                    del words[word]
+                    del vocab[bisect.bisect_left(vocab, word)]
+        for gram in _trigrams(text):
+            ids = self._grams[gram]
+            ids.discard(emp_id)
+            if not ids:
+                del self._grams[gram]
+
+    def _prefix_ids(self, field, term):
+        vocab, words = self._vocab[field], self._words[field]
+        start = bisect.bisect_left(vocab, term)
+        end = bisect.bisect_left(vocab, term + '\U0010ffff', start)
+        return set().union(*(words[word] for word in vocab[start:end]))
+
+    def _substring_ids(self, term):
+        if len(term) < 3:
+            # Too short for trigrams; a term holds no space, so it matches within a word
+            return set().union(*(ids for words in self._words for word, ids in words.items() if term in word))
+        postings = sorted((self._grams.get(gram, ()) for gram in _trigrams(term)), key=len)
+        if not postings[0]:
+            return set()
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return {emp_id for emp_id in candidates if term in self._texts[emp_id][1]}
+
+    def _tiers(self, term):
+        """Return (score, ids) for each way `term` can match, best first."""
+        tiers = [(_EXACT_ID_SCORE, set(self._words[0].get(term, ())))]
+        tiers.extend((score, self._prefix_ids(field, term)) for field, score in enumerate(_FIELD_SCORES))
+        tiers.append((_SUBSTRING_SCORE, self._substring_ids(term)))
+        return tiers
+
+    def _search_term(self, term, limit):
+        """Rank a one-term query tier by tier, stopping once `limit` matches are found.
+
+        Every tier is a single score, so only the last tier taken needs ordering. ID
+        prefixes are read in order straight from the sorted ID vocabulary.
+        """
+        ranked = sorted(self._words[0].get(term, ()))
+        seen = set(ranked)
+        vocab, words = self._vocab[0], self._words[0]
+        end = bisect.bisect_left(vocab, term + '\U0010ffff')
+        for index in range(bisect.bisect_left(vocab, term), end):
+            if limit and len(ranked) >= limit:
+                return ranked
+            for emp_id in words[vocab[index]] - seen:
+                ranked.append(emp_id)
+                seen.add(emp_id)
+
+        later_tiers = [lambda field=field: self._prefix_ids(field, term) for field in range(1, _FIELD_COUNT)]
+        later_tiers.append(lambda: self._substring_ids(term))
+        for tier in later_tiers:
+            if limit and len(ranked) >= limit:
+                break
+            bucket = tier() - seen
+            seen |= bucket
+            ranked.extend(heapq.nsmallest(limit - len(ranked), bucket) if limit else sorted(bucket))
+        return ranked[:limit] if limit else ranked
+
+    def search(self, query, limit=None):
+        """Return the IDs matching every term of `query`, best match first.
+
+        Equal scores are ordered by ID. An empty query returns every ID in order.
+        """
+        terms = query.lower().split()
+        if not terms:
+            ids = [row[0] for row in self.directory.rows()]
+            return ids[:limit] if limit else ids
+
+        with self._lock:
+            if self._texts is None:
+                self._build()
+            if len(terms) == 1:
+                return self._search_term(terms[0], limit)
+            term_tiers = [self._tiers(term) for term in terms]
+
+        matches = None
+        for tiers in term_tiers:
+            found = set().union(*(ids for _, ids in tiers))
+            matches = found if matches is None else matches & found
+
+        scores = dict.fromkeys(matches, 0)
+        for tiers in term_tiers:
+            remaining = set(matches)
+            for score, ids in tiers:
+                for emp_id in remaining & ids:
+                    scores[emp_id] += score
+                remaining -= ids
+        ranked = ((-score, emp_id) for emp_id, score in scores.items())
+        ranked = heapq.nsmallest(limit, ranked) if limit else sorted(ranked)
+        return [emp_id for _, emp_id in ranked]
+
+    def labels(self, query, limit=None):
+        """Return matches as the "ID - Name" strings the employee combos show."""
+        labels = []
+        for emp_id in self.search(query, limit):
+            row = self.directory.get(emp_id)
+            if row:
+                labels.append(f"{emp_id} - {row[1]}")
+        return labels
@@ -0,0 +1,83 @@
+"""Shift definitions and the per-day punch rules shared by payroll and the timesheet.
+
+Kept free of database and payroll imports so the time clock can evaluate a punch
+(see timesheet.py) without loading payroll, NumPy or the process-pool machinery.
+"""
+from datetime import time
+
+import config
+
+POSITION_SHIFTS = {
+    "Manager": {"start": time(9, 0), "end": time(17, 0), "window_hours": 8},
+    "Sales": {"start": time(7, 0), "end": time(15, 0), "window_hours": 8},
+    "HR": {"start": time(8, 0), "end": time(16, 0), "window_hours": 8},
+    "Production Worker A": {"start": time(7, 0), "end": time(15, 0), "window_hours": 8},
+    "Production Worker B": {"start": time(15, 0), "end": time(23, 0), "window_hours": 8},
+}
+
+GUARD_SHIFTS = [
+    {"start": time(6, 0), "end": time(14, 0), "window_hours": 8, "shift_name": "Shift A (6AM-2PM)"},
+    {"start": time(14, 0), "end": time(22, 0), "window_hours": 8, "shift_name": "Shift B (2PM-10PM)"},
+    {"start": time(22, 0), "end": time(6, 0), "window_hours": 8, "shift_name": "Shift C (10PM-6AM)"},
+]
+
+DEFAULT_SHIFT = {"start": time(8, 0), "end": time(16, 0), "window_hours": 8}
+
+
+def compile_shift(shift_def):
+    """Flatten a shift definition into minutes since midnight for the day kernel."""
+    start = shift_def["start"].hour * 60 + shift_def["start"].minute
+    end = shift_def["end"].hour * 60 + shift_def["end"].minute
+    return {
+        "start": start,
+        "end": end,
+        "overnight": end <= start,
+        "paid_minutes": (shift_def["window_hours"] - config.LUNCH_BREAK_HOURS) * 60,
+        "shift_name": shift_def.get("shift_name"),
+        "label": (
+            f"Work Day: {shift_def['start'].strftime('%I:%M %p')} - {shift_def['end'].strftime('%I:%M %p')} (1HR Break)"
+        ),
+    }
+
+
+# Compiled once from the definitions above; see resolve_shift().
+SHIFT_TABLE = {position: compile_shift(shift_def) for position, shift_def in POSITION_SHIFTS.items()}
+GUARD_SHIFT_TABLE = [compile_shift(shift_def) for shift_def in GUARD_SHIFTS]
+DEFAULT_SHIFT_ENTRY = compile_shift(DEFAULT_SHIFT)
+
+
+def resolve_shift(position, department):
+    """Return the compiled shift entry an employee works on every scheduled day."""
+    if position and position.startswith("Security Guard") and department == "Security":
+        if position == "Security Guard A":
+            return GUARD_SHIFT_TABLE[0]
+        elif position == "Security Guard B":
+            return GUARD_SHIFT_TABLE[1]
+        return GUARD_SHIFT_TABLE[2]
+    return SHIFT_TABLE.get(position, DEFAULT_SHIFT_ENTRY)
+
+
+def evaluate_day(shift, time_in_min, time_out_min):
+    """Return (tardiness, undertime, overtime) in whole minutes for one scheduled day.
+
+    Punches are minutes since midnight. A time-out at or before the time-in is taken to
+    fall on the next calendar day, as is an early-morning time-in on an overnight shift.
+    Days without a time-in are not evaluated.
+    """
+    if time_in_min is None:
+        return 0, 0, 0
+
+    start = shift["start"]
+    end = shift["end"]
+    if shift["overnight"]:
+        end += 1440
+        if time_in_min < shift["end"]:
+            time_in_min += 1440
+
+    tardiness = max(0, time_in_min - start)
+    if time_out_min is None:
+        return tardiness, 0, 0
+
+    if time_out_min <= time_in_min:
+        time_out_min += 1440
+    return tardiness, max(0, end - time_out_min), max(0, time_out_min - end)
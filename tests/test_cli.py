@@ -0,0 +1,68 @@
+"""Exit codes and JSON output of the command-line entry point."""
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import benchmark
+import cli
+
+
+class CliTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = Path(tempfile.mkdtemp())
+        cls.db_path = str(cls.tmp / 'cli.db')
+        benchmark.generate(cls.db_path, 12, seed=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def _run(self, *argv):
+        """Return (exit code, parsed JSON output) of `python -m cli --db <test db> argv`."""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = cli.main(['--db', self.db_path, *argv])
+        return code, json.loads(out.getvalue())
+
+    def test_success(self):
+        code, output = self._run('payroll', 'preview', '--month', '10', '--year', '2025', '--workers', '1')
+        self.assertEqual(code, 0)
+        self.assertIs(output['ok'], True)
+        self.assertEqual(output['command'], 'payroll')
+        self.assertIn('seconds', output)
+
+    def test_missing_database_is_not_created(self):
+        missing = self.tmp / 'missing.db'
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = cli.main(['--db', str(missing), 'approve-leaves', '--all-pending'])
+        self.assertEqual(code, 1)
+        self.assertEqual(json.loads(out.getvalue())['error'], f"No such database: {missing}")
+        self.assertFalse(missing.exists())
+
+    def test_command_error(self):
+        missing = self.tmp / 'punches.csv'
+        code, output = self._run('import-punches', str(missing))
+        self.assertEqual(code, 1)
+        self.assertEqual((output['ok'], output['error']), (False, f"No such file: {missing}"))
+
+    def test_unexpected_error_is_reported_as_json(self):
+        code, output = self._run('export-payslips', '--month', '10', '--year', '2025',
+                                 '--out', str(self.tmp / 'no-such-dir' / 'payslips.csv'))
+        self.assertEqual(code, 1)
+        self.assertIs(output['ok'], False)
+        self.assertTrue(output['error'].startswith('FileNotFoundError: '), output['error'])
+
+    def test_usage_error_exits_with_argparse_code(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as raised:
+            cli.main(['--db', self.db_path, 'payroll', 'publish'])
+        self.assertEqual(raised.exception.code, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""Schema migrations and their backfills, applied to a baseline-format database.
+
+The shipped employee_management.db predates every migration (user_version 0); it is
+upgraded on a copy.
+"""
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+import database
+from time_utils import TimeHelper
+
+SHIPPED_DB = Path(__file__).resolve().parent.parent / 'employee_management.db'
+
+
+def _rows(conn, query):
+    return sorted(conn.execute(query).fetchall(), key=repr)
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.path = self.tmp / 'baseline.db'
+        with sqlite3.connect(f"{SHIPPED_DB.as_uri()}?mode=ro", uri=True) as source, \
+                sqlite3.connect(self.path) as target:
+            source.backup(target)
+        with sqlite3.connect(self.path) as conn:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 0)
+
+    def _open(self):
+        db = database.AppDB(str(self.path))
+        self.addCleanup(db.close)
+        return db
+
+    def test_upgrades_to_the_latest_version(self):
+        db = self._open()
+        self.assertEqual(db.schema_version(), len(database.MIGRATIONS))
+        objects = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master")}
+        for name in ('payroll_periods', 'payroll_loan_deductions', 'timesheet', 'payroll_ytd',
+                     'idx_attendance_day', 'idx_payroll_emp_period', 'idx_leaves_status_date'):
+            self.assertIn(name, objects)
+        self.assertNotIn('idx_attendance_date', objects)
+
+    def test_attendance_seconds_backfill(self):
+        db = self._open()
+        rows = db.conn.execute(
+            "SELECT date, time_in, time_out, epoch_day, in_seconds, out_seconds FROM attendance"
+        ).fetchall()
+        self.assertTrue(rows)
+        for d, time_in, time_out, *seconds in rows:
+            self.assertEqual(tuple(seconds), TimeHelper.punch_seconds(d, time_in, time_out), (d, time_in, time_out))
+
+    def test_timesheet_backfill_covers_every_attendance_row(self):
+        db = self._open()
+        self.assertEqual(
+            _rows(db.conn, "SELECT employee_id, epoch_day FROM timesheet"),
+            _rows(db.conn, "SELECT employee_id, epoch_day FROM attendance"),
+        )
+
+    def test_payroll_period_backfill(self):
+        db = self._open()
+        rows = db.conn.execute("SELECT employee_id, month_year, year, month, period FROM payroll").fetchall()
+        claimed = {}
+        for employee_id, month_year, *key in rows:
+            if key[0] is not None:
+                self.assertEqual(database._parse_period_key(month_year), tuple(key), month_year)
+                claimed[(employee_id,) + tuple(key)] = month_year
+        # A recognized row left without columns is an old 'YYYY-MM-P' duplicate of a current one
+        for employee_id, month_year, year, _, _ in rows:
+            parsed = database._parse_period_key(month_year)
+            if year is None and parsed is not None:
+                self.assertTrue(month_year[0].isdigit(), month_year)
+                self.assertFalse(claimed[(employee_id,) + parsed][0].isdigit(), month_year)
+        self.assertEqual(claimed[('EMP001', 2025, 11, 1)], 'November 2025 - 1st Half (1-15)')
+
+    def test_parse_period_key(self):
+        for key, parsed in [
+            ('December 2025 - 1st Half (1-15)', (2025, 12, 1)),
+            ('february 2024 - 2nd Half (16-End)', (2024, 2, 2)),
+            ('2025-11-1', (2025, 11, 1)),
+            ('2025-11-3', None),
+            ('2025-13-1', None),
+            ('Smarch 2025 - 1st Half (1-15)', None),
+            ('December - 1st Half (1-15)', None),
+            ('December 2025 - 3rd Half', None),
+            ('', None),
+            (None, None),
+        ]:
+            self.assertEqual(database._parse_period_key(key), parsed, key)
+
+    def test_payroll_ytd_backfill(self):
+        db = self._open()
+        columns = database.PAYROLL_YTD_COLUMNS
+        expected = _rows(db.conn, f"""
+            SELECT employee_id, year, {', '.join(f'ROUND(COALESCE(SUM({name}), 0), 2)' for name in columns)},
+                   COUNT(*), SUM(sss IS NULL)
+            FROM payroll WHERE year IS NOT NULL GROUP BY employee_id, year
+        """)
+        self.assertTrue(expected)
+        self.assertEqual(_rows(db.conn, f"""
+            SELECT employee_id, year, {', '.join(f'ROUND({name}, 2)' for name in columns)}, periods, incomplete
+            FROM payroll_ytd
+        """), expected)
+
+    def test_rerunning_every_migration_keeps_the_data(self):
+        tables = ('attendance', 'timesheet', 'payroll', 'payroll_ytd')
+        db = self._open()
+        before = {table: _rows(db.conn, f"SELECT * FROM {table}") for table in tables}
+        db.conn.execute("PRAGMA user_version = 0")
+        db.close()
+
+        db = self._open()
+        self.assertEqual(db.schema_version(), len(database.MIGRATIONS))
+        for table in tables:
+            self.assertEqual(_rows(db.conn, f"SELECT * FROM {table}"), before[table], table)
+
+    def test_new_database(self):
+        db = database.AppDB(str(self.tmp / 'new.db'))
+        self.addCleanup(db.close)
+        self.assertEqual(db.schema_version(), len(database.MIGRATIONS))
+        self.assertEqual(db.conn.execute("SELECT COUNT(*) FROM payroll_ytd").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Keyset paging of the employee, leave and loan lists against their full queries."""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import benchmark
+import database
+import employee
+import leave_management
+import loan_management
+
+EMPLOYEES = 60
+PAGE_SIZES = (1, 7, 1000)
+
+
+def _all_pages(fetch, limit):
+    """Follow next cursors from the first page; return the rows and the page sizes."""
+    rows, sizes, after = [], [], None
+    while True:
+        page, after = fetch(after, limit)
+        rows.extend(page)
+        sizes.append(len(page))
+        if after is None:
+            return rows, sizes
+
+
+class KeysetPagingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = Path(tempfile.mkdtemp())
+        benchmark.generate(cls.tmp / 'paging.db', EMPLOYEES, seed=11)
+        cls.db = database.AppDB(str(cls.tmp / 'paging.db'))
+        cls.employees = employee.EmployeeManager(cls.db.connections)
+        cls.leaves = leave_management.LeaveManager(cls.db.connections)
+        cls.loans = loan_management.LoanManager(cls.db.connections)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def _check(self, fetch, expected):
+        self.assertTrue(expected)
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                rows, sizes = _all_pages(fetch, limit)
+                self.assertEqual(rows, expected)
+                self.assertTrue(all(size == limit for size in sizes[:-1]), sizes)
+                self.assertLessEqual(sizes[-1], limit)
+
+    def test_employees(self):
+        self._check(lambda after, limit: self.employees.get_employees_page(after, limit),
+                    self.employees.get_all_employees())
+
+    def test_leave_requests(self):
+        query = """
+            SELECT l.id, l.employee_id, e.name, l.date, l.leave_type, l.status
+            FROM leaves l JOIN employees e ON l.employee_id = e.id
+            {} ORDER BY l.date DESC, l.id DESC
+        """
+        self._check(lambda after, limit: self.leaves.get_leave_requests_page(after, limit),
+                    self.db.conn.execute(query.format("")).fetchall())
+        for status in ('Pending', 'Approved'):
+            self._check(
+                lambda after, limit: self.leaves.get_leave_requests_page(
+                    after, limit, status=status, start_date='2025-09-10', end_date='2025-10-20'),
+                self.db.conn.execute(query.format("WHERE l.status = ? AND l.date BETWEEN ? AND ?"),
+                                     (status, '2025-09-10', '2025-10-20')).fetchall(),
+            )
+
+    def test_loans(self):
+        query = """
+            SELECT l.id, l.employee_id, e.name, l.amount, l.remaining_balance, l.date_requested, l.status
+            FROM loans l JOIN employees e ON l.employee_id = e.id
+            {} ORDER BY l.date_requested DESC, l.id DESC
+        """
+        self._check(lambda after, limit: self.loans.get_loans_page(after, limit),
+                    self.db.conn.execute(query.format("")).fetchall())
+        # The end date takes in the whole day, whatever time the request carries
+        self._check(
+            lambda after, limit: self.loans.get_loans_page(after, limit, status='Pending', end_date='2025-10-15'),
+            self.db.conn.execute(query.format("WHERE l.status = 'Pending' AND substr(l.date_requested, 1, 10) <= ?"),
+                                 ('2025-10-15',)).fetchall(),
+        )
+
+    def test_full_last_page_is_followed_by_an_empty_one(self):
+        total = len(self.employees.get_all_employees())
+        rows, next_cursor = self.employees.get_employees_page(limit=total)
+        self.assertEqual(len(rows), total)
+        self.assertEqual(self.employees.get_employees_page(next_cursor, total), ([], None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Period-wide payroll must match per-employee payroll on every computation path.
+
+A synthetic database from `benchmark.generate` is computed both ways for each way of
+summarizing attendance (timesheet table, NumPy kernel, pure Python) and for one and
+several worker processes.
+"""
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import benchmark
+import config
+import database
+import payroll
+import timesheet_vectorized
+
+EMPLOYEES = 60
+# Finalizing a period again after the next one is the regeneration case for loan balances
+PERIODS = [(10, 2025, 1), (10, 2025, 2), (11, 2025, 1), (11, 2025, 2), (11, 2025, 1)]
+SOURCES = {
+    'timesheet': {'USE_TIMESHEET_TABLE': True},
+    'numpy': {'USE_TIMESHEET_TABLE': False, 'USE_NUMPY_TIMESHEETS': True},
+    'python': {'USE_TIMESHEET_TABLE': False, 'USE_NUMPY_TIMESHEETS': False},
+}
+WORKERS = (1, 3)
+
+
+def _table(conn, name):
+    """Return a table's rows without finalized_at, which differs between runs."""
+    cursor = conn.execute(f"SELECT * FROM {name} ORDER BY 1, 2, 3")
+    keep = [i for i, column in enumerate(cursor.description) if column[0] != 'finalized_at']
+    return [tuple(row[i] for i in keep) for row in cursor.fetchall()]
+
+
+class PayrollBatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = Path(tempfile.mkdtemp())
+        cls.source_db = cls.tmp / 'source.db'
+        benchmark.generate(cls.source_db, EMPLOYEES, seed=7)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def _open(self, name):
+        path = self.tmp / name
+        for suffix in ('', '-wal', '-shm'):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+        with sqlite3.connect(self.source_db) as source, sqlite3.connect(path) as target:
+            source.backup(target)
+        db = database.AppDB(str(path))
+        self.addCleanup(db.close)
+        return db, payroll.PayrollSystem(db.connections)
+
+    def _paths(self):
+        """Return (source, workers, config overrides) for every combination to compare."""
+        sources = [source for source in SOURCES if source != 'numpy' or timesheet_vectorized.available()]
+        return [
+            (source, workers, dict(SOURCES[source], PAYROLL_MIN_EMPLOYEES_PER_WORKER=10))
+            for source in sources for workers in WORKERS
+        ]
+
+    def test_preview_batch_matches_preview_pay(self):
+        _, payroll_system = self._open('preview.db')
+        for source, workers, settings in self._paths():
+            with self.subTest(source=source, workers=workers), mock.patch.multiple(config, **settings):
+                for month, year, period in PERIODS[:4]:
+                    payroll_system.invalidate_month_snapshots()
+                    batch = payroll_system.preview_payroll_batch(month, year, period, workers)
+                    self.assertEqual(len(batch), EMPLOYEES)
+                    for emp_id, _, report in batch:
+                        self.assertEqual(report, payroll_system.preview_pay(emp_id, month, year, period)[0], emp_id)
+
+    def test_finalize_batch_matches_calculate_pay(self):
+        for source, workers, settings in self._paths():
+            with self.subTest(source=source, workers=workers), mock.patch.multiple(config, **settings):
+                batch_db, batch_system = self._open(f'batch-{source}-{workers}.db')
+                single_db, single_system = self._open(f'single-{source}-{workers}.db')
+                ids = [row[0] for row in single_db.conn.execute("SELECT id FROM employees ORDER BY id")]
+                for month, year, period in PERIODS:
+                    batch = {emp_id: report for emp_id, _, report in
+                             batch_system.calculate_payroll_batch(month, year, period, workers)}
+                    single = {emp_id: single_system.calculate_pay(emp_id, month, year, period)[0] for emp_id in ids}
+                    self.assertEqual(batch, single, (month, year, period))
+                for table in ('payroll', 'payroll_loan_deductions', 'payroll_ytd', 'loans'):
+                    self.assertEqual(_table(batch_db.conn, table), _table(single_db.conn, table), table)
+
+    def test_regenerate_keeps_unchanged_payslips(self):
+        _, payroll_system = self._open('regenerate.db')
+        for month, year, period in PERIODS[:4]:
+            payroll_system.calculate_payroll_batch(month, year, period, 1)
+        results, unchanged = payroll_system.regenerate_payroll_period(10, 2025, 1, 1)
+        self.assertEqual((len(results), unchanged), (0, EMPLOYEES))
+
+
+if __name__ == "__main__":
+    unittest.main()
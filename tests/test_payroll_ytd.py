@@ -0,0 +1,66 @@
+"""Year-to-date totals must not count missing legacy deductions as zeros.
+
+The shipped employee_management.db is in the baseline format: its payslips predate the
+deduction breakdown columns, so upgrading it leaves those columns NULL.
+"""
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+import database
+import payroll
+
+SHIPPED_DB = Path(__file__).resolve().parent.parent / 'employee_management.db'
+
+
+class PayrollYtdTest(unittest.TestCase):
+    def setUp(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        with sqlite3.connect(f"{SHIPPED_DB.as_uri()}?mode=ro", uri=True) as source, \
+                sqlite3.connect(tmp / 'ytd.db') as target:
+            source.backup(target)
+        self.db = database.AppDB(str(tmp / 'ytd.db'))
+        self.addCleanup(self.db.close)
+        self.payroll_system = payroll.PayrollSystem(self.db.connections)
+
+    def _stored(self, employee_id, year):
+        """Return (gross, net, periods, legacy periods) summed from the payroll table."""
+        return self.db.conn.execute("""
+            SELECT ROUND(SUM(gross_pay), 2), ROUND(SUM(net_pay), 2), COUNT(*), SUM(sss IS NULL)
+            FROM payroll WHERE employee_id = ? AND year = ?
+        """, (employee_id, year)).fetchone()
+
+    def test_backfill_flags_legacy_breakdowns(self):
+        ytd = self.payroll_system.get_ytd('EMP001', 2025)
+        gross, net, periods, legacy = self._stored('EMP001', 2025)
+        self.assertGreater(legacy, 0)
+        self.assertEqual((ytd['gross_pay'], ytd['net_pay'], ytd['periods'], ytd['incomplete']),
+                         (gross, net, periods, legacy))
+        for name in database.PAYROLL_YTD_BREAKDOWN:
+            self.assertIsNone(ytd[name], name)
+
+    def test_refinalizing_legacy_periods_completes_the_year(self):
+        legacy = self.db.conn.execute("""
+            SELECT DISTINCT year, month, period FROM payroll
+            WHERE employee_id = 'EMP001' AND year IS NOT NULL AND sss IS NULL ORDER BY year, month, period
+        """).fetchall()
+        for year, month, period in legacy:
+            self.payroll_system.calculate_payroll_batch(month, year, period, 1)
+        ytd = self.payroll_system.get_ytd('EMP001', 2025)
+        self.assertEqual(ytd['incomplete'], 0)
+        stored = self.db.conn.execute(f"""
+            SELECT {', '.join(f'ROUND(SUM({name}), 2)' for name in database.PAYROLL_YTD_COLUMNS)}, COUNT(*)
+            FROM payroll WHERE employee_id = 'EMP001' AND year = 2025
+        """).fetchone()
+        self.assertEqual(tuple(ytd[name] for name in database.PAYROLL_YTD_COLUMNS) + (ytd['periods'],), stored)
+
+    def test_no_payslips_gives_zeros(self):
+        ytd = self.payroll_system.get_ytd('EMP001', 1999)
+        self.assertEqual((ytd['periods'], ytd['incomplete'], ytd['sss'], ytd['net_pay']), (0, 0, 0.0, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
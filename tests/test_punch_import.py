@@ -0,0 +1,121 @@
+"""Pairing of biometric punches into attendance rows."""
+import unittest
+from unittest import mock
+
+import config
+import punch_import
+
+KNOWN_IDS = {'EMP001', 'EMP002'}
+
+
+def _stats():
+    return {
+        'punches_read': 0,
+        'rows_written': 0,
+        'duplicates': 0,
+        'rejected': 0,
+        'rejected_by_reason': {},
+        'rejected_samples': [],
+    }
+
+
+def _punch(employee_id, timestamp, direction=None):
+    record = {'employee_id': employee_id, 'timestamp': timestamp}
+    if direction is not None:
+        record['direction'] = direction
+    return record
+
+
+class PairPunchesTest(unittest.TestCase):
+    def setUp(self):
+        settings = mock.patch.multiple(config, PUNCH_MAX_SHIFT_HOURS=16, PUNCH_DUPLICATE_SECONDS=120)
+        settings.start()
+        self.addCleanup(settings.stop)
+
+    def _pair(self, records):
+        stats = _stats()
+        rows = list(punch_import.pair_punches(enumerate(records, 2), KNOWN_IDS, stats))
+        return rows, stats
+
+    def test_alternating_punches_pair_in_and_out(self):
+        rows, stats = self._pair([
+            _punch('emp001', '2025-10-06 08:02'),
+            _punch('EMP002', '2025-10-06 08:10:15'),
+            _punch('EMP001', '2025-10-06 16:30'),
+            _punch('EMP002', '2025-10-06 16:00:00'),
+        ])
+        self.assertEqual(rows, [
+            ('EMP001', '2025-10-06', '08:02:00', '16:30:00'),
+            ('EMP002', '2025-10-06', '08:10:15', '16:00:00'),
+        ])
+        self.assertEqual((stats['punches_read'], stats['rejected']), (4, 0))
+
+    def test_overnight_shift_is_stored_on_the_time_in_date(self):
+        rows, _ = self._pair([
+            _punch('EMP001', '2025-10-06 22:00', 'in'),
+            _punch('EMP001', '2025-10-07 06:05', 'out'),
+            _punch('EMP002', '2025-10-06 21:58'),
+            _punch('EMP002', '2025-10-07 06:00'),
+        ])
+        self.assertEqual(rows, [
+            ('EMP001', '2025-10-06', '22:00:00', '06:05:00'),
+            ('EMP002', '2025-10-06', '21:58:00', '06:00:00'),
+        ])
+
+    def test_unmatched_punches(self):
+        rows, stats = self._pair([
+            # An in never clocked out is stored without a time-out when the next shift starts
+            _punch('EMP001', '2025-10-06 08:00'),
+            _punch('EMP001', '2025-10-07 08:00'),
+            _punch('EMP001', '2025-10-07 17:00'),
+            # Too long after the in to close it, so it starts a new shift
+            _punch('EMP002', '2025-10-06 08:00'),
+            _punch('EMP002', '2025-10-07 08:00'),
+            # An explicit out with no open in is rejected
+            _punch('EMP001', '2025-10-08 17:00', 'out'),
+            _punch('EMP002', '2025-10-08 09:00', 'out'),
+        ])
+        self.assertEqual(rows, [
+            ('EMP001', '2025-10-06', '08:00:00', None),
+            ('EMP001', '2025-10-07', '08:00:00', '17:00:00'),
+            ('EMP002', '2025-10-06', '08:00:00', None),
+            ('EMP002', '2025-10-07', '08:00:00', None),
+        ])
+        self.assertEqual(stats['rejected_by_reason'], {'out without matching in': 2})
+
+    def test_repeated_in_within_the_duplicate_window_is_dropped(self):
+        rows, stats = self._pair([
+            _punch('EMP001', '2025-10-06 08:00:00', 'in'),
+            _punch('EMP001', '2025-10-06 08:01:30', 'in'),
+            _punch('EMP001', '2025-10-06 17:00:00', 'out'),
+        ])
+        self.assertEqual(rows, [('EMP001', '2025-10-06', '08:00:00', '17:00:00')])
+        self.assertEqual((stats['duplicates'], stats['rejected']), (1, 0))
+
+    def test_rejects_are_counted_by_reason(self):
+        rows, stats = self._pair([
+            None,
+            {'timestamp': '2025-10-06 08:00'},
+            _punch('EMP999', '2025-10-06 08:00'),
+            _punch('EMP001', '2025-10-06 25:00'),
+            _punch('EMP001', '2025-10-06T08:00:00+08:00'),
+            _punch('EMP001', '2025-10-06 08:00', 'sideways'),
+            _punch('EMP001', '2025-10-06 08:00'),
+            _punch('EMP001', '2025-10-06 07:00'),
+            {'employee_id': 'EMP001', 'date': '2025-10-06', 'time': '17:00'},
+        ])
+        self.assertEqual(rows, [('EMP001', '2025-10-06', '08:00:00', '17:00:00')])
+        self.assertEqual(stats['rejected_by_reason'], {
+            'malformed line': 1,
+            'missing employee_id': 1,
+            'unknown employee': 1,
+            'invalid timestamp': 2,
+            'invalid direction': 1,
+            'out of order': 1,
+        })
+        self.assertEqual(stats['rejected'], 7)
+        self.assertEqual([line for line, _ in stats['rejected_samples']], [2, 3, 4, 5, 6, 7, 9])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Acknowledgement, retry and failure reporting of the time-clock punch queue."""
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import config
+import database
+import punch_queue
+import timesheet
+
+EMPLOYEES = [
+    ('EMP001', 'Dean Reyes', 'Manager', 'Operations', 50000.0),
+    ('EMP002', 'Ana Cruz', 'Sales', 'Sales', 30000.0),
+]
+
+
+class PunchQueueTest(unittest.TestCase):
+    def setUp(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.db_path = str(tmp / 'punches.db')
+        db = database.AppDB(self.db_path)
+        db.conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?)", EMPLOYEES)
+        db.conn.commit()
+        db.close()
+        settings = mock.patch.multiple(config, PUNCH_RETRY_ATTEMPTS=3, PUNCH_RETRY_DELAY_MS=1)
+        settings.start()
+        self.addCleanup(settings.stop)
+
+    def _queue(self, ack_mode, flush_interval_ms=20):
+        queue = punch_queue.PunchQueue(self.db_path, flush_interval_ms=flush_interval_ms, ack_mode=ack_mode)
+        self.addCleanup(queue.close)
+        return queue
+
+    def _stored(self, employee_id):
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(
+                "SELECT time_in IS NOT NULL, time_out IS NOT NULL FROM attendance WHERE employee_id = ?",
+                (employee_id,)
+            ).fetchall()
+
+    def _failing_refresh(self, fail):
+        """Patch timesheet.refresh to raise while `fail(keys)` is true."""
+        refresh = timesheet.refresh
+
+        def patched(cursor, keys):
+            if fail(keys):
+                raise sqlite3.OperationalError("database is locked")
+            return refresh(cursor, keys)
+
+        return mock.patch.object(timesheet, 'refresh', side_effect=patched)
+
+    def test_durable_ack_returns_after_the_commit(self):
+        queue = self._queue("durable")
+        success, message = queue.time_in('EMP001')
+        self.assertTrue(success, message)
+        self.assertEqual(self._stored('EMP001'), [(1, 0)])
+        self.assertEqual(queue.time_in('EMP001')[0], False)
+        self.assertTrue(queue.time_out('EMP001')[0])
+        self.assertEqual(self._stored('EMP001'), [(1, 1)])
+
+    def test_accepted_ack_returns_before_the_commit(self):
+        queue = self._queue("accepted", flush_interval_ms=10000)
+        self.assertTrue(queue.time_in('EMP001')[0])
+        # The rules already see the queued punch
+        self.assertEqual(queue.time_in('EMP001')[0], False)
+        self.assertEqual(self._stored('EMP001'), [])
+        queue.close()
+        self.assertEqual(self._stored('EMP001'), [(1, 0)])
+
+    def test_clock_out_requires_clock_in(self):
+        queue = self._queue("durable")
+        self.assertEqual(queue.time_out('EMP001'), (False, "You must clock in before clocking out."))
+
+    def test_failed_group_commit_is_retried(self):
+        calls = []
+        with self._failing_refresh(lambda keys: calls.append(keys) or len(calls) < 3):
+            queue = self._queue("durable")
+            self.assertTrue(queue.time_in('EMP001')[0])
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self._stored('EMP001'), [(1, 0)])
+        self.assertEqual(queue.take_failed(), [])
+
+    def test_failing_punch_does_not_lose_the_rest_of_its_group(self):
+        errors = []
+        with self._failing_refresh(lambda keys: any(key[0] == 'EMP002' for key in keys)):
+            queue = self._queue("accepted", flush_interval_ms=10000)
+            queue.error_listeners.append(lambda employee_id, row, error: errors.append(employee_id))
+            self.assertTrue(queue.time_in('EMP001')[0])
+            self.assertTrue(queue.time_in('EMP002')[0])
+            queue.close()
+
+        self.assertEqual(self._stored('EMP001'), [(1, 0)])
+        self.assertEqual(self._stored('EMP002'), [])
+        self.assertEqual(errors, ['EMP002'])
+        failed = queue.take_failed()
+        self.assertEqual([(row[0], error) for row, error in failed], [('EMP002', "database is locked")])
+        self.assertEqual(queue.take_failed(), [])
+
+    def test_durable_caller_gets_the_error(self):
+        with self._failing_refresh(lambda keys: True):
+            queue = self._queue("durable")
+            self.assertEqual(queue.time_in('EMP001'), (False, "Clock in failed: database is locked"))
+        # The failed punch is forgotten, so clocking in again is allowed
+        self.assertTrue(queue.time_in('EMP001')[0])
+        self.assertEqual(self._stored('EMP001'), [(1, 0)])
+
+    def test_raising_listener_does_not_stop_the_writer(self):
+        queue = self._queue("durable")
+        queue.change_listeners.append(lambda employee_id: 1 / 0)
+        # Listeners run after the ack; the writer runs them before committing the next group
+        with self.assertLogs(punch_queue.__name__, 'ERROR'):
+            self.assertTrue(queue.time_in('EMP001')[0])
+            self.assertTrue(queue.time_in('EMP002')[0])
+        self.assertEqual(self._stored('EMP002'), [(1, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""EmployeeSearchIndex matching and ranking, over an in-memory employee directory."""
+import unittest
+
+from employee import EmployeeDirectory
+from search_index import EmployeeSearchIndex
+
+ROWS = [
+    ('EMP001', 'Dean Reyes', 'Manager', 'Operations', 50000.0),
+    ('EMP002', 'Ana Cruz', 'Sales', 'Sales', 30000.0),
+    ('EMP003', 'Leah Santos', 'HR', 'Human Resources', 32000.0),
+    ('EMP004', 'Mark Bean', 'Production Worker A', 'Production', 25000.0),
+    ('EMP005', 'Manny Ong', 'Sales', 'Sales', 30000.0),
+    ('EMP006', 'Rosa Lim', 'HR', 'Management Office', 32000.0),
+]
+
+
+class EmployeeSearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = EmployeeDirectory(lambda: list(ROWS))
+        self.index = EmployeeSearchIndex(self.directory)
+
+    def test_ranks_by_field_then_substring(self):
+        # Name, then position, then department prefix, then a match inside "human"
+        self.assertEqual(self.index.search('man'), ['EMP005', 'EMP001', 'EMP006', 'EMP003'])
+        self.assertEqual(self.index.search('MAN', limit=2), ['EMP005', 'EMP001'])
+
+    def test_id_matches_come_first(self):
+        self.assertEqual(self.index.search('emp003'), ['EMP003'])
+        self.assertEqual(self.index.search('emp00', limit=3), ['EMP001', 'EMP002', 'EMP003'])
+        # Every ID contains "m", but a word prefix outranks that
+        self.assertEqual(self.index.search('m')[:3], ['EMP004', 'EMP005', 'EMP001'])
+
+    def test_every_term_must_match_and_scores_add_up(self):
+        self.assertEqual(self.index.search('sales m'), ['EMP005', 'EMP002'])
+        self.assertEqual(self.index.search('hr  rosa'), ['EMP006'])
+        self.assertEqual(self.index.search('sales lim'), [])
+
+    def test_empty_query_returns_every_id(self):
+        self.assertEqual(self.index.search('  '), [row[0] for row in ROWS])
+        self.assertEqual(self.index.search('', limit=2), ['EMP001', 'EMP002'])
+
+    def test_short_terms_match_inside_words(self):
+        self.assertEqual(self.index.search('ea'), ['EMP001', 'EMP003', 'EMP004'])
+        self.assertEqual(self.index.search('uz'), ['EMP002'])
+        self.assertEqual(self.index.search('ea', limit=2), ['EMP001', 'EMP003'])
+        self.assertEqual(self.index.search('ea uz'), [])
+
+    def test_follows_directory_changes(self):
+        self.assertEqual(self.index.search('tan'), [])
+        self.directory._put(('EMP007', 'Joy Tan', 'Sales', 'Sales', 30000.0))
+        self.assertEqual(self.index.search('tan'), ['EMP007'])
+        self.directory._put(('EMP007', 'Joy Uy', 'Sales', 'Sales', 30000.0))
+        self.assertEqual(self.index.search('tan'), [])
+        self.assertEqual(self.index.search('uy'), ['EMP007'])
+        self.directory._remove('EMP007')
+        self.assertEqual(self.index.search('uy'), [])
+        self.assertEqual(self.index.labels('rosa'), ['EMP006 - Rosa Lim'])
+
+
+if __name__ == "__main__":
+    unittest.main()
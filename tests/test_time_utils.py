@@ -0,0 +1,73 @@
+"""Hand-written date and time parsers against malformed and edge-case strings."""
+import unittest
+from datetime import date
+
+from time_utils import TimeHelper, UNIX_EPOCH_ORDINAL
+
+
+class TimeHelperTest(unittest.TestCase):
+    def test_time_seconds(self):
+        for text, seconds in [
+            ('00:00', 0),
+            ('08:00', 8 * 3600),
+            ('08:00:30', 8 * 3600 + 30),
+            ('23:59:59', 86399),
+            ('7:5', 7 * 3600 + 5 * 60),
+        ]:
+            self.assertEqual(TimeHelper.time_seconds(text), seconds, text)
+
+    def test_time_seconds_rejects_malformed(self):
+        for text in [
+            None, '', 800, '8', '24:00', '12:60', '12:00:60', '12:00:00:00', '123:00', '12:000',
+            '12:', ':30', 'ab:cd', '-1:00', '+1:00', ' 8:00', '8:00 ', '08.00', '８:００', '²:00',
+        ]:
+            self.assertIsNone(TimeHelper.time_seconds(text), repr(text))
+
+    def test_date_ordinal_matches_date(self):
+        for text in ['1970-01-01', '2024-02-29', '2000-02-29', '2025-12-31', '0001-01-01', '9999-12-31']:
+            self.assertEqual(TimeHelper.date_ordinal(text), date.fromisoformat(text).toordinal(), text)
+        self.assertEqual(TimeHelper.date_ordinal('2025-1-5'), date(2025, 1, 5).toordinal())
+
+    def test_date_ordinal_rejects_malformed(self):
+        for text in [
+            None, '', 20250101, '2023-02-29', '1900-02-29', '2025-04-31', '2025-13-01', '2025-00-10',
+            '2025-01-00', '0000-01-01', '25-01-01', '02025-01-01', '2025/01/01', '2025-01', '2025-01-01-01',
+            '2025-001-01', '2025-01-1x', ' 2025-01-01', '２０２５-01-01',
+        ]:
+            self.assertIsNone(TimeHelper.date_ordinal(text), repr(text))
+            self.assertFalse(TimeHelper.valid_date(text), repr(text))
+
+    def test_epoch_day_and_weekday(self):
+        self.assertEqual(TimeHelper.epoch_day('1970-01-01'), 0)
+        self.assertEqual(TimeHelper.epoch_day('2025-10-06'), date(2025, 10, 6).toordinal() - UNIX_EPOCH_ORDINAL)
+        self.assertEqual(TimeHelper.weekday('2025-10-06'), 0)
+        self.assertEqual(TimeHelper.weekday('2025-10-12'), 6)
+        self.assertIsNone(TimeHelper.epoch_day('2025-02-30'))
+        self.assertIsNone(TimeHelper.weekday('bad'))
+
+    def test_punch_seconds(self):
+        day = TimeHelper.epoch_day('2025-10-06')
+        self.assertEqual(TimeHelper.punch_seconds('2025-10-06', '08:00', '17:00:15'), (day, 28800, 61215))
+        # A time-out at or before the time-in is on the next day
+        self.assertEqual(TimeHelper.punch_seconds('2025-10-06', '22:00', '06:00'), (day, 79200, 86400 + 21600))
+        self.assertEqual(TimeHelper.punch_seconds('2025-10-06', '08:00', '08:00'), (day, 28800, 86400 + 28800))
+        self.assertEqual(TimeHelper.punch_seconds('2025-10-06', '08:00', None), (day, 28800, None))
+        self.assertEqual(TimeHelper.punch_seconds('2025-10-06', None, '17:00'), (day, None, 61200))
+        self.assertEqual(TimeHelper.punch_seconds('2025-10-06', 'late', '25:00'), (day, None, None))
+
+    def test_continues_overnight(self):
+        self.assertTrue(TimeHelper.continues_overnight('22:00', '06:00', 16))
+        self.assertTrue(TimeHelper.continues_overnight('14:00', '06:00', 16))
+        self.assertFalse(TimeHelper.continues_overnight('13:59', '06:00', 16))
+        self.assertFalse(TimeHelper.continues_overnight(None, '06:00', 16))
+        self.assertFalse(TimeHelper.continues_overnight('22:00', 'bad', 16))
+
+    def test_valid_time_allows_empty(self):
+        self.assertTrue(TimeHelper.valid_time(''))
+        self.assertTrue(TimeHelper.valid_time(None))
+        self.assertTrue(TimeHelper.valid_time('17:30'))
+        self.assertFalse(TimeHelper.valid_time('17:30pm'))
+
+
+if __name__ == "__main__":
+    unittest.main()
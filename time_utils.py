@@ -1,4 +1,46 @@
-from datetime import datetime, time as _time, timedelta
+from functools import lru_cache
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_DAYS_BEFORE_MONTH = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+# date(1970, 1, 1).toordinal(); epoch days are ordinals counted from there
+UNIX_EPOCH_ORDINAL = 719163
+
+
+def _small_int(part, max_len=2):
+    """Return int(part) for 1..max_len ASCII digits, else None."""
+    if 0 < len(part) <= max_len and part.isascii() and part.isdigit():
+        return int(part)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _time_seconds(time_str):
+    parts = time_str.split(':')
+    if len(parts) not in (2, 3):
+        return None
+    values = [_small_int(part) for part in parts]
+    if None in values:
+        return None
+    hours, minutes, seconds = values if len(values) == 3 else values + [0]
+    if hours > 23 or minutes > 59 or seconds > 59:
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+@lru_cache(maxsize=4096)
+def _date_ordinal(date_str):
+    parts = date_str.split('-')
+    if len(parts) != 3 or len(parts[0]) != 4:
+        return None
+    year, month, day = _small_int(parts[0], 4), _small_int(parts[1]), _small_int(parts[2])
+    if not year or not month or not day or month > 12:
+        return None
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if day > (29 if month == 2 and leap else _DAYS_IN_MONTH[month]):
+        return None
+    y = year - 1
+    return y * 365 + y // 4 - y // 100 + y // 400 + _DAYS_BEFORE_MONTH[month] + (month > 2 and leap) + day
+
 
 class TimeHelper:
     """Utility methods for date/time validation and overtime calculation.
@@ -7,70 +49,67 @@ class TimeHelper:
     """
 
     @staticmethod
-    def valid_date(date_str: str) -> bool:
-        try:
-            datetime.strptime(date_str, '%Y-%m-%d')
-            return True
-        except Exception:
-            return False
+    def time_seconds(time_str):
+        """Return seconds since midnight for an HH:MM[:SS] string, or None if empty/invalid.
 
-    @staticmethod
-    def valid_time(time_str: str) -> bool:
-        if time_str is None or time_str == '':
-            return True
-        for fmt in ("%H:%M:%S", "%H:%M"):
-            try:
-                datetime.strptime(time_str, fmt)
-                return True
-            except Exception:
-                continue
-        return False
+        Parsed by hand and memoized, since the same punch times repeat across a period.
+        """
+        if not time_str or not isinstance(time_str, str):
+            return None
+        return _time_seconds(time_str)
 
     @staticmethod
-    def parse_datetime_from_strings(date_str: str, time_str: str):
-        if not date_str or not time_str:
+    def date_ordinal(date_str):
+        """Return the proleptic Gregorian ordinal (as date.toordinal) of a YYYY-MM-DD string, or None."""
+        if not date_str or not isinstance(date_str, str):
             return None
-        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
-            try:
-                return datetime.strptime(f"{date_str} {time_str}", fmt)
-            except Exception:
-                continue
-        return None
+        return _date_ordinal(date_str)
+
+    @staticmethod
+    def epoch_day(date_str):
+        """Return days since 1970-01-01 for a YYYY-MM-DD string, or None if invalid."""
+        ordinal = TimeHelper.date_ordinal(date_str)
+        return None if ordinal is None else ordinal - UNIX_EPOCH_ORDINAL
 
     @staticmethod
-    def calculate_overtime_hours(sch_end_time: _time, date_str: str, time_out_str: str):
-         """Calculate overtime hours given a shift start/end times and the employee time_out string.
+    def weekday(date_str):
+        """Return 0 (Monday) to 6 (Sunday) for a YYYY-MM-DD string, or None if invalid."""
+        ordinal = TimeHelper.date_ordinal(date_str)
+        return None if ordinal is None else (ordinal + 6) % 7
 
-        - sch_start_time, sch_end_time: datetime.time for shift start and end
-        - date_str: YYYY-MM-DD string representing the shift start date
-        - time_out_str: HH:MM[:SS] string of actual time out
+    @staticmethod
+    def punch_seconds(date_str, time_in, time_out):
+        """Return the integer form (epoch_day, in_seconds, out_seconds) of an attendance row.
 
-        Overtime counts only after scheduled end (sch_end_time). Handles shifts that wrap past midnight
-        by adding a day to the scheduled end if needed and similarly adjusting time_out parsing if the
-        time_out is past midnight.
+        Both times count seconds from the start of the row's date, so a time-out at or
+        before the time-in (an overnight shift) is stored past 86400, on the next day.
         """
-        if sch_end_time is None or not time_out_str:
-            return None
-        try:
-            y, m, d = map(int, date_str.split('-'))
-            sch_start_dt = datetime.combine(datetime(year=y, month=m, day=d).date(), sch_start_time)
-            sch_end_dt = datetime.combine(datetime(year=y, month=m, day=d).date(), sch_end_time)
-            # If shift ends on next day (overnight), roll forward one day
-            if sch_end_dt <= sch_start_dt:
-                sch_end_dt += timedelta(days=1)
-
-            time_out_dt = TimeHelper.parse_datetime_from_strings(date_str, time_out_str)
-            if not time_out_dt:
-                return None
-            # If time_out seems to be on the next day (before the shift's start), assume it is next day
-            if time_out_dt <= sch_start_dt:
-                time_out_dt += timedelta(days=1)
-            if not time_out_dt:
-                return None
-            if time_out_dt <= sch_end_dt:
-                return 0.0
-            delta = time_out_dt - sch_end_dt
-            return round(delta.total_seconds() / 3600.0, 2)
-        except Exception:
-            return None
+        in_seconds = TimeHelper.time_seconds(time_in)
+        out_seconds = TimeHelper.time_seconds(time_out)
+        if in_seconds is not None and out_seconds is not None and out_seconds <= in_seconds:
+            out_seconds += 86400
+        return TimeHelper.epoch_day(date_str), in_seconds, out_seconds
+
+    @staticmethod
+    def continues_overnight(time_in, time_out, max_hours):
+        """Return True if `time_out` on the day after `time_in` is within `max_hours` of it."""
+        in_seconds = TimeHelper.time_seconds(time_in)
+        out_seconds = TimeHelper.time_seconds(time_out)
+        if in_seconds is None or out_seconds is None:
+            return False
+        return 86400 + out_seconds - in_seconds <= max_hours * 3600
+
+    @staticmethod
+    def clock_minutes(seconds):
+        """Return the minute of the day for seconds counted from a row's date, or None."""
+        return None if seconds is None else seconds % 86400 // 60
+
+    @staticmethod
+    def valid_date(date_str: str) -> bool:
+        return TimeHelper.date_ordinal(date_str) is not None
 
+    @staticmethod
+    def valid_time(time_str: str) -> bool:
+        if time_str is None or time_str == '':
+            return True
+        return TimeHelper.time_seconds(time_str) is not None
@@ -0,0 +1,122 @@
+"""Per-day timesheet rows computed when attendance is written.
+
+Each attendance row has a `timesheet` row holding the resolved shift and that day's
+worked, tardiness, undertime and overtime minutes, as `shifts.evaluate_day`
+computes them, so a period summary is one SUM over the period instead of re-evaluating
+every punch. Rows are written in the same transaction as the attendance change:
+
+- `refresh` after punches or admin edits, for the (employee_id, date) keys written
+- `refresh_employee` after an employee's position or department changes
+- `backfill` for all attendance, e.g. after the shift rules change
+  (`python -m cli backfill-timesheet`)
+
+`scheduled` is 1 on the Monday-Friday workdays of the payroll schedule; leave is not
+stored here, since it is approved and rejected independently of attendance.
+
+Payroll runs read `period_totals`, and single payslips and the attendance report read
+the per-day rows through `payroll.EmployeeMonthSnapshot`, while config.USE_TIMESHEET_TABLE
+is on.
+"""
+import shifts
+from time_utils import TimeHelper
+
+TIMESHEET_UPSERT = """
+    INSERT OR REPLACE INTO timesheet (
+        employee_id, epoch_day, date, shift, scheduled, present,
+        worked_minutes, tardiness_minutes, undertime_minutes, overtime_minutes
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_ATTENDANCE_SELECT = """
+    SELECT a.employee_id, a.date, a.epoch_day, a.in_seconds, a.out_seconds, e.position, e.department
+    FROM attendance a
+    LEFT JOIN employees e ON e.id = a.employee_id
+"""
+
+
+def _shift_label(shift):
+    return f"{shift['start'] // 60:02d}:{shift['start'] % 60:02d}-{shift['end'] // 60:02d}:{shift['end'] % 60:02d}"
+
+
+def timesheet_row(employee_id, date_str, epoch_day, in_seconds, out_seconds, position, department):
+    """Return the timesheet row of one attendance row, or None if its date is invalid."""
+    if epoch_day is None:
+        return None
+    shift = shifts.resolve_shift(position, department)
+    tardiness, undertime, overtime = shifts.evaluate_day(
+        shift, TimeHelper.clock_minutes(in_seconds), TimeHelper.clock_minutes(out_seconds)
+    )
+    present = in_seconds is not None and out_seconds is not None
+    return (
+        employee_id, epoch_day, date_str, _shift_label(shift), int(TimeHelper.weekday(date_str) < 5), int(present),
+        (out_seconds - in_seconds) // 60 if present else 0, tardiness, undertime, overtime,
+    )
+
+
+def refresh(cursor, keys):
+    """Recompute the timesheet rows of (employee_id, date) keys from their attendance.
+
+    Keys whose attendance row no longer exists lose their timesheet row. Does not commit.
+    """
+    rows, missing = [], []
+    for employee_id, date_str in set(keys):
+        row = cursor.execute(
+            f"{_ATTENDANCE_SELECT} WHERE a.employee_id = ? AND a.date = ?", (employee_id, date_str)
+        ).fetchone()
+        row = timesheet_row(*row) if row else None
+        if row:
+            rows.append(row)
+        else:
+            missing.append((employee_id, TimeHelper.epoch_day(date_str)))
+    cursor.executemany(TIMESHEET_UPSERT, rows)
+    cursor.executemany("DELETE FROM timesheet WHERE employee_id = ? AND epoch_day = ?", missing)
+
+
+def backfill(cursor, employee_id=None):
+    """Rebuild the timesheet from attendance, for one employee or everyone; returns the row count.
+
+    Does not commit.
+    """
+    if employee_id is None:
+        cursor.execute("DELETE FROM timesheet")
+        attendance = cursor.execute(_ATTENDANCE_SELECT).fetchall()
+    else:
+        cursor.execute("DELETE FROM timesheet WHERE employee_id = ?", (employee_id,))
+        attendance = cursor.execute(f"{_ATTENDANCE_SELECT} WHERE a.employee_id = ?", (employee_id,)).fetchall()
+    rows = [row for row in (timesheet_row(*record) for record in attendance) if row]
+    cursor.executemany(TIMESHEET_UPSERT, rows)
+    return len(rows)
+
+
+def refresh_employee(cursor, employee_id):
+    """Recompute an employee's timesheet after its position or department changed."""
+    return backfill(cursor, employee_id)
+
+
+def period_totals(cursor, start_date, end_date, employee_id=None, id_range=None):
+    """Return {employee_id: (days_present, tardiness, undertime, overtime minutes)} for a period.
+
+    Covers one employee, the (first_id, last_id) `id_range`, or everyone. Only scheduled
+    days without an approved leave are counted, as in `PayrollSystem.summarize_attendance`.
+    """
+    conditions, params = ["t.epoch_day BETWEEN ? AND ?", "t.scheduled = 1"], [
+        TimeHelper.epoch_day(start_date.isoformat()), TimeHelper.epoch_day(end_date.isoformat())
+    ]
+    if employee_id is not None:
+        conditions.insert(0, "t.employee_id = ?")
+        params.insert(0, employee_id)
+    elif id_range:
+        conditions.insert(0, "t.employee_id BETWEEN ? AND ?")
+        params[:0] = id_range
+    rows = cursor.execute(f"""
+        SELECT t.employee_id, SUM(t.present), SUM(t.tardiness_minutes),
+               SUM(t.undertime_minutes), SUM(t.overtime_minutes)
+        FROM timesheet t
+        WHERE {' AND '.join(conditions)}
+          AND NOT EXISTS (
+              SELECT 1 FROM leaves l
+              WHERE l.employee_id = t.employee_id AND l.status = 'Approved' AND l.date = t.date
+          )
+        GROUP BY t.employee_id
+    """, params).fetchall()
+    return {row[0]: tuple(row[1:]) for row in rows}
@@ -0,0 +1,142 @@
+"""Array-based timesheet computation for a whole pay period.
+
+Punches for every employee in a period are loaded into (employees x days) integer
+arrays of minutes since midnight, and tardiness, undertime, overtime and presence are
+computed with NumPy array operations, following the same rules as
+`shifts.evaluate_day`. NumPy is optional: when it is not installed
+`available()` returns False and `PayrollSystem.summarize_period` uses the pure-Python path.
+
+Run this module directly to benchmark both paths against the configured database:
+
+    python timesheet_vectorized.py [month] [year] [period]
+"""
+from time_utils import TimeHelper
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def available():
+    return np is not None
+
+
+def summarize_period(employee_ids, shifts, dates, workdays, records_by_emp, leaves_by_emp):
+    """Return {employee_id: attendance summary} for one pay period.
+
+    - employee_ids, shifts: parallel lists; shifts are entries from `shifts.resolve_shift`
+    - dates, workdays: the period's YYYY-MM-DD strings and their Monday-Friday mask
+    - records_by_emp: {employee_id: [(date, in_seconds, out_seconds), ...]}
+    - leaves_by_emp: {employee_id: {date: (leave_type, days)}} of approved leaves
+
+    The summaries have the same keys and values as `PayrollSystem.summarize_attendance`.
+    """
+    n_emp, n_days = len(employee_ids), len(dates)
+    column = {d: j for j, d in enumerate(dates)}
+
+    time_in = np.full((n_emp, n_days), -1, dtype=np.int32)
+    time_out = np.full((n_emp, n_days), -1, dtype=np.int32)
+    has_row = np.zeros((n_emp, n_days), dtype=bool)
+    logged = np.zeros((n_emp, n_days), dtype=bool)
+    on_leave = np.zeros((n_emp, n_days), dtype=bool)
+    leave_days = np.zeros((n_emp, n_days), dtype=np.float64)
+
+    for row, emp_id in enumerate(employee_ids):
+        for d, in_seconds, out_seconds in records_by_emp.get(emp_id, ()):
+            j = column.get(d)
+            if j is None:
+                continue
+            has_row[row, j] = True
+            logged[row, j] = in_seconds is not None and out_seconds is not None
+            if in_seconds is not None:
+                time_in[row, j] = TimeHelper.clock_minutes(in_seconds)
+            if out_seconds is not None:
+                time_out[row, j] = TimeHelper.clock_minutes(out_seconds)
+        for d, (_, days) in leaves_by_emp.get(emp_id, {}).items():
+            j = column.get(d)
+            if j is not None:
+                on_leave[row, j] = True
+                leave_days[row, j] = days
+
+    shift_start = np.array([s["start"] for s in shifts], dtype=np.int32)[:, None]
+    shift_end = np.array([s["end"] for s in shifts], dtype=np.int32)[:, None]
+    overnight = np.array([s["overnight"] for s in shifts], dtype=bool)[:, None]
+    shift_end_abs = shift_end + np.where(overnight, 1440, 0)
+
+    workday = np.array(workdays, dtype=bool)[None, :]
+    scheduled = workday & ~on_leave
+    evaluated = scheduled & has_row & (time_in >= 0)
+    clocked_out = evaluated & (time_out >= 0)
+
+    # Early-morning time-ins on an overnight shift belong to the next calendar day, and a
+    # time-out at or before the time-in wraps past midnight.
+    tin_abs = np.where(overnight & (time_in < shift_end), time_in + 1440, time_in)
+    tout_abs = np.where(time_out <= tin_abs, time_out + 1440, time_out)
+
+    tardiness = np.where(evaluated, np.maximum(0, tin_abs - shift_start), 0).sum(axis=1)
+    undertime = np.where(clocked_out, np.maximum(0, shift_end_abs - tout_abs), 0).sum(axis=1)
+    overtime = np.where(clocked_out, np.maximum(0, tout_abs - shift_end_abs), 0).sum(axis=1)
+    present = np.where(workday & on_leave, leave_days, 0.0).sum(axis=1) + (scheduled & logged).sum(axis=1)
+
+    total_working_days = int(workday.sum())
+    summaries = {}
+    for row, emp_id in enumerate(employee_ids):
+        summaries[emp_id] = {
+            'days_present': float(present[row]),
+            'total_overtime_hours': round(int(overtime[row]) / 60.0, 2),
+            'total_working_days': total_working_days,
+            'approved_leaves_days': sum(v for _, v in leaves_by_emp.get(emp_id, {}).values()),
+            'total_tardiness_minutes': int(tardiness[row]),
+            'total_undertime_minutes': int(undertime[row]),
+        }
+    return summaries
+
+
+def benchmark(payroll_system, month, year, period=1, repeat=5):
+    """Time the pure-Python and NumPy period summaries over the same loaded inputs.
+
+    Returns a dict with the best time of each path in seconds and whether they agree.
+    """
+    import time
+
+    start_date, end_date, _ = payroll_system.get_period_range(month, year, period)
+    employees, records_by_emp, leaves_by_emp, _ = payroll_system.load_period_inputs(start_date, end_date)
+    employees = [(emp_id, position, department) for emp_id, _, position, department, _ in employees]
+
+    results = {'employees': len(employees), 'numpy_available': available()}
+    summaries = {}
+    for name, use_numpy in (('python', False), ('numpy', True)):
+        if use_numpy and not available():
+            continue
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            summaries[name] = payroll_system.summarize_period(
+                employees, records_by_emp, leaves_by_emp, start_date, end_date, use_numpy=use_numpy
+            )
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[f'{name}_seconds'] = best
+    if 'numpy' in summaries:
+        results['identical'] = summaries['numpy'] == summaries['python']
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    from datetime import date
+
+    import config
+    import database
+    import payroll
+
+    today = date.today()
+    args = [int(a) for a in sys.argv[1:4]]
+    month, year, period = (args + [today.month, today.year, 1][len(args):])[:3]
+
+    db = database.AppDB(config.DB_NAME)
+    try:
+        print(benchmark(payroll.PayrollSystem(db.conn), month, year, period))
+    finally:
+        db.close()